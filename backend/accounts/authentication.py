@@ -0,0 +1,47 @@
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .tokens import claims_user
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT auth that trusts current role claims on read requests.
+
+    GET/HEAD/OPTIONS with a token whose version is current get a claims-built
+    user (see accounts.tokens) and cost no queries; writes, and tokens issued
+    before the last role change, load the user and profile in one query.
+    """
+
+    def authenticate(self, request):
+        # Password-revocation checks need the stored hash, so they always take the full path.
+        if request.method not in SAFE_METHODS or api_settings.CHECK_REVOKE_TOKEN:
+            return super().authenticate(request)
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        token = self.get_validated_token(raw_token)
+        return (claims_user(token) or self.get_user(token)), token
+
+    def get_user(self, validated_token):
+        # JWTAuthentication.get_user with the profile joined in, since permission helpers read it next.
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken("Token contained no recognizable user identification") from e
+        try:
+            user = self.user_model.objects.select_related("profile").get(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist as e:
+            raise AuthenticationFailed("User not found", code="user_not_found") from e
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed("The user's password has been changed.", code="password_changed")
+        return user
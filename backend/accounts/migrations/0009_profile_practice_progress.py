@@ -0,0 +1,40 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+def backfill_practice_progress(apps, schema_editor):
+    Profile = apps.get_model("accounts", "Profile")
+    SubtopicProgress = apps.get_model("question_bank", "SubtopicProgress")
+    TopicProgress = apps.get_model("question_bank", "TopicProgress")
+
+    progress = {}
+    for user_id, subject, topic, subtopic in SubtopicProgress.objects.filter(passed=True).values_list(
+        "user_id", "subject", "topic", "subtopic"
+    ):
+        entry = progress.setdefault(user_id, {}).setdefault(subject, {"subtopics": [], "topics": []})
+        entry["subtopics"].append([topic, subtopic])
+    for user_id, subject, topic in TopicProgress.objects.filter(passed=True).values_list("user_id", "subject", "topic"):
+        entry = progress.setdefault(user_id, {}).setdefault(subject, {"subtopics": [], "topics": []})
+        entry["topics"].append(topic)
+
+    for profile in Profile.objects.filter(user_id__in=list(progress.keys())):
+        profile.practice_progress = progress[profile.user_id]
+        profile.save(update_fields=["practice_progress"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_profile_streak_offset'),
+        ('question_bank', '0003_subtopicprogress_topicprogress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='practice_progress',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.RunPython(backfill_practice_progress, migrations.RunPython.noop),
+    ]
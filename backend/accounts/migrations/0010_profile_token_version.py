@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_profile_practice_progress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='token_version',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -1,6 +1,6 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 import uuid
 
@@ -15,6 +15,25 @@ class User(AbstractUser):
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["username"]
 
+    # Fields copied into JWT claims (accounts.tokens); changing one retires outstanding claims.
+    CLAIM_FIELDS = ("username", "email", "is_superuser", "is_active")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_claims = _claim_values(instance, cls.CLAIM_FIELDS)
+        return instance
+
+    def save(self, *args, **kwargs):
+        loaded = getattr(self, "_loaded_claims", None)
+        super().save(*args, **kwargs)
+        current = _claim_values(self, self.CLAIM_FIELDS, kwargs.get("update_fields"))
+        if loaded is not None and _claims_changed(loaded, current):
+            from .tokens import bump_user_tokens
+
+            bump_user_tokens(self)
+        self._loaded_claims = {**(loaded or {}), **current}
+
 
 class Profile(models.Model):
     ROLE_CHOICES = [
@@ -38,6 +57,9 @@ class Profile(models.Model):
     parent_name = models.CharField(max_length=120, blank=True, null=True)
     parent_phone = models.CharField(max_length=40, blank=True, null=True)
     streak_offset = models.IntegerField(default=0)
+    # Denormalized practice-path state, kept in sync by QuestionQuizSubmitView:
+    # {"math": {"subtopics": [[topic, subtopic], ...], "topics": [topic, ...]}, ...}
+    practice_progress = models.JSONField(default=dict, blank=True)
     selected_exam_date = models.ForeignKey(
         "exam_dates.ExamDate",
         on_delete=models.SET_NULL,
@@ -45,11 +67,47 @@ class Profile(models.Model):
         blank=True,
         related_name="selected_by",
     )
+    # Bumped when role/is_admin (or the user's claimed fields) change; see accounts.tokens.
+    token_version = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    CLAIM_FIELDS = ("role", "is_admin")
+
     def __str__(self) -> str:  # pragma: no cover
         return f"{self.user.email} ({self.role})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_claims = _claim_values(instance, cls.CLAIM_FIELDS)
+        return instance
+
+    def save(self, *args, **kwargs):
+        loaded = getattr(self, "_loaded_claims", None)
+        current = _claim_values(self, self.CLAIM_FIELDS, kwargs.get("update_fields"))
+        changed = loaded is not None and _claims_changed(loaded, current)
+        if changed:
+            self.token_version += 1
+            if kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = {*kwargs["update_fields"], "token_version"}
+        super().save(*args, **kwargs)
+        if changed:
+            from .tokens import forget_version
+
+            forget_version(self.user_id)
+        self._loaded_claims = {**(loaded or {}), **current}
+
+
+def _claim_values(instance, fields, update_fields=None) -> dict:
+    # Deferred fields, and fields a save(update_fields=...) doesn't write, are skipped.
+    if update_fields is not None:
+        fields = [f for f in fields if f in update_fields]
+    return {f: instance.__dict__[f] for f in fields if f in instance.__dict__}
+
+
+def _claims_changed(loaded: dict, current: dict) -> bool:
+    return any(f in loaded and loaded[f] != value for f, value in current.items())
+
 
 @receiver(post_save, sender=User)
 def create_profile_for_user(sender, instance: User, created: bool, **kwargs):
@@ -60,3 +118,10 @@ def create_profile_for_user(sender, instance: User, created: bool, **kwargs):
             role="admin" if instance.is_superuser else "student",
             is_admin=instance.is_superuser,
         )
+
+
+@receiver(post_delete, sender=User)
+def forget_deleted_user_tokens(sender, instance: User, **kwargs):
+    from .tokens import forget_version
+
+    forget_version(instance.pk)
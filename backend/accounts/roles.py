@@ -0,0 +1,30 @@
+"""
+Role checks shared by the apps' views.
+
+Users authenticated from token claims (accounts.authentication) carry their
+role and admin flag in `token_claims` and are answered from those; anyone else
+is answered from their profile.
+"""
+
+
+def _role_claims(user) -> tuple[str, bool]:
+    claims = getattr(user, "token_claims", None)
+    if claims is not None:
+        return (claims.get("role") or "").lower(), bool(claims.get("is_admin"))
+    prof = getattr(user, "profile", None)
+    return (getattr(prof, "role", None) or "").lower(), bool(getattr(prof, "is_admin", False))
+
+
+def is_admin(user) -> bool:
+    role, admin_flag = _role_claims(user)
+    return bool(user.is_superuser) or admin_flag or role == "admin"
+
+
+def is_teacher(user) -> bool:
+    return _role_claims(user)[0] == "teacher"
+
+
+def is_staff(user) -> bool:
+    """Admins and teachers."""
+    role, admin_flag = _role_claims(user)
+    return bool(user.is_superuser) or admin_flag or role in ("admin", "teacher")
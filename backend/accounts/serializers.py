@@ -1,7 +1,10 @@
 from rest_framework import serializers
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
 from django.contrib.auth import get_user_model
 from .models import User, Profile
+from .tokens import stamp_claims
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -26,7 +29,8 @@ class EmailOrUsernameTokenObtainPairSerializer(TokenObtainPairSerializer):
 
     @classmethod
     def get_token(cls, user):
-        return super().get_token(user)
+        # Role claims let read requests skip the user/profile lookup (accounts.authentication).
+        return stamp_claims(super().get_token(user), user)
 
     def validate(self, attrs):
         data = dict(attrs)
@@ -38,10 +42,43 @@ class EmailOrUsernameTokenObtainPairSerializer(TokenObtainPairSerializer):
         return super().validate(data)
 
 
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refresh that re-reads the user, so new tokens carry current role claims."""
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM)
+        user = (
+            User.objects.select_related("profile").filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+            if user_id
+            else None
+        )
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages["no_active_account"], "no_active_account")
+
+        stamp_claims(refresh, user)
+        data = {"access": str(refresh.access_token)}
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                try:
+                    refresh.blacklist()
+                except AttributeError:
+                    # token_blacklist app not installed
+                    pass
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand()
+            data["refresh"] = str(refresh)
+        return data
+
+
 class ProfileSerializer(serializers.ModelSerializer):
     user = UserSerializer()
     avatar = serializers.SerializerMethodField()
     university_icon = serializers.SerializerMethodField()
+    avatar_srcset = serializers.SerializerMethodField()
+    university_icon_srcset = serializers.SerializerMethodField()
     selected_exam_date = serializers.SerializerMethodField()
 
     class Meta:
@@ -54,6 +91,8 @@ class ProfileSerializer(serializers.ModelSerializer):
             "is_admin",
             "avatar",
             "university_icon",
+            "avatar_srcset",
+            "university_icon_srcset",
             "selected_exam_date",
             "goal_math",
             "goal_verbal",
@@ -87,6 +126,21 @@ class ProfileSerializer(serializers.ModelSerializer):
             return request.build_absolute_uri(url)
         return url
 
+    def _srcsets(self, obj) -> dict:
+        # One lookup for both images of this profile.
+        cache = self.__dict__.setdefault("_srcset_cache", {})
+        if obj.pk not in cache:
+            from mediafiles.images import srcset_map
+
+            cache[obj.pk] = srcset_map([obj.avatar, obj.university_icon], self.context.get("request"))
+        return cache[obj.pk]
+
+    def get_avatar_srcset(self, obj):
+        return self._srcsets(obj).get(obj.avatar) or None
+
+    def get_university_icon_srcset(self, obj):
+        return self._srcsets(obj).get(obj.university_icon) or None
+
     def get_selected_exam_date(self, obj):
         d = getattr(obj, "selected_exam_date", None)
         if not d:
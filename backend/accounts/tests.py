@@ -1,3 +1,75 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken
 
-# Create your tests here.
+from .authentication import ClaimsJWTAuthentication
+from .models import Profile, User
+from .roles import is_admin, is_teacher
+
+
+class ClaimsAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="t", email="t@x.io", password="pw")
+        Profile.objects.filter(user=self.user).update(role="teacher")
+        res = APIClient().post("/api/auth/token/", {"username": "t@x.io", "password": "pw"}, format="json")
+        self.assertEqual(res.status_code, 200, res.data)
+        self.access, self.refresh = res.data["access"], res.data["refresh"]
+
+    def authenticate(self, method="get", token=None):
+        request = getattr(RequestFactory(), method)("/", HTTP_AUTHORIZATION=f"Bearer {token or self.access}")
+        return ClaimsJWTAuthentication().authenticate(request)[0]
+
+    def set_role(self, role):
+        prof = Profile.objects.get(user=self.user)
+        prof.role = role
+        with self.captureOnCommitCallbacks(execute=True):
+            prof.save()
+
+    def test_tokens_carry_role_claims(self):
+        token = AccessToken(self.access)
+        self.assertEqual((token["role"], token["is_admin"]), ("teacher", False))
+        self.assertEqual(token["tv"], Profile.objects.get(user=self.user).token_version)
+
+    def test_reads_with_current_claims_skip_the_database(self):
+        self.authenticate()  # warms the cached token version
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+            self.assertTrue(is_teacher(user))
+            self.assertFalse(is_admin(user))
+        self.assertEqual(user.email, "t@x.io")
+
+    def test_writes_load_the_user(self):
+        user = self.authenticate(method="post")
+        self.assertFalse(hasattr(user, "token_claims"))
+        self.assertTrue(is_teacher(user))
+
+    def test_role_change_retires_claims_until_refresh(self):
+        self.authenticate()
+        self.set_role("student")
+        user = self.authenticate()
+        self.assertFalse(hasattr(user, "token_claims"))
+        self.assertFalse(is_teacher(user))
+
+        res = APIClient().post("/api/auth/token/refresh/", {"refresh": self.refresh}, format="json")
+        self.assertEqual(res.status_code, 200, res.data)
+        fresh = self.authenticate(token=res.data["access"])
+        self.assertEqual(fresh.token_claims["role"], "student")
+
+    def test_unrelated_profile_saves_keep_claims(self):
+        prof = Profile.objects.get(user=self.user)
+        version = prof.token_version
+        prof.math_level = "3"
+        prof.save(update_fields=["math_level"])
+        self.assertEqual(Profile.objects.get(user=self.user).token_version, version)
+        self.assertTrue(hasattr(self.authenticate(), "token_claims"))
+
+    def test_deactivated_user_is_rejected(self):
+        self.authenticate()
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
@@ -0,0 +1,92 @@
+"""
+Role claims in JWTs.
+
+Tokens carry the user's role, is_admin, is_superuser, username, email and a
+token version ("tv"). On read requests ClaimsJWTAuthentication turns a token
+whose version is current into a User built from those claims, with every other
+field deferred, so permission helpers (accounts.roles) answer without touching
+the database and anything else still loads on first access.
+
+Profile.token_version goes up whenever a claimed value changes (role or admin
+flag, superuser or active status, username or email), which retires every
+outstanding token's claims; such tokens fall back to a normal user lookup
+until the client refreshes. The current version is cached per user for
+TOKEN_VERSION_CACHE_TTL seconds, which bounds how long another process may
+still trust old claims.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from rest_framework_simplejwt.settings import api_settings
+
+TOKEN_VERSION_CACHE_TTL = getattr(settings, "TOKEN_VERSION_CACHE_TTL", 60)
+VERSION_CLAIM = "tv"
+KEY_PREFIX = "token_version"
+# User fields restored from claims; everything else on a claims user is deferred.
+USER_CLAIMS = ("username", "email", "is_superuser")
+# Retired tokens and inactive/deleted users cache as this, which never matches a claim.
+_NO_VERSION = -1
+
+
+def _key(user_id) -> str:
+    return f"{KEY_PREFIX}:{user_id}"
+
+
+def stamp_claims(token, user):
+    """Write user's current claims into `token` (access or refresh)."""
+    prof = getattr(user, "profile", None)
+    token["role"] = (getattr(prof, "role", None) or "student").lower()
+    token["is_admin"] = bool(getattr(prof, "is_admin", False))
+    for field in USER_CLAIMS:
+        token[field] = getattr(user, field)
+    token[VERSION_CLAIM] = getattr(prof, "token_version", 0)
+    return token
+
+
+def current_version(user_id) -> int:
+    version = cache.get(_key(user_id))
+    if version is None:
+        from .models import Profile
+
+        version = (
+            Profile.objects.filter(user_id=user_id, user__is_active=True)
+            .values_list("token_version", flat=True)
+            .first()
+        )
+        version = _NO_VERSION if version is None else version
+        cache.set(_key(user_id), version, TOKEN_VERSION_CACHE_TTL)
+    return version
+
+
+def forget_version(user_id):
+    transaction.on_commit(lambda: cache.delete(_key(user_id)))
+
+
+def bump_user_tokens(user):
+    """Retire claims for a user whose User-level claimed fields changed."""
+    from .models import Profile
+
+    Profile.objects.filter(user_id=user.pk).update(token_version=F("token_version") + 1)
+    prof = user._state.fields_cache.get("profile")
+    if prof is not None:
+        # Keep the cached instance in step so a later full save doesn't roll the version back.
+        prof.token_version += 1
+    forget_version(user.pk)
+
+
+def claims_user(token):
+    """A User built from the token's claims, or None when the claims are missing or out of date."""
+    from .models import User
+
+    user_id = token.get(api_settings.USER_ID_CLAIM)
+    if user_id is None or VERSION_CLAIM not in token or any(field not in token for field in USER_CLAIMS):
+        return None
+    if token[VERSION_CLAIM] != current_version(user_id):
+        return None
+    loaded = {"id": User._meta.pk.to_python(user_id), "is_active": True, **{f: token[f] for f in USER_CLAIMS}}
+    # from_db() takes values in concrete-field order; fields left out are deferred.
+    field_names = [f.attname for f in User._meta.concrete_fields if f.attname in loaded]
+    user = User.from_db("default", field_names, [loaded[name] for name in field_names])
+    user.token_claims = {"role": token.get("role") or "student", "is_admin": bool(token.get("is_admin"))}
+    return user
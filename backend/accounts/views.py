@@ -3,14 +3,16 @@ from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.core.files.storage import default_storage
-from django.core.files.base import ContentFile
 from django.utils import timezone
 import os
 from django.db import transaction, models
 from django.contrib.auth import get_user_model
 from .serializers import ProfileSerializer, UserSerializer, EmailOrUsernameTokenObtainPairSerializer
 from streaks.utils import get_streak_base
+from mediafiles.images import register_image
+from prep_portal_api.uploads import UploadRejected, save_image_upload
 from .models import Profile
+from .roles import is_admin as _require_admin
 
 User = get_user_model()
 
@@ -99,17 +101,19 @@ class AvatarUploadView(APIView):
 
         # Build path: avatars/{user_id}/{timestamp_filename}
         user_id = request.user.id
-        ext = os.path.splitext(file.name)[1] or ".jpg"
-        fname = f"avatars/{user_id}/{timezone.now().strftime('%Y%m%d%H%M%S')}{ext}"
-
-        saved_path = default_storage.save(fname, ContentFile(file.read()))
+        name_root = f"avatars/{user_id}/{timezone.now().strftime('%Y%m%d%H%M%S')}"
+        try:
+            saved_path = save_image_upload(file, name_root)
+        except UploadRejected as e:
+            return Response({"error": e.message}, status=e.status)
         prof = request.user.profile
         rel_url = default_storage.url(saved_path) if hasattr(default_storage, "url") else saved_path
         prof.avatar = rel_url
         prof.save(update_fields=["avatar"])
+        asset = register_image(saved_path, rel_url, request.user)
 
         absolute_url = request.build_absolute_uri(rel_url)
-        return Response({"avatar": absolute_url})
+        return Response({"avatar": absolute_url, "image": asset.as_json(request)})
 
 
 class UniversityIconUploadView(APIView):
@@ -125,24 +129,19 @@ class UniversityIconUploadView(APIView):
             return Response({"error": "No file provided"}, status=status.HTTP_400_BAD_REQUEST)
 
         user_id = request.user.id
-        ext = os.path.splitext(file.name)[1] or ".png"
-        fname = f"university_icons/{user_id}/{timezone.now().strftime('%Y%m%d%H%M%S')}{ext}"
-
-        saved_path = default_storage.save(fname, ContentFile(file.read()))
+        name_root = f"university_icons/{user_id}/{timezone.now().strftime('%Y%m%d%H%M%S')}"
+        try:
+            saved_path = save_image_upload(file, name_root)
+        except UploadRejected as e:
+            return Response({"error": e.message}, status=e.status)
         prof = request.user.profile
         rel_url = default_storage.url(saved_path) if hasattr(default_storage, "url") else saved_path
         prof.university_icon = rel_url
         prof.save(update_fields=["university_icon"])
+        asset = register_image(saved_path, rel_url, request.user)
 
         absolute_url = request.build_absolute_uri(rel_url)
-        return Response({"icon": absolute_url})
-
-
-def _require_admin(user: User):
-    prof = getattr(user, "profile", None)
-    role = (getattr(prof, "role", None) or "").lower()
-    is_admin = getattr(prof, "is_admin", False)
-    return user.is_superuser or is_admin or role == "admin"
+        return Response({"icon": absolute_url, "image": asset.as_json(request)})
 
 
 class AdminCreateUserView(APIView):
@@ -188,7 +187,7 @@ class AdminSearchUsersView(APIView):
         role = (request.data.get("role") or "").lower()
         limit = int(request.data.get("limit") or 20)
 
-        qs = Profile.objects.select_related("user")
+        qs = Profile.objects.select_related("user", "user__streak_counter")
         if role:
             qs = qs.filter(role=role)
         if q:
@@ -339,12 +338,7 @@ class AdminDeleteUserView(APIView):
         except User.DoesNotExist:
             return Response({"error": "User not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        profile = getattr(user, "profile", None)
-        is_admin_target = user.is_superuser or (profile and profile.role == "admin") or (
-            profile and profile.is_admin
-        )
-
-        if is_admin_target:
+        if _require_admin(user):
             required = os.getenv("ADMIN_DELETE_PASSWORD") or "O95Ay5g9"
             provided = (request.data.get("admin_delete_password") or "").strip()
             if provided != required:
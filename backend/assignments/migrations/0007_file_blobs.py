@@ -0,0 +1,25 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignments', '0006_offlineunit_publish_at'),
+        ('mediafiles', '0003_blob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assignmentfile',
+            name='blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='mediafiles.blob'),
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='mediafiles.blob'),
+        ),
+    ]
@@ -36,6 +36,7 @@ class AssignmentFile(models.Model):
     storage_path = models.TextField()
     mime_type = models.CharField(max_length=150, blank=True, null=True)
     size_bytes = models.BigIntegerField(blank=True, null=True)
+    blob = models.ForeignKey("mediafiles.Blob", on_delete=models.PROTECT, null=True, blank=True, related_name="+")
     created_by = models.ForeignKey(
         settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="assignment_files"
     )
@@ -50,6 +51,7 @@ class Submission(models.Model):
     file_name = models.CharField(max_length=255, blank=True, null=True)
     file_size = models.BigIntegerField(blank=True, null=True)
     mime_type = models.CharField(max_length=150, blank=True, null=True)
+    blob = models.ForeignKey("mediafiles.Blob", on_delete=models.PROTECT, null=True, blank=True, related_name="+")
     created_at = models.DateTimeField(auto_now_add=True)
 
 
@@ -0,0 +1,69 @@
+"""
+Assignment submissions: the checks and row creation shared by SubmissionCreateView
+and chunked upload sessions (target "submission", see mediafiles.chunked).
+"""
+from django.utils import timezone
+from courses.membership import enrolled
+from mediafiles.blobs import store_blob
+from prep_portal_api.uploads import UploadRejected
+
+from .models import Assignment, Submission
+
+PARAMS = ("assignment_id",)
+
+
+def submission_assignment(user, assignment_id, now=None):
+    """
+    The assignment a user may submit to right now (or at `now`); raises UploadRejected.
+    Students must be enrolled, before the deadline and under the submission limit; staff always may.
+    """
+    from .views import _require_staff
+
+    if not assignment_id:
+        raise UploadRejected("assignment_id required")
+    try:
+        assignment = Assignment.objects.select_related("course").get(id=assignment_id)
+    except Assignment.DoesNotExist:
+        raise UploadRejected("Not found", status=404)
+
+    if _require_staff(user, assignment.course):
+        return assignment
+    if not enrolled(user, assignment.course_id):
+        raise UploadRejected("Forbidden", status=403)
+    if assignment.due_at and (now or timezone.now()) > assignment.due_at:
+        raise UploadRejected("Deadline has passed")
+    if assignment.max_submissions:
+        existing = Submission.objects.filter(assignment=assignment, student=user).count()
+        if existing >= assignment.max_submissions:
+            raise UploadRejected("Submission limit reached")
+    return assignment
+
+
+def create_submission(user, assignment, file_obj, mime_type=None, size=None) -> dict:
+    """Store the file as a blob and create the submission; returns its data plus file_url."""
+    from .serializers import SubmissionSerializer
+    from .views import _cloud_url
+
+    blob = store_blob(file_obj, mime_type)
+    sub = Submission.objects.create(
+        assignment=assignment,
+        student=user,
+        file_path=blob.storage_path,
+        file_name=file_obj.name,
+        file_size=size,
+        mime_type=mime_type,
+        blob=blob,
+    )
+    data = SubmissionSerializer(sub).data
+    data["file_url"] = _cloud_url(blob.storage_path, mime_type)
+    return data
+
+
+def check(user, params, now=None):
+    submission_assignment(user, params.get("assignment_id"), now)
+
+
+def finalize(session, file_obj):
+    # Judged as of completion, not of when the worker got to it.
+    assignment = submission_assignment(session.user, session.params.get("assignment_id"), session.completed_at)
+    return {"submission": create_submission(session.user, assignment, file_obj, session.mime_type, session.size_bytes)}
@@ -8,13 +8,15 @@ from django.utils import timezone
 from django.contrib.auth import get_user_model
 from django.core.files.storage import default_storage
 import os
-import cloudinary.uploader
-import cloudinary.api
-import re
 from urllib.parse import urlparse, unquote
 from cloudinary.utils import cloudinary_url, private_download_url
 from django.conf import settings
-from courses.models import Course, CourseNode, CourseTeacher, Enrollment
+from courses.membership import enrolled, teaches
+from courses.models import Course, CourseNode
+from prep_portal_api.cloudinary_client import CloudinaryUnavailable
+from prep_portal_api.signed_urls import cached_url
+from prep_portal_api.uploads import UploadRejected
+from courses.cloud_assets import resolve_pdf_public_id
 from .models import Assignment, AssignmentFile, Submission, Grade, OfflineUnit, OfflineGrade
 from .serializers import (
     AssignmentSerializer,
@@ -25,12 +27,14 @@ from .serializers import (
     OfflineGradeSerializer,
 )
 from courses.views import _require_admin, _delete_cloudinary_asset
+from mediafiles.blobs import store_blob
+from .uploads import create_submission, submission_assignment
 
 User = get_user_model()
 
 
 def _require_staff(user: User, course: Course) -> bool:
-    return _require_admin(user) or CourseTeacher.objects.filter(course=course, teacher=user).exists()
+    return _require_admin(user) or teaches(user, course)
 
 
 class AssignmentDetailView(APIView):
@@ -47,20 +51,19 @@ class AssignmentDetailView(APIView):
 
         course = assignment.course
         user = request.user
-        is_teacher = CourseTeacher.objects.filter(course=course, teacher=user).exists()
-        is_student = Enrollment.objects.filter(course=course, user=user).exists()
-        if not (_require_staff(user, course) or is_student):
+        if not (_require_staff(user, course) or enrolled(user, course)):
             return Response({"error": "Forbidden"}, status=403)
 
-        # Auto-publish if a scheduled publish time has passed
+        data = AssignmentSerializer(assignment).data
+        # A passed schedule reads as published; publish_scheduled makes it durable.
         if assignment.status != "published":
-            node = CourseNode.objects.filter(assignment_id=assignment.id).first()
-            if node and node.publish_at and node.publish_at <= timezone.now():
-                assignment.status = "published"
-                assignment.published_at = timezone.now()
-                assignment.save(update_fields=["status", "published_at"])
-
-        return Response({"ok": True, "assignment": AssignmentSerializer(assignment).data})
+            publish_at = (
+                CourseNode.objects.filter(assignment_id=assignment.id).values_list("publish_at", flat=True).first()
+            )
+            if publish_at and publish_at <= timezone.now():
+                data["status"] = "published"
+                data["published_at"] = publish_at
+        return Response({"ok": True, "assignment": data})
 
 
 class AssignmentCreateView(APIView):
@@ -203,9 +206,7 @@ class AssignmentSubmissionsListView(APIView):
 
         course = assignment.course
         user = request.user
-        is_teacher = CourseTeacher.objects.filter(course=course, teacher=user).exists()
-        is_student = Enrollment.objects.filter(course=course, user=user).exists()
-        if not (_require_staff(user, course) or is_student):
+        if not (_require_staff(user, course) or enrolled(user, course)):
             return Response({"error": "Forbidden"}, status=403)
 
         # Submissions model not implemented yet; return empty list
@@ -245,9 +246,7 @@ class AssignmentAttachmentListView(APIView):
 
         course = assignment.course
         user = request.user
-        is_teacher = CourseTeacher.objects.filter(course=course, teacher=user).exists()
-        is_student = Enrollment.objects.filter(course=course, user=user).exists()
-        if not (_require_staff(user, course) or is_student):
+        if not (_require_staff(user, course) or enrolled(user, course)):
             return Response({"error": "Forbidden"}, status=403)
 
         files = AssignmentFile.objects.filter(assignment=assignment).order_by("-created_at")
@@ -263,7 +262,6 @@ class AssignmentAttachmentUploadView(APIView):
     permission_classes = [IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser]
 
-    @transaction.atomic
     def post(self, request):
         assignment_id = request.data.get("assignment_id")
         file_obj = request.data.get("file")
@@ -277,34 +275,21 @@ class AssignmentAttachmentUploadView(APIView):
         if not _require_staff(request.user, assignment.course):
             return Response({"error": "Forbidden"}, status=403)
 
-        rel_path = f"assignment_attachments/{assignment.id}/{file_obj.name}"
-        mime = getattr(file_obj, "content_type", "") or ""
-        is_pdf = mime.lower() == "application/pdf" or rel_path.lower().endswith(".pdf")
-        is_image = mime.lower().startswith("image/") or rel_path.lower().endswith(
-            (".png", ".jpg", ".jpeg", ".webp", ".gif", ".svg")
-        )
-        if os.getenv("CLOUDINARY_URL") and (is_pdf or not is_image):
-            public_id = f"media/{rel_path.rsplit('.', 1)[0]}"
-            result = cloudinary.uploader.upload(
-                file_obj,
-                public_id=public_id,
-                resource_type="raw",
-                type="upload",
-                access_mode="public",
-                overwrite=True,
-            )
-            saved = result.get("public_id") or public_id
-        else:
-            saved = default_storage.save(rel_path, file_obj)
+        mime_type = getattr(file_obj, "content_type", None)
+        try:
+            blob = store_blob(file_obj, mime_type)
+        except CloudinaryUnavailable as e:
+            return Response({"error": str(e)}, status=503)
         af = AssignmentFile.objects.create(
             assignment=assignment,
             name=file_obj.name,
-            storage_path=saved,
-            mime_type=getattr(file_obj, "content_type", None),
+            storage_path=blob.storage_path,
+            mime_type=mime_type,
             size_bytes=getattr(file_obj, "size", None),
+            blob=blob,
             created_by=request.user,
         )
-        file_url = _cloud_url(saved, getattr(file_obj, "content_type", None))
+        file_url = _cloud_url(blob.storage_path, mime_type)
         data = AssignmentFileSerializer(af).data
         data["url"] = file_url
         return Response({"ok": True, "file": data})
@@ -328,6 +313,10 @@ class AssignmentAttachmentDeleteView(APIView):
             return Response({"error": "Forbidden"}, status=403)
 
         file_row = AssignmentFile.objects.filter(assignment=assignment, storage_path=storage_path).first()
+        if file_row and file_row.blob_id:
+            # Shared content: deleting the row releases the blob, gc_blobs removes the file.
+            file_row.delete()
+            return Response({"ok": True})
         if file_row:
             _delete_cloudinary_asset(file_row.storage_path, file_row.mime_type)
         AssignmentFile.objects.filter(assignment=assignment, storage_path=storage_path).delete()
@@ -339,67 +328,31 @@ class AssignmentAttachmentDeleteView(APIView):
 
 
 class SubmissionCreateView(APIView):
+    """Single-request submission; large files should use a chunked upload session (mediafiles.chunked)."""
+
     permission_classes = [IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser]
 
-    @transaction.atomic
     def post(self, request):
         assignment_id = request.data.get("assignment_id")
         file_obj = request.data.get("file")
         if not assignment_id or not file_obj:
             return Response({"error": "assignment_id and file required"}, status=400)
-        try:
-            assignment = Assignment.objects.select_related("course").get(id=assignment_id)
-        except Assignment.DoesNotExist:
-            return Response({"error": "Not found"}, status=404)
-
-        # students enrolled or staff can submit
-        user = request.user
-        is_teacher = CourseTeacher.objects.filter(course=assignment.course, teacher=user).exists()
-        is_student = Enrollment.objects.filter(course=assignment.course, user=user).exists()
-        if not (is_teacher or is_student or _require_staff(user, assignment.course)):
-            return Response({"error": "Forbidden"}, status=403)
 
-        # Enforce deadline for students (teachers/admin can bypass)
-        if assignment.due_at and not _require_staff(user, assignment.course) and timezone.now() > assignment.due_at:
-            return Response({"error": "Deadline has passed"}, status=400)
-
-        # Enforce submission limit for students only
-        if not _require_staff(user, assignment.course) and assignment.max_submissions:
-            existing = Submission.objects.filter(assignment=assignment, student=user).count()
-            if existing >= assignment.max_submissions:
-                return Response({"error": "Submission limit reached"}, status=400)
-
-        rel_path = f"assignment_submissions/{assignment.id}/{user.id}/{file_obj.name}"
-        mime = getattr(file_obj, "content_type", "") or ""
-        is_pdf = mime.lower() == "application/pdf" or rel_path.lower().endswith(".pdf")
-        is_image = mime.lower().startswith("image/") or rel_path.lower().endswith(
-            (".png", ".jpg", ".jpeg", ".webp", ".gif", ".svg")
-        )
-        if os.getenv("CLOUDINARY_URL") and (is_pdf or not is_image):
-            public_id = f"media/{rel_path.rsplit('.', 1)[0]}"
-            result = cloudinary.uploader.upload(
+        # students enrolled or staff can submit; deadline and limit apply to students only
+        try:
+            assignment = submission_assignment(request.user, assignment_id)
+            data = create_submission(
+                request.user,
+                assignment,
                 file_obj,
-                public_id=public_id,
-                resource_type="raw",
-                type="upload",
-                access_mode="public",
-                overwrite=True,
+                getattr(file_obj, "content_type", None),
+                getattr(file_obj, "size", None),
             )
-            saved = result.get("public_id") or public_id
-        else:
-            saved = default_storage.save(rel_path, file_obj)
-        sub = Submission.objects.create(
-            assignment=assignment,
-            student=user,
-            file_path=saved,
-            file_name=file_obj.name,
-            file_size=getattr(file_obj, "size", None),
-            mime_type=getattr(file_obj, "content_type", None),
-        )
-        file_url = _cloud_url(saved, getattr(file_obj, "content_type", None))
-        data = SubmissionSerializer(sub).data
-        data["file_url"] = file_url
+        except UploadRejected as e:
+            return Response({"error": e.message}, status=e.status)
+        except CloudinaryUnavailable as e:
+            return Response({"error": str(e)}, status=503)
         return Response({"ok": True, "submission": data}, status=201)
 
 
@@ -520,7 +473,7 @@ class OfflineUnitsListView(APIView):
         except Course.DoesNotExist:
             return Response({"error": "Course not found"}, status=404)
         user = request.user
-        if not (_require_staff(user, course) or Enrollment.objects.filter(course=course, user=user).exists()):
+        if not (_require_staff(user, course) or enrolled(user, course)):
             return Response({"error": "Forbidden"}, status=403)
 
         units = OfflineUnit.objects.filter(course=course).order_by("-created_at")
@@ -582,8 +535,7 @@ class OfflineGradesListView(APIView):
 
         user = request.user
         is_staff = _require_staff(user, course)
-        is_student = Enrollment.objects.filter(course=course, user=user).exists()
-        if not (is_staff or is_student):
+        if not (is_staff or enrolled(user, course)):
             return Response({"error": "Forbidden"}, status=403)
 
         # For students: only return their own grade, and only after publish_at
@@ -612,58 +564,10 @@ class OfflineGradesListView(APIView):
 def _cloud_url(path: str | None, mime_type: str | None = None):
     if not path:
         return None
-    def _normalize_name(value: str) -> str:
-        return re.sub(r"[^a-z0-9]+", "", value.lower())
-
-    def _resolve_pdf_public_id(base_public_id: str):
-        if not os.getenv("CLOUDINARY_URL"):
-            return None, None, None
-        original_public_id = base_public_id
-        variants = {original_public_id}
-        if original_public_id.lower().endswith(".pdf"):
-            variants.add(original_public_id[:-4])
-        if " " in original_public_id:
-            variants.add(original_public_id.replace(" ", "_"))
-        if original_public_id.startswith("media/"):
-            variants.add(original_public_id[len("media/"):])
-        else:
-            variants.add(f"media/{original_public_id}")
-        target_name = original_public_id.split("/")[-1]
-        if target_name.lower().endswith(".pdf"):
-            target_name = target_name[:-4]
-        target_norm = _normalize_name(target_name)
-        delivery_types = ("upload", "authenticated", "private")
-
-        for vid in variants:
-            for candidate in ("raw", "image"):
-                for delivery in delivery_types:
-                    try:
-                        cloudinary.api.resource(vid, resource_type=candidate, type=delivery)
-                        return vid, candidate, delivery
-                    except Exception:
-                        continue
-
-        for vid in variants:
-            folder = "/".join(vid.split("/")[:-1])
-            if not folder:
-                continue
-            for candidate in ("raw", "image"):
-                for delivery in delivery_types:
-                    try:
-                        res = cloudinary.api.resources(
-                            resource_type=candidate,
-                            type=delivery,
-                            prefix=f"{folder}/",
-                            max_results=500,
-                        )
-                        for item in res.get("resources", []):
-                            pid = item.get("public_id", "")
-                            if _normalize_name(pid.split("/")[-1]) == target_norm:
-                                return pid, candidate, delivery
-                    except Exception:
-                        continue
-        return None, None, None
+    return cached_url(("assignment_file", path, mime_type), lambda: _build_cloud_url(path, mime_type))
+
 
+def _build_cloud_url(path: str, mime_type: str | None = None):
     if str(path).startswith("http://") or str(path).startswith("https://"):
         mime = (mime_type or "").lower()
         lower = str(path).lower()
@@ -677,7 +581,7 @@ def _cloud_url(path: str | None, mime_type: str | None = None):
                     public_tail = "/".join(parts[4:])
                     public_tail = unquote(public_tail)
                     public_id = public_tail.rsplit(".", 1)[0]
-                    resolved_id, resolved_type, resolved_delivery = _resolve_pdf_public_id(public_id)
+                    resolved_id, resolved_type, resolved_delivery = resolve_pdf_public_id(public_id)
                     return private_download_url(
                         resolved_id or public_id,
                         "pdf",
@@ -698,7 +602,10 @@ def _cloud_url(path: str | None, mime_type: str | None = None):
             fmt = None
             delivery_type = "upload"
         elif is_pdf:
-            public_id, candidate, delivery_type = _resolve_pdf_public_id(path)
+            try:
+                public_id, candidate, delivery_type = resolve_pdf_public_id(path)
+            except CloudinaryUnavailable:
+                public_id = candidate = delivery_type = None
             if public_id and candidate and delivery_type:
                 return private_download_url(
                     public_id,
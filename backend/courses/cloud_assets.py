@@ -0,0 +1,209 @@
+"""
+Where Cloudinary keeps a course file.
+
+Older PDF uploads don't say where Cloudinary put them (the public id may have
+gained or lost ".pdf", "media/" or underscores; resource and delivery types
+vary), so finding one takes admin-API probing. That probing now happens once
+per node: at upload, from the backfill_course_assets command, or on a
+background worker when a listing meets a node that was never resolved. The
+result is stored on CourseNode and serializers only read it. The same worker
+deletes files of removed subtrees after the delete has committed.
+"""
+import logging
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote, urlparse
+
+from django.db import close_old_connections, transaction
+from prep_portal_api.cloudinary_client import get_client
+
+logger = logging.getLogger(__name__)
+
+RESOURCE_TYPES = ("raw", "image")
+DELIVERY_TYPES = ("upload", "authenticated", "private")
+
+_executor = None
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+def _normalize_name(value: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "", value.lower())
+
+
+def is_pdf(node) -> bool:
+    mime = (node.mime_type or "").lower()
+    return mime == "application/pdf" or str(node.storage_path or "").lower().endswith(".pdf")
+
+
+def _is_url(path: str) -> bool:
+    return path.startswith("http://") or path.startswith("https://")
+
+
+def needs_location(node) -> bool:
+    """PDFs held by Cloudinary, whose exact location listings have to know."""
+    path = str(node.storage_path or "")
+    if not path or not os.getenv("CLOUDINARY_URL") or not is_pdf(node):
+        return False
+    return not _is_url(path) or "res.cloudinary.com" in path.lower()
+
+
+def base_location(node):
+    """(public_id, resource_type, delivery_type) implied by storage_path alone; None if unparseable."""
+    path = str(node.storage_path or "")
+    if _is_url(path):
+        parts = urlparse(path).path.strip("/").split("/")
+        # Expected: <cloud>/<resource_type>/<type>/.../v<ver>/<public_id>.<ext>
+        if len(parts) < 5:
+            return None
+        public_id = unquote("/".join(parts[4:])).rsplit(".", 1)[0]
+        return public_id, parts[1], parts[2]
+    return (path[:-4] if path.lower().endswith(".pdf") else path), "raw", "upload"
+
+
+def stored_location(node):
+    if node.cloud_public_id and node.cloud_resource_type and node.cloud_delivery_type:
+        return node.cloud_public_id, node.cloud_resource_type, node.cloud_delivery_type
+    return None
+
+
+def resolve_pdf_public_id(base_public_id: str):
+    """
+    Probe the admin API for the asset behind `base_public_id`; (None, None, None) if not found.
+    Lookups fan out on the Cloudinary client's pool; raises CloudinaryUnavailable when the API is down.
+    """
+    if not os.getenv("CLOUDINARY_URL"):
+        return None, None, None
+    variants = [base_public_id]
+    if base_public_id.lower().endswith(".pdf"):
+        variants.append(base_public_id[:-4])
+    if " " in base_public_id:
+        variants.append(base_public_id.replace(" ", "_"))
+    if base_public_id.startswith("media/"):
+        variants.append(base_public_id[len("media/"):])
+    else:
+        variants.append(f"media/{base_public_id}")
+    target_name = base_public_id.split("/")[-1]
+    if target_name.lower().endswith(".pdf"):
+        target_name = target_name[:-4]
+    target_norm = _normalize_name(target_name)
+    client = get_client()
+
+    variants = list(dict.fromkeys(variants))
+    candidates = [
+        (vid, rtype, delivery) for vid in variants for rtype in RESOURCE_TYPES for delivery in DELIVERY_TYPES
+    ]
+    hit = client.first_success(
+        [
+            (client.api.resource, (vid,), {"resource_type": rtype, "type": delivery})
+            for vid, rtype, delivery in candidates
+        ],
+        pick=lambda result: True,
+    )
+    if hit:
+        return candidates[hit[0]]
+
+    folders = list(dict.fromkeys("/".join(vid.split("/")[:-1]) for vid in variants))
+    listings = [
+        (folder, rtype, delivery)
+        for folder in folders
+        if folder
+        for rtype in RESOURCE_TYPES
+        for delivery in DELIVERY_TYPES
+    ]
+
+    def matching_id(res):
+        for item in res.get("resources", []):
+            pid = item.get("public_id", "")
+            if _normalize_name(pid.split("/")[-1]) == target_norm:
+                return pid
+        return None
+
+    hit = client.first_success(
+        [
+            (
+                client.api.resources,
+                (),
+                {"resource_type": rtype, "type": delivery, "prefix": f"{folder}/", "max_results": 500},
+            )
+            for folder, rtype, delivery in listings
+        ],
+        pick=matching_id,
+    )
+    if hit:
+        idx, public_id = hit
+        return public_id, listings[idx][1], listings[idx][2]
+    return None, None, None
+
+
+def resolve_node(node) -> bool:
+    """
+    Resolve and store one node's location; unresolvable files keep the location their path implies.
+    CloudinaryUnavailable propagates so an outage is never stored as "not found".
+    """
+    from .models import touch_course_nodes
+
+    base = base_location(node)
+    if base is None:
+        return False
+    # URL-stored files were probed by their parsed public id, path-stored ones by the raw path.
+    probe = base[0] if _is_url(str(node.storage_path)) else str(node.storage_path)
+    public_id, resource_type, delivery_type = resolve_pdf_public_id(probe)
+    location = (public_id, resource_type, delivery_type) if public_id else base
+    node.cloud_public_id, node.cloud_resource_type, node.cloud_delivery_type = location
+    type(node).objects.filter(id=node.id).update(
+        cloud_public_id=location[0], cloud_resource_type=location[1], cloud_delivery_type=location[2]
+    )
+    touch_course_nodes([node.course_id])
+    return bool(public_id)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="course-assets")
+    return _executor
+
+
+def schedule_resolution(node_id):
+    """Queue a background resolve for a node a listing found unresolved; repeats are ignored."""
+    with _pending_lock:
+        if node_id in _pending:
+            return
+        _pending.add(node_id)
+    transaction.on_commit(lambda: _get_executor().submit(_run_in_worker, node_id))
+
+
+def _run_in_worker(node_id):
+    from .models import CourseNode
+
+    close_old_connections()
+    try:
+        node = CourseNode.objects.filter(id=node_id, cloud_public_id__isnull=True).first()
+        if node is not None and needs_location(node):
+            resolve_node(node)
+    except Exception:
+        logger.exception("cloudinary resolve failed for course node %s", node_id)
+    finally:
+        with _pending_lock:
+            _pending.discard(node_id)
+        close_old_connections()
+
+
+def schedule_asset_cleanup(assets):
+    """Delete stored files [(storage_path, mime_type, location)] on the worker once the transaction commits."""
+    assets = list(assets)
+    if assets:
+        transaction.on_commit(lambda: _get_executor().submit(_cleanup_in_worker, assets))
+
+
+def _cleanup_in_worker(assets):
+    from .views import _delete_cloudinary_asset
+
+    for path, mime_type, location in assets:
+        try:
+            _delete_cloudinary_asset(path, mime_type, location)
+        except Exception:
+            logger.exception("asset cleanup failed for %s", path)
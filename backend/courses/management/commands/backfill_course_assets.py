@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from courses.cloud_assets import needs_location, resolve_node
+from prep_portal_api.cloudinary_client import CloudinaryUnavailable
+from courses.models import CourseNode
+
+
+class Command(BaseCommand):
+    help = "Resolve and store the Cloudinary location of PDF course files; --force re-resolves stored ones."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true")
+        parser.add_argument("--course", help="Only nodes of this course id.")
+
+    def handle(self, *args, **options):
+        qs = CourseNode.objects.filter(kind="file", storage_path__isnull=False).order_by("created_at")
+        if not options["force"]:
+            qs = qs.filter(cloud_public_id__isnull=True)
+        if options["course"]:
+            qs = qs.filter(course_id=options["course"])
+
+        resolved = fallback = 0
+        for node in qs.iterator(chunk_size=200):
+            if not needs_location(node):
+                continue
+            try:
+                found = resolve_node(node)
+            except CloudinaryUnavailable as e:
+                self.stdout.write(self.style.ERROR(f"Stopping: {e}"))
+                break
+            if found:
+                resolved += 1
+            else:
+                fallback += 1
+                self.stdout.write(f"{node.id}: not found, stored {node.cloud_public_id}")
+        self.stdout.write(self.style.SUCCESS(f"Resolved {resolved} nodes; {fallback} kept their path location."))
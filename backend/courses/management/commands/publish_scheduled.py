@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+from courses.publishing import next_due, publish_due
+
+
+class Command(BaseCommand):
+    help = (
+        "Publish assignments and course nodes whose publish_at has passed. Run from cron, "
+        "or with --loop to stay up and wake at each next publish_at (at most --interval seconds apart)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true")
+        parser.add_argument("--interval", type=int, default=60, help="Max seconds between checks in --loop mode.")
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            counts = publish_due()
+            if counts["assignments"] or counts["nodes"]:
+                self.stdout.write(
+                    self.style.SUCCESS(f"Published {counts['assignments']} assignments, {counts['nodes']} nodes.")
+                )
+            if not options["loop"]:
+                return
+            now = timezone.now()
+            upcoming = next_due(now)
+            wait = options["interval"]
+            if upcoming is not None:
+                wait = min(wait, max((upcoming - now).total_seconds(), 0) + 1)
+            time.sleep(wait)
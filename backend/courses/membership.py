@@ -0,0 +1,64 @@
+"""
+Which courses a user teaches and is enrolled in.
+
+Permission helpers across the apps ask this instead of running their own
+CourseTeacher/Enrollment EXISTS queries. A user's two course-id sets are loaded
+with one query and kept on the user object for the rest of the request. They
+are deliberately not cached across requests: the cache is per process, so a
+removal seen by one worker would leave the others authorizing the old sets.
+"""
+_ATTR = "_course_membership"
+
+
+class Membership:
+    def __init__(self, teacher_ids=(), student_ids=()):
+        self.teacher_ids = frozenset(str(cid) for cid in teacher_ids)
+        self.student_ids = frozenset(str(cid) for cid in student_ids)
+
+    def teaches(self, course) -> bool:
+        return _course_id(course) in self.teacher_ids
+
+    def enrolled(self, course) -> bool:
+        return _course_id(course) in self.student_ids
+
+    def member(self, course) -> bool:
+        return self.teaches(course) or self.enrolled(course)
+
+
+def _course_id(course) -> str:
+    return str(getattr(course, "id", course))
+
+
+def _load(user_id) -> Membership:
+    from django.db.models import Value
+    from .models import CourseTeacher, Enrollment
+
+    rows = CourseTeacher.objects.filter(teacher_id=user_id).values_list("course_id", Value("t")).union(
+        Enrollment.objects.filter(user_id=user_id).values_list("course_id", Value("s")),
+        all=True,
+    )
+    teacher_ids, student_ids = [], []
+    for course_id, role in rows:
+        (teacher_ids if role == "t" else student_ids).append(course_id)
+    return Membership(teacher_ids, student_ids)
+
+
+def membership(user) -> Membership:
+    """The user's memberships, loaded once per request (memoised on the user object)."""
+    found = getattr(user, _ATTR, None)
+    if found is not None:
+        return found
+    if not getattr(user, "is_authenticated", False):
+        return Membership()
+    found = _load(user.pk)
+    setattr(user, _ATTR, found)
+    return found
+
+
+def teaches(user, course) -> bool:
+    """Whether `user` is a teacher of `course` (a Course or its id); admins are not implied."""
+    return membership(user).teaches(course)
+
+
+def enrolled(user, course) -> bool:
+    return membership(user).enrolled(course)
@@ -0,0 +1,28 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0004_coursenode_quiz'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coursenode',
+            name='cloud_delivery_type',
+            field=models.CharField(blank=True, max_length=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='coursenode',
+            name='cloud_public_id',
+            field=models.CharField(blank=True, max_length=512, null=True),
+        ),
+        migrations.AddField(
+            model_name='coursenode',
+            name='cloud_resource_type',
+            field=models.CharField(blank=True, max_length=20, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0005_coursenode_cloud_location'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='nodes_changed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+def backfill_paths(apps, schema_editor):
+    CourseNode = apps.get_model("courses", "CourseNode")
+    children = {}
+    for node_id, parent_id in CourseNode.objects.values_list("id", "parent_id").iterator(chunk_size=2000):
+        children.setdefault(parent_id, []).append(node_id)
+    updates = []
+    stack = [(node_id, "/") for node_id in children.get(None, [])]
+    while stack:
+        node_id, prefix = stack.pop()
+        path = f"{prefix}{node_id.hex}/"
+        updates.append(CourseNode(id=node_id, path=path))
+        stack.extend((child_id, path) for child_id in children.get(node_id, []))
+    CourseNode.objects.bulk_update(updates, ["path"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0006_course_nodes_changed_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coursenode',
+            name='path',
+            field=models.CharField(default='', editable=False, max_length=1024),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_paths, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='coursenode',
+            name='path',
+            field=models.CharField(db_index=True, editable=False, max_length=1024),
+        ),
+    ]
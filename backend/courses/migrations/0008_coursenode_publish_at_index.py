@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0007_coursenode_path'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='coursenode',
+            name='publish_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
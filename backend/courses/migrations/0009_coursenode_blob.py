@@ -0,0 +1,20 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0008_coursenode_publish_at_index'),
+        ('mediafiles', '0003_blob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coursenode',
+            name='blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='mediafiles.blob'),
+        ),
+    ]
@@ -1,6 +1,11 @@
 from django.db import models
+from django.db.models import Value
+from django.db.models.functions import Concat, Substr
 import uuid
 from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
 
 
 class Course(models.Model):
@@ -9,6 +14,8 @@ class Course(models.Model):
     title = models.CharField(max_length=255)
     description = models.TextField(blank=True, null=True)
     cover_path = models.TextField(blank=True, null=True)
+    # Last change to any node (or the assignment/quiz behind one); the tree endpoint's ETag.
+    nodes_changed_at = models.DateTimeField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -51,12 +58,20 @@ class CourseNode(models.Model):
     )
     kind = models.CharField(max_length=20, choices=KIND_CHOICES)
     name = models.CharField(max_length=255)
+    # Materialized path "/<root id hex>/.../<own id hex>/": a subtree is one indexed prefix query.
+    path = models.CharField(max_length=1024, db_index=True, editable=False)
     description = models.TextField(blank=True, null=True)
     storage_path = models.TextField(blank=True, null=True)
     mime_type = models.CharField(max_length=120, blank=True, null=True)
     size_bytes = models.BigIntegerField(blank=True, null=True)
+    # Where Cloudinary actually holds the file; filled by cloud_assets so listings never probe the admin API.
+    cloud_public_id = models.CharField(max_length=512, blank=True, null=True)
+    cloud_resource_type = models.CharField(max_length=20, blank=True, null=True)
+    cloud_delivery_type = models.CharField(max_length=20, blank=True, null=True)
+    # Content-addressed copy the file lives in (mediafiles.blobs); null for files stored before blobs.
+    blob = models.ForeignKey("mediafiles.Blob", on_delete=models.PROTECT, null=True, blank=True, related_name="+")
     published = models.BooleanField(default=True)
-    publish_at = models.DateTimeField(blank=True, null=True)
+    publish_at = models.DateTimeField(blank=True, null=True, db_index=True)
     assignment_id = models.UUIDField(blank=True, null=True)
     quiz_id = models.UUIDField(blank=True, null=True)
     created_by = models.ForeignKey(
@@ -71,4 +86,53 @@ class CourseNode(models.Model):
     def __str__(self):
         return f"{self.kind}:{self.name}"
 
+    def save(self, *args, **kwargs):
+        if not self.path:
+            self.path = node_path(self.parent.path if self.parent_id else None, self.id)
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None and "path" not in update_fields:
+                kwargs["update_fields"] = [*update_fields, "path"]
+        super().save(*args, **kwargs)
+
+    def subtree(self):
+        """This node and every descendant."""
+        return CourseNode.objects.filter(course_id=self.course_id, path__startswith=self.path)
+
+    def move_to(self, parent):
+        """Re-parent this node (parent None = course root); descendant paths are rewritten in one UPDATE."""
+        old = self.path
+        new = node_path(parent.path if parent else None, self.id)
+        self.parent = parent
+        if new != old:
+            self.subtree().update(path=Concat(Value(new), Substr("path", len(old) + 1)))
+            self.path = new
+
+
+def node_path(parent_path: str | None, node_id) -> str:
+    return f"{parent_path or '/'}{node_id.hex}/"
+
+
+def touch_course_nodes(course_ids):
+    """Mark courses' node trees as changed; call after writes that bypass CourseNode signals."""
+    course_ids = {cid for cid in course_ids if cid}
+    if course_ids:
+        Course.objects.filter(id__in=course_ids).update(nodes_changed_at=timezone.now())
+
+
+@receiver([post_save, post_delete], sender=CourseNode)
+def _course_node_changed(sender, instance, origin=None, **kwargs):
+    # Cascaded and queryset deletes are touched once by whoever started them (or the course is gone).
+    if origin is None or origin is instance:
+        touch_course_nodes([instance.course_id])
+
+
+@receiver(post_save, sender="assignments.Assignment")
+def _course_assignment_changed(sender, instance, **kwargs):
+    touch_course_nodes([instance.course_id])
+
+
+@receiver(post_save, sender="mock_exams.MockExam")
+def _course_quiz_changed(sender, instance, **kwargs):
+    touch_course_nodes(CourseNode.objects.filter(quiz_id=instance.id).values_list("course_id", flat=True))
+
 # Create your models here.
@@ -0,0 +1,45 @@
+"""
+Scheduled publishing.
+
+CourseNode.publish_at drives it: publish_due() flips everything whose time has
+passed with bulk UPDATEs (assignments behind scheduled nodes, then the nodes
+themselves), and the publish_scheduled command runs it once or as a loop that
+sleeps until the next publish_at. Read paths never write; until the job runs
+they treat a passed publish_at as published.
+"""
+from django.db import transaction
+from django.db.models import Min, OuterRef, Subquery
+from django.utils import timezone
+
+from .models import CourseNode, touch_course_nodes
+
+
+def publish_due(now=None) -> dict:
+    """Publish due assignments and course nodes; returns counts. Safe to run concurrently and repeatedly."""
+    from assignments.models import Assignment
+
+    now = now or timezone.now()
+    due = CourseNode.objects.filter(publish_at__lte=now)
+    with transaction.atomic():
+        assignments = Assignment.objects.exclude(status="published").filter(
+            id__in=due.filter(kind="assignment").values("assignment_id")
+        )
+        nodes = due.filter(published=False)
+        course_ids = set(assignments.values_list("course_id", flat=True)) | set(
+            nodes.values_list("course_id", flat=True)
+        )
+        published_assignments = assignments.update(
+            status="published",
+            published_at=Subquery(
+                CourseNode.objects.filter(assignment_id=OuterRef("id")).order_by("publish_at").values("publish_at")[:1]
+            ),
+        )
+        published_nodes = nodes.update(published=True)
+        touch_course_nodes(course_ids)
+    return {"assignments": published_assignments, "nodes": published_nodes}
+
+
+def next_due(now=None):
+    """Earliest publish_at still ahead of `now`, or None."""
+    now = now or timezone.now()
+    return CourseNode.objects.filter(publish_at__gt=now).aggregate(at=Min("publish_at"))["at"]
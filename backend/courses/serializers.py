@@ -1,13 +1,32 @@
 from rest_framework import serializers
-from django.core.files.storage import default_storage
 import os
-import re
-from urllib.parse import urlparse, unquote
-import cloudinary.api
 from cloudinary.utils import cloudinary_url, private_download_url
+from prep_portal_api.signed_urls import cached_url, storage_url
+from .cloud_assets import base_location, is_pdf, needs_location, schedule_resolution, stored_location
 from .models import Course, CourseNode
 
 
+def _pdf_download_url(node):
+    """Signed PDF link from the stored location; unresolved nodes are queued for the worker, never probed here."""
+    location = stored_location(node)
+    if location is None:
+        location = base_location(node)
+        if location is None:
+            return None
+        schedule_resolution(node.id)
+    public_id, resource_type, delivery_type = location
+    try:
+        return private_download_url(
+            public_id,
+            "pdf",
+            resource_type=resource_type,
+            type=delivery_type,
+            attachment=False,
+        )
+    except Exception:
+        return None
+
+
 class CourseSerializer(serializers.ModelSerializer):
     cover_url = serializers.SerializerMethodField()
 
@@ -16,12 +35,7 @@ class CourseSerializer(serializers.ModelSerializer):
         fields = ["id", "slug", "title", "description", "cover_path", "cover_url"]
 
     def get_cover_url(self, obj):
-        if not obj.cover_path:
-            return None
-        try:
-            return default_storage.url(obj.cover_path)
-        except Exception:
-            return obj.cover_path
+        return storage_url(obj.cover_path)
 
 
 class CourseNodeSerializer(serializers.ModelSerializer):
@@ -67,82 +81,17 @@ class CourseNodeSerializer(serializers.ModelSerializer):
     def get_storage_url(self, obj):
         if not obj.storage_path:
             return None
-        def _normalize_name(value: str) -> str:
-            return re.sub(r"[^a-z0-9]+", "", value.lower())
-
-        def _resolve_pdf_public_id(base_public_id: str):
-            if not os.getenv("CLOUDINARY_URL"):
-                return None, None, None
-            original_public_id = base_public_id
-            variants = {original_public_id}
-            if original_public_id.lower().endswith(".pdf"):
-                variants.add(original_public_id[:-4])
-            if " " in original_public_id:
-                variants.add(original_public_id.replace(" ", "_"))
-            if original_public_id.startswith("media/"):
-                variants.add(original_public_id[len("media/"):])
-            else:
-                variants.add(f"media/{original_public_id}")
-            target_name = original_public_id.split("/")[-1]
-            if target_name.lower().endswith(".pdf"):
-                target_name = target_name[:-4]
-            target_norm = _normalize_name(target_name)
-
-            delivery_types = ("upload", "authenticated", "private")
-            for vid in variants:
-                for candidate in ("raw", "image"):
-                    for delivery in delivery_types:
-                        try:
-                            cloudinary.api.resource(vid, resource_type=candidate, type=delivery)
-                            return vid, candidate, delivery
-                        except Exception:
-                            continue
-
-            for vid in variants:
-                folder = "/".join(vid.split("/")[:-1])
-                if not folder:
-                    continue
-                for candidate in ("raw", "image"):
-                    for delivery in delivery_types:
-                        try:
-                            res = cloudinary.api.resources(
-                                resource_type=candidate,
-                                type=delivery,
-                                prefix=f"{folder}/",
-                                max_results=500,
-                            )
-                            for item in res.get("resources", []):
-                                pid = item.get("public_id", "")
-                                if _normalize_name(pid.split("/")[-1]) == target_norm:
-                                    return pid, candidate, delivery
-                        except Exception:
-                            continue
-            return None, None, None
+        return cached_url(
+            ("course_node", obj.storage_path, obj.mime_type, stored_location(obj)),
+            lambda: self._build_storage_url(obj),
+        )
 
+    def _build_storage_url(self, obj):
         if str(obj.storage_path).startswith("http://") or str(obj.storage_path).startswith("https://"):
-            mime = (obj.mime_type or "").lower()
-            lower = str(obj.storage_path).lower()
-            is_pdf = mime == "application/pdf" or lower.endswith(".pdf")
-            if os.getenv("CLOUDINARY_URL") and is_pdf and "res.cloudinary.com" in lower:
-                try:
-                    parts = urlparse(obj.storage_path).path.strip("/").split("/")
-                    # Expected: <cloud>/<resource_type>/<type>/.../v<ver>/<public_id>.<ext>
-                    if len(parts) >= 5:
-                        resource_type = parts[1]
-                        delivery_type = parts[2]
-                        public_tail = "/".join(parts[4:])
-                        public_tail = unquote(public_tail)
-                        public_id = public_tail.rsplit(".", 1)[0]
-                        resolved_id, resolved_type, resolved_delivery = _resolve_pdf_public_id(public_id)
-                        return private_download_url(
-                            resolved_id or public_id,
-                            "pdf",
-                            resource_type=resolved_type or resource_type,
-                            type=resolved_delivery or delivery_type,
-                            attachment=False,
-                        )
-                except Exception:
-                    pass
+            if needs_location(obj):
+                url = _pdf_download_url(obj)
+                if url:
+                    return url
             return obj.storage_path
 
         # If Cloudinary is configured, return a signed URL so protected assets load.
@@ -150,29 +99,13 @@ class CourseNodeSerializer(serializers.ModelSerializer):
             path = obj.storage_path
             mime = (obj.mime_type or "").lower()
             lower = path.lower()
-            is_pdf = mime == "application/pdf" or lower.endswith(".pdf")
             if mime.startswith("image/") or lower.endswith((".png", ".jpg", ".jpeg", ".webp", ".gif")):
                 resource_type = "image"
                 fmt = None
                 delivery_type = "upload"
-            elif is_pdf:
+            elif is_pdf(obj):
                 # Use Cloudinary private download URL for PDFs to bypass ACL issues
-                public_id, candidate, delivery_type = _resolve_pdf_public_id(path)
-                if public_id and candidate and delivery_type:
-                    return private_download_url(
-                        public_id,
-                        "pdf",
-                        resource_type=candidate,
-                        type=delivery_type,
-                        attachment=False,
-                    )
-                return private_download_url(
-                    path.rsplit(".", 1)[0] if lower.endswith(".pdf") else path,
-                    "pdf",
-                    resource_type="raw",
-                    type="upload",
-                    attachment=False,
-                )
+                return _pdf_download_url(obj)
             else:
                 resource_type = "raw"
                 fmt = None
@@ -186,7 +119,4 @@ class CourseNodeSerializer(serializers.ModelSerializer):
                 format=fmt,
             )
             return url
-        try:
-            return default_storage.url(obj.storage_path)
-        except Exception:
-            return obj.storage_path
+        return storage_url(obj.storage_path)
@@ -1,3 +1,237 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from .membership import enrolled, membership, teaches
+from .models import Course, CourseNode, CourseTeacher, Enrollment
+
+
+class MembershipTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="t", email="t@x.io", password="pw")
+        self.course = Course.objects.create(slug="c1", title="C1")
+        self.other = Course.objects.create(slug="c2", title="C2")
+        CourseTeacher.objects.create(course=self.course, teacher=self.user)
+        Enrollment.objects.create(course=self.other, user=self.user)
+
+    def fresh_user(self):
+        # A new object per "request", as authentication builds one.
+        return User.objects.get(pk=self.user.pk)
+
+    def test_sets_loaded_in_one_query_and_memoised(self):
+        user = self.fresh_user()
+        with self.assertNumQueries(1):
+            self.assertTrue(teaches(user, self.course))
+            self.assertFalse(teaches(user, self.other))
+            self.assertTrue(enrolled(user, self.other.id))
+            self.assertTrue(membership(user).member(str(self.course.id)))
+
+    def test_removal_seen_by_next_request(self):
+        self.assertTrue(teaches(self.fresh_user(), self.course))
+        CourseTeacher.objects.filter(course=self.course, teacher=self.user).delete()
+        Enrollment.objects.filter(user=self.user).delete()
+        user = self.fresh_user()
+        self.assertFalse(teaches(user, self.course))
+        self.assertFalse(enrolled(user, self.other))
+
+    def test_anonymous_user_has_no_memberships(self):
+        from django.contrib.auth.models import AnonymousUser
+
+        with self.assertNumQueries(0):
+            self.assertFalse(membership(AnonymousUser()).member(self.course))
+
+
+class FakeCloudinary:
+    """Stands in for cloudinary.api and cloudinary.uploader."""
+
+    def __init__(self, assets):
+        self.assets = set(assets)
+        self.destroyed = []
+        self.lookups = 0
+
+    def resource(self, public_id, resource_type, type, timeout=None):
+        from cloudinary.exceptions import NotFound
+
+        self.lookups += 1
+        if (public_id, resource_type, type) not in self.assets:
+            raise NotFound(public_id)
+        return {"public_id": public_id}
+
+    def destroy(self, public_id, resource_type, type, invalidate=False, timeout=None):
+        key = (public_id, resource_type, type)
+        self.destroyed.append(key)
+        self.assets.discard(key)
+        return {"result": "ok"}
+
+
+class CloudinaryTestCase(TestCase):
+    """Cloudinary configured, with FakeCloudinary holding `assets` behind the shared client."""
+
+    assets = ()
+
+    def setUp(self):
+        import os
+        from prep_portal_api.cloudinary_client import CloudinaryClient, set_client
+
+        patcher = mock.patch.dict(os.environ, {"CLOUDINARY_URL": "cloudinary://k:s@demo"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.fake = FakeCloudinary(self.assets)
+        set_client(CloudinaryClient(api=self.fake, uploader=self.fake))
+        self.addCleanup(set_client, None)
+        cache.clear()
+
+
+class DeleteCloudinaryAssetTests(CloudinaryTestCase):
+    assets = {("media/notes", "raw", "upload"), ("notes", "image", "private")}
+
+    def test_destroys_only_one_matching_asset(self):
+        from .views import _delete_cloudinary_asset
+
+        self.assertTrue(_delete_cloudinary_asset("media/notes.pdf", "application/pdf"))
+        self.assertEqual(len(self.fake.destroyed), 1)
+        self.assertEqual(len(self.fake.assets), 1)
+
+    def test_missing_asset_destroys_nothing(self):
+        from .views import _delete_cloudinary_asset
+
+        self.assertFalse(_delete_cloudinary_asset("media/other.pdf", "application/pdf"))
+        self.assertEqual(self.fake.destroyed, [])
+
+    def test_known_location_is_destroyed_directly(self):
+        from .views import _delete_cloudinary_asset
+
+        self.assertTrue(_delete_cloudinary_asset("x.pdf", "application/pdf", ("notes", "image", "private")))
+        self.assertEqual(self.fake.destroyed, [("notes", "image", "private")])
+
+
+class CloudAssetTests(CloudinaryTestCase):
+    assets = {("notes", "raw", "authenticated")}
+
+    def setUp(self):
+        super().setUp()
+        course = Course.objects.create(slug="c1", title="C1")
+        self.node = CourseNode.objects.create(
+            course=course, kind="file", name="Notes", storage_path="notes.pdf", mime_type="application/pdf"
+        )
+
+    def storage_url(self):
+        from .serializers import CourseNodeSerializer
+
+        def signed(public_id, fmt, resource_type, type, attachment):
+            return f"{resource_type}/{type}/{public_id}.{fmt}"
+
+        with mock.patch("courses.serializers.private_download_url", signed):
+            return CourseNodeSerializer(CourseNode.objects.get(id=self.node.id)).data["storage_url"]
+
+    def test_resolved_location_is_stored_once(self):
+        from .cloud_assets import resolve_node
+
+        self.assertTrue(resolve_node(self.node))
+        stored = CourseNode.objects.values_list("cloud_public_id", "cloud_resource_type", "cloud_delivery_type")
+        self.assertEqual(stored.get(id=self.node.id), ("notes", "raw", "authenticated"))
+        lookups = self.fake.lookups
+        self.assertEqual(self.storage_url(), "raw/authenticated/notes.pdf")
+        self.assertEqual(self.fake.lookups, lookups)
+
+    def test_listing_queues_unresolved_nodes_instead_of_probing(self):
+        with mock.patch("courses.serializers.schedule_resolution") as schedule:
+            self.assertEqual(self.storage_url(), "raw/upload/notes.pdf")
+        schedule.assert_called_once_with(self.node.id)
+        self.assertEqual(self.fake.lookups, 0)
+
+
+class CourseNodesTreeTests(TestCase):
+    def setUp(self):
+        from assignments.models import Assignment
+
+        self.teacher = User.objects.create_user(username="t", email="t@x.io", password="pw")
+        self.course = Course.objects.create(slug="c1", title="C1")
+        CourseTeacher.objects.create(course=self.course, teacher=self.teacher)
+        folder = CourseNode.objects.create(course=self.course, kind="folder", name="Week 1")
+        self.assignment = Assignment.objects.create(course=self.course, title="Essay")
+        self.publish_at = timezone.now() + timedelta(hours=1)
+        CourseNode.objects.create(
+            course=self.course,
+            parent=folder,
+            kind="assignment",
+            name="Essay",
+            assignment_id=self.assignment.id,
+            publish_at=self.publish_at,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+
+    def tree(self, etag=None):
+        headers = {"HTTP_IF_NONE_MATCH": etag} if etag else {}
+        return self.client.get("/api/course-nodes/tree/", {"course_id": str(self.course.id)}, **headers)
+
+    def test_nested_tree_and_revalidation(self):
+        res = self.tree()
+        (folder,) = res.data["tree"]
+        self.assertEqual([c["name"] for c in folder["children"]], ["Essay"])
+        self.assertEqual(self.tree(res["ETag"]).status_code, 304)
+
+    def test_etag_moves_when_a_scheduled_item_comes_due(self):
+        res = self.tree()
+        self.assertEqual(res.data["tree"][0]["children"][0]["assignment"]["status"], "draft")
+        later = self.publish_at + timedelta(minutes=1)
+        with mock.patch("django.utils.timezone.now", return_value=later):
+            res = self.tree(res["ETag"])
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data["tree"][0]["children"][0]["assignment"]["status"], "published")
+
+    def test_publish_due_flips_what_came_due_once(self):
+        from .publishing import next_due, publish_due
+
+        CourseNode.objects.filter(publish_at__isnull=False).update(published=False)
+        self.assertEqual(publish_due(), {"assignments": 0, "nodes": 0})
+        self.assertEqual(next_due(), self.publish_at)
+        later = self.publish_at + timedelta(minutes=1)
+        self.assertEqual(publish_due(now=later), {"assignments": 1, "nodes": 1})
+        self.assignment.refresh_from_db()
+        self.assertEqual((self.assignment.status, self.assignment.published_at), ("published", self.publish_at))
+        self.course.refresh_from_db()
+        self.assertIsNotNone(self.course.nodes_changed_at)
+        self.assertEqual(publish_due(now=later), {"assignments": 0, "nodes": 0})
+        self.assertIsNone(next_due(now=later))
+
+
+class SubtreeTests(TestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user(username="t", email="t@x.io", password="pw")
+        self.course = Course.objects.create(slug="c1", title="C1")
+        CourseTeacher.objects.create(course=self.course, teacher=self.teacher)
+        self.a = CourseNode.objects.create(course=self.course, kind="folder", name="A")
+        self.b = CourseNode.objects.create(course=self.course, kind="folder", name="B", parent=self.a)
+        self.c = CourseNode.objects.create(course=self.course, kind="file", name="C", parent=self.b)
+        self.other = CourseNode.objects.create(course=self.course, kind="folder", name="Other")
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+
+    def post(self, url, **data):
+        return self.client.post(f"/api/course-nodes/{url}/", data, format="json")
+
+    def test_move_rewrites_descendant_paths(self):
+        self.assertEqual(self.post("update", node_id=str(self.b.id), parent_id=str(self.other.id)).status_code, 200)
+        self.c.refresh_from_db()
+        self.assertEqual(self.c.path, f"/{self.other.id.hex}/{self.b.id.hex}/{self.c.id.hex}/")
+        self.assertEqual(set(self.other.subtree().values_list("name", flat=True)), {"Other", "B", "C"})
+        self.assertEqual(set(self.a.subtree().values_list("name", flat=True)), {"A"})
+
+    def test_folder_cannot_move_into_its_own_subtree(self):
+        res = self.post("update", node_id=str(self.a.id), parent_id=str(self.c.id))
+        self.assertEqual(res.status_code, 400)
 
-# Create your tests here.
+    def test_recursive_publish_and_delete_cover_the_subtree_only(self):
+        self.post("set-published", node_id=str(self.a.id), published=False, recursive=True)
+        published = dict(CourseNode.objects.values_list("name", "published"))
+        self.assertEqual(published, {"A": False, "B": False, "C": False, "Other": True})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post("delete", node_id=str(self.b.id))
+        self.assertEqual(set(CourseNode.objects.values_list("name", flat=True)), {"A", "Other"})
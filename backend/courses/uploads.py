@@ -0,0 +1,91 @@
+"""
+Course file uploads: the checks and node creation shared by CourseNodeUploadView
+and chunked upload sessions (target "course_file", see mediafiles.chunked).
+"""
+from cloudinary.utils import cloudinary_url
+from django.core.files.storage import default_storage
+from mediafiles.blobs import store_blob
+from prep_portal_api.uploads import UploadRejected
+
+from .membership import teaches
+from .models import Course, CourseNode
+
+PARAMS = ("course_id", "parent_id", "name", "description")
+
+
+def file_destination(user, course_id, parent_id=None):
+    """(course, parent folder) a user may upload into; raises UploadRejected."""
+    from .views import _require_admin
+
+    if not course_id:
+        raise UploadRejected("course_id required")
+    try:
+        course = Course.objects.get(id=course_id)
+    except Course.DoesNotExist:
+        raise UploadRejected("Course not found", status=404)
+    if not (_require_admin(user) or teaches(user, course)):
+        raise UploadRejected("Forbidden", status=403)
+
+    parent = None
+    if parent_id:
+        try:
+            parent = CourseNode.objects.get(id=parent_id, course=course)
+        except CourseNode.DoesNotExist:
+            raise UploadRejected("Parent not found", status=404)
+    return course, parent
+
+
+def create_file_node(user, course, parent, name, description, file_obj, mime_type=None, size=None):
+    """Store the file as a blob and create its node; returns (node, file_url). May raise CloudinaryUnavailable."""
+    blob = store_blob(file_obj, mime_type)
+    cloud_location = blob.cloud_location
+    if cloud_location:
+        is_pdf = (mime_type or "").lower() == "application/pdf" or file_obj.name.lower().endswith(".pdf")
+        file_url, _ = cloudinary_url(
+            blob.storage_path,
+            resource_type="raw",
+            type="upload",
+            secure=True,
+            format="pdf" if is_pdf else None,
+        )
+    else:
+        file_url = default_storage.url(blob.storage_path)
+
+    node = CourseNode.objects.create(
+        course=course,
+        parent=parent,
+        kind="file",
+        name=name or file_obj.name,
+        description=description,
+        storage_path=blob.storage_path,
+        mime_type=mime_type,
+        size_bytes=size,
+        blob=blob,
+        created_by=user,
+        published=True,
+        **cloud_location,
+    )
+    return node, file_url
+
+
+def check(user, params, now=None):
+    file_destination(user, params.get("course_id"), params.get("parent_id"))
+
+
+def finalize(session, file_obj):
+    from .serializers import CourseNodeSerializer
+
+    params = session.params
+    # The folder may have gone away while the file was uploading.
+    course, parent = file_destination(session.user, params.get("course_id"), params.get("parent_id"))
+    node, file_url = create_file_node(
+        session.user,
+        course,
+        parent,
+        (params.get("name") or "").strip(),
+        params.get("description") or None,
+        file_obj,
+        session.mime_type,
+        session.size_bytes,
+    )
+    return {"node": CourseNodeSerializer(node).data, "file_url": file_url}
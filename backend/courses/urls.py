@@ -10,6 +10,7 @@ from .views import (
     CoursePeopleView,
     CourseCoverUploadView,
     CourseNodesListView,
+    CourseNodesTreeView,
     CourseNodesCreateView,
     CourseNodeUploadView,
     CourseNodeSetPublishedView,
@@ -24,6 +25,7 @@ urlpatterns = [
     path("courses/people/", CoursePeopleView.as_view(), name="courses_people"),
     path("courses/cover-upload/", CourseCoverUploadView.as_view(), name="courses_cover_upload"),
     path("course-nodes/list/", CourseNodesListView.as_view(), name="course_nodes_list"),
+    path("course-nodes/tree/", CourseNodesTreeView.as_view(), name="course_nodes_tree"),
     path("course-nodes/create/", CourseNodesCreateView.as_view(), name="course_nodes_create"),
     path("course-nodes/upload/", CourseNodeUploadView.as_view(), name="course_nodes_upload"),
     path("course-nodes/set-published/", CourseNodeSetPublishedView.as_view(), name="course_nodes_set_published"),
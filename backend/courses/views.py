@@ -4,35 +4,33 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.parsers import MultiPartParser, FormParser
 from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.core.exceptions import ValidationError
 from django.db import transaction
+from django.db.models import Max
 from django.contrib.auth import get_user_model
 from django.core.files.storage import default_storage
+import hashlib
 import os
-import cloudinary.uploader
 import re
+import time
+from types import SimpleNamespace
 from urllib.parse import urlparse, unquote
-from cloudinary.utils import cloudinary_url
 from django.conf import settings
 from accounts.models import Profile
-from .models import Course, CourseTeacher, Enrollment, CourseNode
+from accounts.roles import is_admin as _require_admin, is_teacher as _is_teacher
+from prep_portal_api.cloudinary_client import CloudinaryUnavailable, get_client
+from prep_portal_api.signed_urls import URL_CACHE_TTL
+from prep_portal_api.uploads import UploadRejected
+from .cloud_assets import schedule_asset_cleanup, stored_location
+from .membership import membership, teaches
+from .models import Course, CourseTeacher, Enrollment, CourseNode, touch_course_nodes
 from .serializers import CourseSerializer, CourseNodeSerializer
+from .uploads import create_file_node, file_destination
 
 User = get_user_model()
 
 
-def _require_admin(user: User) -> bool:
-    prof = getattr(user, "profile", None)
-    role = (getattr(prof, "role", None) or "").lower()
-    is_admin = getattr(prof, "is_admin", False)
-    return user.is_superuser or is_admin or role == "admin"
-
-
-def _is_teacher(user: User) -> bool:
-    prof = getattr(user, "profile", None)
-    role = (getattr(prof, "role", None) or "").lower()
-    return role == "teacher"
-
-
 def _cloudinary_public_id_from_url(url: str) -> str | None:
     try:
         parts = urlparse(url).path.strip("/").split("/")
@@ -45,9 +43,19 @@ def _cloudinary_public_id_from_url(url: str) -> str | None:
         return None
 
 
-def _delete_cloudinary_asset(path: str | None, mime_type: str | None = None) -> bool:
+def _delete_cloudinary_asset(path: str | None, mime_type: str | None = None, location=None) -> bool:
+    """Destroy a stored file; `location` is a resolved (public_id, resource_type, delivery_type) if known."""
     if not path or not os.getenv("CLOUDINARY_URL"):
         return False
+    client = get_client()
+    if location:
+        public_id, resource_type, delivery_type = location
+        try:
+            result = client.destroy(public_id, resource_type=resource_type, type=delivery_type, invalidate=True)
+            if result.get("result") == "ok":
+                return True
+        except Exception:
+            pass
 
     base = str(path)
     if base.startswith("http://") or base.startswith("https://"):
@@ -84,23 +92,29 @@ def _delete_cloudinary_asset(path: str | None, mime_type: str | None = None) ->
     resource_types = ["image", "raw"] if (mime_type or "").lower().startswith("image/") else ["raw", "image"]
     delivery_types = ["upload", "authenticated", "private"]
 
-    for public_id in expanded:
-        if _normalize(public_id.split("/")[-1]) != target_norm:
-            continue
-        for resource_type in resource_types:
-            for delivery_type in delivery_types:
-                try:
-                    result = cloudinary.uploader.destroy(
-                        public_id,
-                        resource_type=resource_type,
-                        type=delivery_type,
-                        invalidate=True,
-                    )
-                    if result.get("result") == "ok":
-                        return True
-                except Exception:
-                    continue
-    return False
+    candidates = [
+        (public_id, resource_type, delivery_type)
+        for public_id in expanded
+        if _normalize(public_id.split("/")[-1]) == target_norm
+        for resource_type in resource_types
+        for delivery_type in delivery_types
+    ]
+    try:
+        # Probe read-only, then destroy only the asset found: other candidates may be distinct files.
+        hit = client.first_success(
+            [
+                (client.api.resource, (public_id,), {"resource_type": rtype, "type": dtype})
+                for public_id, rtype, dtype in candidates
+            ],
+            pick=lambda result: True,
+        )
+        if hit is None:
+            return False
+        public_id, rtype, dtype = candidates[hit[0]]
+        result = client.destroy(public_id, resource_type=rtype, type=dtype, invalidate=True)
+    except Exception:
+        return False
+    return result.get("result") == "ok"
 
 
 class AdminCoursesListView(APIView):
@@ -185,11 +199,9 @@ class CoursesListView(APIView):
         if _require_admin(user):
             qs = qs.order_by("-created_at")
         elif _is_teacher(user):
-            teacher_course_ids = CourseTeacher.objects.filter(teacher=user).values_list("course_id", flat=True)
-            qs = qs.filter(id__in=teacher_course_ids).order_by("-created_at")
+            qs = qs.filter(id__in=membership(user).teacher_ids).order_by("-created_at")
         else:
-            enroll_ids = Enrollment.objects.filter(user=user).values_list("course_id", flat=True)
-            qs = qs.filter(id__in=enroll_ids).order_by("-created_at")
+            qs = qs.filter(id__in=membership(user).student_ids).order_by("-created_at")
 
         if slug:
             qs = qs.filter(slug=slug)
@@ -215,9 +227,7 @@ class CoursePeopleView(APIView):
         user = request.user
         # authorization: admin/teacher of course or enrolled student
         if not _require_admin(user):
-            is_teacher = CourseTeacher.objects.filter(course=course, teacher=user).exists()
-            is_student = Enrollment.objects.filter(course=course, user=user).exists()
-            if not (is_teacher or is_student):
+            if not membership(user).member(course):
                 return Response({"error": "Forbidden"}, status=403)
 
         teacher_rows = (
@@ -265,7 +275,7 @@ class CourseCoverUploadView(APIView):
             return Response({"error": "Course not found"}, status=404)
 
         user = request.user
-        if not (_require_admin(user) or CourseTeacher.objects.filter(course=course, teacher=user).exists()):
+        if not (_require_admin(user) or teaches(user, course)):
             return Response({"error": "Forbidden"}, status=403)
 
         filename = f"course_covers/{course.id}/{file_obj.name}"
@@ -277,6 +287,60 @@ class CourseCoverUploadView(APIView):
         return Response({"ok": True, "cover_path": saved_path, "cover_url": cover_url})
 
 
+def _assignment_summary(a, publish_at=None, now=None) -> dict:
+    status, published_at = a.status, a.published_at
+    if status != "published" and publish_at and now and publish_at <= now:
+        # Due but not yet flipped by publish_scheduled: show it published without writing.
+        status, published_at = "published", publish_at
+    return {
+        "id": str(a.id),
+        "title": a.title,
+        "status": status,
+        "published_at": published_at,
+        "due_at": a.due_at,
+        "max_score": getattr(a, "max_score", None),
+    }
+
+
+def _assignment_summaries(nodes, now=None) -> dict:
+    """Summaries for the assignment nodes among `nodes`, with scheduled publishing applied read-only."""
+    publish_at = {n.assignment_id: n.publish_at for n in nodes if n.kind == "assignment" and n.assignment_id}
+    if not publish_at:
+        return {}
+    from assignments.models import Assignment
+
+    now = now or timezone.now()
+    return {
+        a.id: _assignment_summary(a, publish_at.get(a.id), now)
+        for a in Assignment.objects.filter(id__in=list(publish_at))
+    }
+
+
+def _quiz_summaries(quiz_ids) -> dict:
+    quiz_ids = [i for i in quiz_ids if i]
+    if not quiz_ids:
+        return {}
+    from mock_exams.models import MockExam
+
+    return {
+        q.id: {
+            "id": str(q.id),
+            "title": q.title,
+            "description": q.description,
+            "verbal_question_count": q.verbal_question_count,
+            "math_question_count": q.math_question_count,
+            "total_time_minutes": q.total_time_minutes,
+            "shuffle_questions": q.shuffle_questions,
+            "shuffle_choices": q.shuffle_choices,
+            "allow_retakes": q.allow_retakes,
+            "retake_limit": q.retake_limit,
+            "is_active": q.is_active,
+            "results_published": q.results_published,
+        }
+        for q in MockExam.objects.filter(id__in=quiz_ids)
+    }
+
+
 class CourseNodesListView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -293,9 +357,7 @@ class CourseNodesListView(APIView):
         user = request.user
         # auth: admin/teacher/enrolled
         if not _require_admin(user):
-            is_teacher = CourseTeacher.objects.filter(course=course, teacher=user).exists()
-            is_student = Enrollment.objects.filter(course=course, user=user).exists()
-            if not (is_teacher or is_student):
+            if not membership(user).member(course):
                 return Response({"error": "Forbidden"}, status=403)
 
         qs = CourseNode.objects.filter(course=course)
@@ -305,67 +367,74 @@ class CourseNodesListView(APIView):
             qs = qs.filter(parent_id=parent_id)
         qs = qs.order_by("name")
 
-        # Preload assignments for assignment nodes to include status/title for visibility logic
-        assignment_ids = list(qs.filter(kind="assignment").values_list("assignment_id", flat=True))
-        assignments_map = {}
-        if assignment_ids:
-            from assignments.models import Assignment
-
-            now = timezone.now()
-            assignments = {a.id: a for a in Assignment.objects.filter(id__in=assignment_ids)}
-            # Auto-publish assignments whose node publish_at has passed
-            for node in qs.filter(kind="assignment"):
-                if not node.assignment_id:
-                    continue
-                a = assignments.get(node.assignment_id)
-                if not a:
-                    continue
-                if a.status != "published" and node.publish_at and node.publish_at <= now:
-                    a.status = "published"
-                    a.published_at = now
-                    a.save(update_fields=["status", "published_at"])
-
-            for a in assignments.values():
-                assignments_map[a.id] = {
-                    "id": str(a.id),
-                    "title": a.title,
-                    "status": a.status,
-                    "published_at": a.published_at,
-                    "due_at": a.due_at,
-                    "max_score": getattr(a, "max_score", None),
-                }
-
-        # Preload quizzes for quiz nodes
-        quiz_ids = list(qs.filter(kind="quiz").values_list("quiz_id", flat=True))
-        quizzes_map = {}
-        if quiz_ids:
-            from mock_exams.models import MockExam
-
-            quizzes = {q.id: q for q in MockExam.objects.filter(id__in=quiz_ids)}
-            for q in quizzes.values():
-                quizzes_map[q.id] = {
-                    "id": str(q.id),
-                    "title": q.title,
-                    "description": q.description,
-                    "verbal_question_count": q.verbal_question_count,
-                    "math_question_count": q.math_question_count,
-                    "total_time_minutes": q.total_time_minutes,
-                    "shuffle_questions": q.shuffle_questions,
-                    "shuffle_choices": q.shuffle_choices,
-                    "allow_retakes": q.allow_retakes,
-                    "retake_limit": q.retake_limit,
-                    "is_active": q.is_active,
-                    "results_published": q.results_published,
-                }
+        nodes = list(qs)
+        # Assignment status/title for visibility logic; quizzes likewise.
+        assignments_map = _assignment_summaries(nodes)
+        quizzes_map = _quiz_summaries(n.quiz_id for n in nodes if n.kind == "quiz")
 
         data = CourseNodeSerializer(
-            qs,
+            nodes,
             many=True,
             context={"assignments_map": assignments_map, "quizzes_map": quizzes_map},
         ).data
         return Response({"ok": True, "nodes": data})
 
 
+class CourseNodesTreeView(APIView):
+    """
+    Whole course tree in one response: one node query, assembled in memory, plus
+    one batched lookup each for assignment and quiz summaries. The ETag follows
+    Course.nodes_changed_at, the signed-URL cache window and the latest
+    publish_at reached, so an unchanged tree revalidates with a 304 before any
+    of that work.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        course_id = request.query_params.get("course_id")
+        if not course_id:
+            return Response({"error": "course_id required"}, status=400)
+        try:
+            course = Course.objects.only("id", "nodes_changed_at", "updated_at").get(id=course_id)
+        except (Course.DoesNotExist, ValidationError):
+            return Response({"error": "Course not found"}, status=404)
+
+        user = request.user
+        if not _require_admin(user):
+            if not membership(user).member(course):
+                return Response({"error": "Forbidden"}, status=403)
+
+        # Signed file links expire, so the tag also rolls over with the URL cache window.
+        changed = course.nodes_changed_at or course.updated_at
+        url_window = int(time.time() // URL_CACHE_TTL)
+        # Scheduled items show as published once publish_at passes, without any write to move
+        # nodes_changed_at; the latest schedule point already reached covers that.
+        now = timezone.now()
+        reached = CourseNode.objects.filter(course=course, publish_at__lte=now).aggregate(at=Max("publish_at"))["at"]
+        raw = f"{course.id}:{changed.isoformat()}:{url_window}:{reached.isoformat() if reached else ''}"
+        etag = '"%s"' % hashlib.sha1(raw.encode()).hexdigest()
+        if etag in [t.strip() for t in request.headers.get("If-None-Match", "").split(",")]:
+            response = Response(status=304)
+        else:
+            nodes = list(CourseNode.objects.filter(course=course).order_by("name"))
+            context = {
+                "assignments_map": _assignment_summaries(nodes, now),
+                "quizzes_map": _quiz_summaries(n.quiz_id for n in nodes if n.kind == "quiz"),
+            }
+            rows = CourseNodeSerializer(nodes, many=True, context=context).data
+            by_parent = {}
+            for node, row in zip(nodes, rows):
+                row["children"] = []
+                by_parent.setdefault(node.parent_id, []).append(row)
+            for node, row in zip(nodes, rows):
+                row["children"] = by_parent.get(node.id, [])
+            response = Response({"ok": True, "course_id": str(course.id), "tree": by_parent.get(None, [])})
+        response["ETag"] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
 class CourseNodesCreateView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -388,7 +457,7 @@ class CourseNodesCreateView(APIView):
             return Response({"error": "Course not found"}, status=404)
 
         user = request.user
-        if not (_require_admin(user) or CourseTeacher.objects.filter(course=course, teacher=user).exists()):
+        if not (_require_admin(user) or teaches(user, course)):
             return Response({"error": "Forbidden"}, status=403)
 
         parent = None
@@ -425,9 +494,13 @@ class CourseNodeSetPublishedView(APIView):
             return Response({"error": "Node not found"}, status=404)
 
         user = request.user
-        if not (_require_admin(user) or CourseTeacher.objects.filter(course=node.course, teacher=user).exists()):
+        if not (_require_admin(user) or teaches(user, node.course_id)):
             return Response({"error": "Forbidden"}, status=403)
 
+        if str(request.data.get("recursive", "")).lower() in ("1", "true", "yes"):
+            node.subtree().update(published=bool(published))
+            touch_course_nodes([node.course_id])
+            return Response({"ok": True})
         node.published = bool(published)
         node.save(update_fields=["published"])
         return Response({"ok": True})
@@ -446,7 +519,7 @@ class CourseNodeSetScheduleView(APIView):
             return Response({"error": "Node not found"}, status=404)
 
         user = request.user
-        if not (_require_admin(user) or CourseTeacher.objects.filter(course=node.course, teacher=user).exists()):
+        if not (_require_admin(user) or teaches(user, node.course_id)):
             return Response({"error": "Forbidden"}, status=403)
 
         node.publish_at = publish_at or None
@@ -473,7 +546,7 @@ class CourseNodeUpdateView(APIView):
             return Response({"error": "Node not found"}, status=404)
 
         user = request.user
-        if not (_require_admin(user) or CourseTeacher.objects.filter(course=node.course, teacher=user).exists()):
+        if not (_require_admin(user) or teaches(user, node.course_id)):
             return Response({"error": "Forbidden"}, status=403)
 
         if name:
@@ -482,13 +555,15 @@ class CourseNodeUpdateView(APIView):
 
         if parent_id is not None:
             if parent_id == "":
-                node.parent = None
+                node.move_to(None)
             else:
                 try:
                     parent = CourseNode.objects.get(id=parent_id, course=node.course)
                 except CourseNode.DoesNotExist:
                     return Response({"error": "Parent not found"}, status=404)
-                node.parent = parent
+                if parent.path.startswith(node.path):
+                    return Response({"error": "Cannot move a folder into itself"}, status=400)
+                node.move_to(parent)
 
         node.save()
         return Response({"ok": True})
@@ -508,26 +583,38 @@ class CourseNodeDeleteView(APIView):
             return Response({"error": "Node not found"}, status=404)
 
         user = request.user
-        if not (_require_admin(user) or CourseTeacher.objects.filter(course=node.course, teacher=user).exists()):
+        if not (_require_admin(user) or teaches(user, node.course_id)):
             return Response({"error": "Forbidden"}, status=403)
 
-        # Clean up any stored assets for this node and its descendants
-        to_visit = [node]
-        while to_visit:
-            current = to_visit.pop()
-            if current.kind == "file" and current.storage_path:
-                _delete_cloudinary_asset(current.storage_path, current.mime_type)
-            if current.kind == "quiz" and current.quiz_id:
-                try:
-                    from mock_exams.models import MockExam
-
-                    MockExam.objects.filter(id=current.quiz_id).delete()
-                except Exception:
-                    pass
-            children = CourseNode.objects.filter(parent=current)
-            to_visit.extend(list(children))
+        subtree = node.subtree()
+        rows = list(
+            subtree.values(
+                "kind", "storage_path", "mime_type", "quiz_id", "blob_id",
+                "cloud_public_id", "cloud_resource_type", "cloud_delivery_type",
+            )
+        )
+        quiz_ids = [r["quiz_id"] for r in rows if r["kind"] == "quiz" and r["quiz_id"]]
+        if quiz_ids:
+            try:
+                from mock_exams.models import MockExam
 
-        node.delete()
+                MockExam.objects.filter(id__in=quiz_ids).delete()
+            except Exception:
+                pass
+        subtree.delete()
+        touch_course_nodes([node.course_id])
+        # Stored files go after commit, off the request thread; blob-backed ones are released and left to gc_blobs.
+        schedule_asset_cleanup(
+            [
+                (
+                    r["storage_path"],
+                    r["mime_type"],
+                    stored_location(SimpleNamespace(**r)),
+                )
+                for r in rows
+                if r["kind"] == "file" and r["storage_path"] and not r["blob_id"]
+            ]
+        )
         return Response({"ok": True})
 
 
@@ -559,7 +646,7 @@ class CourseQuizCreateView(APIView):
             return Response({"error": "Course not found"}, status=404)
 
         user = request.user
-        if not (_require_admin(user) or CourseTeacher.objects.filter(course=course, teacher=user).exists()):
+        if not (_require_admin(user) or teaches(user, course)):
             return Response({"error": "Forbidden"}, status=403)
 
         parent = None
@@ -632,10 +719,11 @@ class CourseQuizCreateView(APIView):
 
 
 class CourseNodeUploadView(APIView):
+    """Single-request upload; large files should use a chunked upload session (mediafiles.chunked)."""
+
     permission_classes = [IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser]
 
-    @transaction.atomic
     def post(self, request):
         course_id = request.data.get("course_id")
         parent_id = request.data.get("parent_id")
@@ -645,67 +733,23 @@ class CourseNodeUploadView(APIView):
 
         if not course_id or not file_obj:
             return Response({"error": "course_id and file required"}, status=400)
-        if not name:
-            name = file_obj.name
 
         try:
-            course = Course.objects.get(id=course_id)
-        except Course.DoesNotExist:
-            return Response({"error": "Course not found"}, status=404)
-
-        user = request.user
-        if not (_require_admin(user) or CourseTeacher.objects.filter(course=course, teacher=user).exists()):
-            return Response({"error": "Forbidden"}, status=403)
-
-        parent = None
-        if parent_id:
-            try:
-                parent = CourseNode.objects.get(id=parent_id, course=course)
-            except CourseNode.DoesNotExist:
-                return Response({"error": "Parent not found"}, status=404)
-
-        rel_path = f"course_files/{course.id}/{file_obj.name}"
-        mime = getattr(file_obj, "content_type", "") or ""
-        is_pdf = mime.lower() == "application/pdf" or rel_path.lower().endswith(".pdf")
-        is_image = mime.lower().startswith("image/") or rel_path.lower().endswith(
-            (".png", ".jpg", ".jpeg", ".webp", ".gif", ".svg")
-        )
-
-        if os.getenv("CLOUDINARY_URL") and (is_pdf or not is_image):
-            # Store non-images as raw/public in Cloudinary for easy access
-            public_id = f"media/{rel_path.rsplit('.', 1)[0]}"
-            result = cloudinary.uploader.upload(
+            course, parent = file_destination(request.user, course_id, parent_id)
+            node, file_url = create_file_node(
+                request.user,
+                course,
+                parent,
+                name,
+                description,
                 file_obj,
-                public_id=public_id,
-                resource_type="raw",
-                type="upload",
-                access_mode="public",
-                overwrite=True,
-            )
-            saved_path = result.get("public_id") or public_id
-            file_url, _ = cloudinary_url(
-                saved_path,
-                resource_type="raw",
-                type="upload",
-                secure=True,
-                format="pdf" if is_pdf else None,
+                getattr(file_obj, "content_type", None),
+                getattr(file_obj, "size", None),
             )
-        else:
-            saved_path = default_storage.save(rel_path, file_obj)
-            file_url = default_storage.url(saved_path)
-
-        node = CourseNode.objects.create(
-            course=course,
-            parent=parent,
-            kind="file",
-            name=name,
-            description=description,
-            storage_path=saved_path,
-            mime_type=getattr(file_obj, "content_type", None),
-            size_bytes=getattr(file_obj, "size", None),
-            created_by=user,
-            published=True,
-        )
+        except UploadRejected as e:
+            return Response({"error": e.message}, status=e.status)
+        except CloudinaryUnavailable as e:
+            return Response({"error": str(e)}, status=503)
 
         return Response(
             {
@@ -4,7 +4,8 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.db import transaction
 from django.contrib.auth import get_user_model
-from courses.models import Course, CourseTeacher, Enrollment
+from courses.membership import enrolled, teaches
+from courses.models import Course
 from .models import CourseEvent
 from .serializers import CourseEventSerializer
 
@@ -17,7 +18,7 @@ def _require_staff(user: User, course: Course) -> bool:
 
     if _require_admin(user):
         return True
-    return CourseTeacher.objects.filter(course=course, teacher=user).exists()
+    return teaches(user, course)
 
 
 class CourseEventsListView(APIView):
@@ -33,9 +34,7 @@ class CourseEventsListView(APIView):
             return Response({"error": "Course not found"}, status=404)
 
         user = request.user
-        is_teacher = CourseTeacher.objects.filter(course=course, teacher=user).exists()
-        is_student = Enrollment.objects.filter(course=course, user=user).exists()
-        if not (_require_staff(user, course) or is_student):
+        if not (_require_staff(user, course) or enrolled(user, course)):
             return Response({"error": "Forbidden"}, status=403)
 
         events = CourseEvent.objects.filter(course=course).order_by("starts_at")
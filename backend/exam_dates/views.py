@@ -3,18 +3,13 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.contrib.auth import get_user_model
 from django.utils import timezone
+from accounts.roles import is_staff
 from .models import ExamDate
 
 
 User = get_user_model()
 
 
-def is_staff(user: User) -> bool:
-    prof = getattr(user, "profile", None)
-    role = (getattr(prof, "role", None) or "").lower()
-    return user.is_superuser or getattr(prof, "is_admin", False) or role in ("admin", "teacher")
-
-
 class ExamDateListCreateView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -2,15 +2,15 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django.utils import timezone
-from courses.models import Course, CourseTeacher, Enrollment
+from accounts.roles import is_admin
+from courses.membership import enrolled, teaches
+from courses.models import Course
 from assignments.models import Assignment, Submission, Grade, OfflineUnit, OfflineGrade
 from mock_exams.models import MockExam, MockExamAttempt
 
 
 def _is_teacher_or_admin(user, course):
-    return CourseTeacher.objects.filter(course=course, teacher=user).exists() or user.is_superuser or getattr(
-        getattr(user, "profile", None), "is_admin", False
-    )
+    return teaches(user, course) or is_admin(user)
 
 
 @api_view(["GET"])
@@ -25,8 +25,8 @@ def grades_me(request):
         return Response({"error": "Course not found"}, status=404)
 
     user = request.user
-    is_teacher = CourseTeacher.objects.filter(course=course, teacher=user).exists()
-    is_student = Enrollment.objects.filter(course=course, user=user).exists()
+    is_teacher = teaches(user, course)
+    is_student = enrolled(user, course)
     is_admin = _is_teacher_or_admin(user, course)
     if not (is_teacher or is_student or is_admin):
         return Response({"error": "Forbidden"}, status=403)
@@ -0,0 +1,135 @@
+"""
+Content-addressed file storage.
+
+Uploaded course files, assignment attachments and submissions are stored once
+per distinct content: store_blob() hashes the upload (SHA-256) and, when a blob
+with that digest exists, just takes another reference to it, so re-uploading
+a worksheet to another course or re-submitting the same file never touches
+storage. New content goes through prep_portal_api.uploads.store_file() under
+blobs/<2 hex>/<digest><ext>, a name no two different files can share.
+
+Rows keep their own storage_path/cloud_* copy of the blob's location, so
+readers are unchanged. Deleting a row releases its reference (see
+mediafiles.models); gc_blobs deletes blobs nothing has referenced for a while,
+together with their files.
+"""
+import hashlib
+import os
+from collections import Counter
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+from prep_portal_api.uploads import store_file
+
+from .models import BLOB_REFERENCES, Blob
+
+BLOB_PREFIX = "blobs"
+GC_GRACE = timedelta(seconds=getattr(settings, "BLOB_GC_GRACE_SECONDS", 60 * 60))
+
+
+def content_sha256(file_obj) -> str:
+    digest = hashlib.sha256()
+    file_obj.seek(0)
+    for chunk in file_obj.chunks():
+        digest.update(chunk)
+    file_obj.seek(0)
+    return digest.hexdigest()
+
+
+def _acquire(digest: str):
+    if Blob.objects.filter(sha256=digest).update(ref_count=F("ref_count") + 1, updated_at=timezone.now()):
+        return Blob.objects.get(sha256=digest)
+    return None
+
+
+def store_blob(file_obj, mime_type: str | None = None) -> Blob:
+    """
+    The blob holding file_obj's content, with one more reference taken for the
+    caller's new row. Only content not seen before is stored; raises CloudinaryUnavailable.
+    """
+    digest = content_sha256(file_obj)
+    blob = _acquire(digest)
+    if blob is not None:
+        return blob
+
+    ext = os.path.splitext(file_obj.name or "")[1].lower()
+    saved_path, cloud_location = store_file(f"{BLOB_PREFIX}/{digest[:2]}/{digest}{ext}", file_obj, mime_type)
+    try:
+        with transaction.atomic():
+            return Blob.objects.create(
+                sha256=digest,
+                size_bytes=getattr(file_obj, "size", None),
+                mime_type=mime_type,
+                storage_path=saved_path,
+                ref_count=1,
+                **cloud_location,
+            )
+    except IntegrityError:
+        # The same content was stored concurrently; keep that copy.
+        blob = _acquire(digest)
+        if saved_path != blob.storage_path:
+            _delete_file(saved_path, cloud_location)
+        return blob
+
+
+def _delete_file(storage_path: str, cloud_location: dict):
+    if cloud_location.get("cloud_public_id"):
+        from prep_portal_api.cloudinary_client import get_client
+
+        get_client().destroy(
+            cloud_location["cloud_public_id"],
+            resource_type=cloud_location.get("cloud_resource_type") or "raw",
+            type=cloud_location.get("cloud_delivery_type") or "upload",
+            invalidate=True,
+        )
+    else:
+        default_storage.delete(storage_path)
+
+
+def _reference_counts(blob_ids=None) -> Counter:
+    counts = Counter()
+    for label in BLOB_REFERENCES:
+        rows = apps.get_model(label).objects.filter(blob__isnull=False)
+        if blob_ids is not None:
+            rows = rows.filter(blob_id__in=blob_ids)
+        for row in rows.values("blob_id").annotate(n=Count("pk")):
+            counts[row["blob_id"]] += row["n"]
+    return counts
+
+
+def recount() -> int:
+    """Rewrite ref_count from the referencing rows; returns how many blobs were off."""
+    actual = _reference_counts()
+    fixed = 0
+    for blob_id, ref_count in Blob.objects.values_list("id", "ref_count"):
+        if ref_count != actual.get(blob_id, 0):
+            Blob.objects.filter(id=blob_id).update(ref_count=actual.get(blob_id, 0), updated_at=timezone.now())
+            fixed += 1
+    return fixed
+
+
+def collect_garbage(grace: timedelta = GC_GRACE, now=None) -> int:
+    """
+    Delete blobs unreferenced for longer than `grace`, files first; returns how many.
+    Each blob is locked while it goes, so a concurrent store_blob either gets in
+    first (and keeps it) or stores the content afresh.
+    """
+    cutoff = (now or timezone.now()) - grace
+    deleted = 0
+    for blob_id in Blob.objects.filter(ref_count__lte=0, updated_at__lt=cutoff).values_list("id", flat=True):
+        with transaction.atomic():
+            blob = Blob.objects.select_for_update().filter(id=blob_id, ref_count__lte=0).first()
+            if blob is None:
+                continue
+            if _reference_counts([blob.id]):
+                # The count drifted below the real references; leave it for recount().
+                continue
+            _delete_file(blob.storage_path, blob.cloud_location)
+            blob.delete()
+            deleted += 1
+    return deleted
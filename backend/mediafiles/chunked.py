@@ -0,0 +1,250 @@
+"""
+Resumable chunked uploads.
+
+A client opens an UploadSession for a target (a course file or an assignment
+submission), appends chunks at the offset the server reports, and completes
+the session. Chunks are appended to a staging file on local disk, so a dropped
+connection only costs the chunk in flight: the client asks for the session's
+offset and carries on from there. Completing re-checks the target's rules and
+queues the staged file for a background worker, which claims the session
+("processing" -> "storing") before handing the file to storage and creating the
+target's row, so a session is finalized once even when the recovery command
+races the queue. Until then no CourseNode/Submission exists. Clients poll the
+session for the result.
+
+Targets are modules exposing PARAMS (the fields init accepts), check(user,
+params, now=None), which raises UploadRejected, and finalize(session, file_obj),
+which returns the JSON result.
+"""
+import importlib
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from prep_portal_api.uploads import UploadRejected
+
+logger = logging.getLogger(__name__)
+
+TARGETS = {
+    "course_file": "courses.uploads",
+    "submission": "assignments.uploads",
+}
+
+STAGING_DIR = getattr(settings, "CHUNKED_UPLOAD_STAGING_DIR", os.path.join(tempfile.gettempdir(), "prep_portal_uploads"))
+MAX_UPLOAD_BYTES = getattr(settings, "CHUNKED_UPLOAD_MAX_BYTES", 1024 * 1024 * 1024)
+CHUNK_BYTES = getattr(settings, "CHUNKED_UPLOAD_CHUNK_BYTES", 8 * 1024 * 1024)
+SESSION_TTL = timedelta(seconds=getattr(settings, "CHUNKED_UPLOAD_TTL_SECONDS", 24 * 60 * 60))
+
+_executor = None
+
+
+class OffsetMismatch(UploadRejected):
+    """The chunk does not start where the staged data ends; `offset` is where it does."""
+
+    def __init__(self, message: str, offset: int):
+        super().__init__(message, status=409)
+        self.offset = offset
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        workers = getattr(settings, "CHUNKED_UPLOAD_WORKERS", 2)
+        _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chunked-uploads")
+    return _executor
+
+
+def get_target(name: str):
+    if name not in TARGETS:
+        raise UploadRejected("Unknown upload target")
+    return importlib.import_module(TARGETS[name])
+
+
+def staged_path(session) -> str:
+    return os.path.join(STAGING_DIR, f"{session.id}.part")
+
+
+def _discard_staged(session):
+    try:
+        os.remove(staged_path(session))
+    except FileNotFoundError:
+        pass
+
+
+def _locked_session(session_id, user):
+    from .models import UploadSession
+
+    session = UploadSession.objects.select_for_update().filter(id=session_id, user=user).first()
+    if session is None:
+        raise UploadRejected("Upload not found", status=404)
+    return session
+
+
+def start(user, target: str, params: dict, file_name: str, size, mime_type: str | None = None):
+    """Check the target's rules and open a session with an empty staging file."""
+    from .models import UploadSession
+
+    module = get_target(target)
+    file_name = os.path.basename(str(file_name or "").replace("\\", "/")).strip()
+    if not file_name:
+        raise UploadRejected("file_name required")
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        raise UploadRejected("size required")
+    if size <= 0:
+        raise UploadRejected("File is empty")
+    if size > MAX_UPLOAD_BYTES:
+        raise UploadRejected(f"File too large (max {MAX_UPLOAD_BYTES // (1024 * 1024)} MB)", status=413)
+    params = {key: params.get(key) for key in module.PARAMS}
+    module.check(user, params)
+
+    session = UploadSession.objects.create(
+        user=user,
+        target=target,
+        params=params,
+        file_name=file_name,
+        mime_type=mime_type or None,
+        size_bytes=size,
+    )
+    os.makedirs(STAGING_DIR, exist_ok=True)
+    open(staged_path(session), "wb").close()
+    return session
+
+
+def append(session_id, user, offset, chunk):
+    """Write `chunk` (an uploaded file) at `offset`; raises OffsetMismatch unless it continues the staged data."""
+    try:
+        offset = int(offset)
+    except (TypeError, ValueError):
+        raise UploadRejected("offset required")
+    with transaction.atomic():
+        session = _locked_session(session_id, user)
+        if session.status != "uploading":
+            raise UploadRejected("Upload is no longer accepting chunks", status=409)
+        path = staged_path(session)
+        staged = os.path.getsize(path) if os.path.exists(path) else 0
+        if staged < session.received_bytes:
+            # Staging was lost (restart, other host); resume from what survived.
+            session.received_bytes = staged
+            session.save(update_fields=["received_bytes", "updated_at"])
+        if offset != session.received_bytes:
+            raise OffsetMismatch(f"Expected offset {session.received_bytes}", session.received_bytes)
+        if chunk.size > CHUNK_BYTES:
+            raise UploadRejected(f"Chunk too large (max {CHUNK_BYTES // (1024 * 1024)} MB)", status=413)
+        if offset + chunk.size > session.size_bytes:
+            raise UploadRejected("Chunk runs past the declared file size")
+
+        with open(path, "r+b" if staged else "wb") as fh:
+            # Drop any tail a failed earlier attempt left behind the committed offset.
+            fh.truncate(offset)
+            fh.seek(offset)
+            written = 0
+            for piece in chunk.chunks():
+                fh.write(piece)
+                written += len(piece)
+        session.received_bytes = offset + written
+        session.save(update_fields=["received_bytes", "updated_at"])
+    return session
+
+
+def complete(session_id, user):
+    """Queue a fully received session for storage; repeat calls (and retries after failure) are safe."""
+    with transaction.atomic():
+        session = _locked_session(session_id, user)
+        if session.status in ("processing", "storing", "complete"):
+            return session
+        if session.received_bytes != session.size_bytes:
+            raise OffsetMismatch("Upload is incomplete", session.received_bytes)
+        get_target(session.target).check(user, session.params)
+        session.status = "processing"
+        session.error = None
+        session.completed_at = timezone.now()
+        session.save(update_fields=["status", "error", "completed_at", "updated_at"])
+        if getattr(settings, "CHUNKED_UPLOADS_SYNC", False):
+            transaction.on_commit(lambda: process(session.id))
+        else:
+            transaction.on_commit(lambda: _get_executor().submit(_run_in_worker, session.id))
+    return session
+
+
+def cancel(session_id, user):
+    with transaction.atomic():
+        session = _locked_session(session_id, user)
+        if session.status in ("processing", "storing"):
+            raise UploadRejected("Upload is being stored", status=409)
+        _discard_staged(session)
+        session.delete()
+
+
+def _run_in_worker(session_id):
+    close_old_connections()
+    try:
+        process(session_id)
+    except Exception:
+        logger.exception("chunked upload %s failed", session_id)
+    finally:
+        close_old_connections()
+
+
+def claim(session_id, stale_before=None) -> bool:
+    """
+    Atomically take a queued session for storing. With `stale_before`, also
+    retake one whose claim was made before then (its worker died).
+    """
+    from .models import UploadSession
+
+    claimable = Q(status="processing")
+    if stale_before is not None:
+        claimable |= Q(status="storing", updated_at__lt=stale_before)
+    return bool(
+        UploadSession.objects.filter(claimable, id=session_id).update(status="storing", updated_at=timezone.now())
+    )
+
+
+def process(session_id, stale_before=None):
+    """
+    Claim a completed session and hand its file to its target; marks the session
+    complete or failed. Returns None when someone else holds the session.
+    """
+    from .models import UploadSession
+
+    if not claim(session_id, stale_before):
+        return None
+    session = UploadSession.objects.select_related("user").get(id=session_id)
+    try:
+        with open(staged_path(session), "rb") as fh:
+            result = get_target(session.target).finalize(session, File(fh, name=session.file_name))
+    except Exception as e:
+        if not isinstance(e, UploadRejected):
+            logger.exception("storing chunked upload %s failed", session.id)
+        # The staged file stays so the client can retry complete.
+        session.status = "failed"
+        session.error = (getattr(e, "message", None) or str(e))[:1000]
+        session.save(update_fields=["status", "error", "updated_at"])
+        return session
+
+    session.status = "complete"
+    session.result = result
+    session.save(update_fields=["status", "result", "updated_at"])
+    _discard_staged(session)
+    return session
+
+
+def purge_expired(now=None) -> int:
+    """Delete sessions (and staged files) untouched for SESSION_TTL; returns how many."""
+    from .models import UploadSession
+
+    cutoff = (now or timezone.now()) - SESSION_TTL
+    expired = list(UploadSession.objects.filter(updated_at__lt=cutoff).exclude(status__in=["processing", "storing"]))
+    for session in expired:
+        _discard_staged(session)
+    UploadSession.objects.filter(id__in=[s.id for s in expired]).delete()
+    return len(expired)
@@ -0,0 +1,148 @@
+"""
+Responsive variants for uploaded images.
+
+Upload views save the original as before, then call register_image(); the
+resize/encode work runs on a small in-process thread pool after the request's
+transaction commits. Readers look variants up by the stored URL with
+srcset_map() / attach_srcsets(), one query per response.
+"""
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+VARIANT_WIDTHS = (320, 640, 960, 1280)
+FORMATS = (
+    ("webp", "WEBP", ".webp"),
+    ("jpeg", "JPEG", ".jpg"),
+)
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+
+_executor = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        workers = getattr(settings, "IMAGE_VARIANT_WORKERS", 2)
+        _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-variants")
+    return _executor
+
+
+def register_image(saved_path: str, url: str, user=None):
+    """Record `user`'s upload and queue its variants; returns the pending ImageAsset."""
+    from .models import ImageAsset
+
+    asset = ImageAsset.objects.create(path=saved_path, url=url, uploaded_by=user)
+    if getattr(settings, "IMAGE_VARIANTS_SYNC", False):
+        transaction.on_commit(lambda: build_variants(asset.id))
+    else:
+        transaction.on_commit(lambda: _get_executor().submit(_run_in_worker, asset.id))
+    return asset
+
+
+def _run_in_worker(asset_id):
+    close_old_connections()
+    try:
+        build_variants(asset_id)
+    except Exception:
+        logger.exception("image variants failed for %s", asset_id)
+    finally:
+        close_old_connections()
+
+
+def _target_widths(original_width: int) -> list[int]:
+    # Never upscale: small originals get a single variant at their own width.
+    widths = [w for w in VARIANT_WIDTHS if w < original_width]
+    top = min(original_width, VARIANT_WIDTHS[-1])
+    if top not in widths:
+        widths.append(top)
+    return widths
+
+
+def _encode(img, fmt: str) -> bytes:
+    from PIL import Image
+
+    buf = io.BytesIO()
+    if fmt == "JPEG":
+        if img.mode in ("RGBA", "LA", "P"):
+            rgba = img.convert("RGBA")
+            flat = Image.new("RGB", rgba.size, (255, 255, 255))
+            flat.paste(rgba, mask=rgba.split()[-1])
+            img = flat
+        elif img.mode != "RGB":
+            img = img.convert("RGB")
+        img.save(buf, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    else:
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "A" in img.mode or img.mode == "P" else "RGB")
+        img.save(buf, "WEBP", quality=WEBP_QUALITY, method=4)
+    return buf.getvalue()
+
+
+def build_variants(asset_id):
+    """Resize and encode one asset's variants; marks the asset ready or failed."""
+    from PIL import Image, ImageOps
+
+    from .models import ImageAsset
+
+    try:
+        asset = ImageAsset.objects.get(id=asset_id)
+    except ImageAsset.DoesNotExist:
+        return None
+
+    try:
+        with default_storage.open(asset.path, "rb") as fh:
+            img = Image.open(fh)
+            img.load()
+        img = ImageOps.exif_transpose(img)
+        root = os.path.splitext(asset.path)[0]
+        variants = []
+        for width in _target_widths(img.width):
+            height = max(1, round(img.height * width / img.width))
+            resized = img if width == img.width else img.resize((width, height), Image.LANCZOS)
+            for name, fmt, ext in FORMATS:
+                saved = default_storage.save(f"{root}_w{width}{ext}", ContentFile(_encode(resized, fmt)))
+                variants.append({"format": name, "width": width, "path": saved, "url": default_storage.url(saved)})
+    except Exception as e:
+        # Unsupported formats (e.g. SVG) just keep serving the original.
+        asset.status = "failed"
+        asset.error = str(e)[:1000]
+        asset.save(update_fields=["status", "error", "updated_at"])
+        return asset
+
+    asset.width, asset.height = img.width, img.height
+    asset.variants = variants
+    asset.status = "ready"
+    asset.error = None
+    asset.save(update_fields=["width", "height", "variants", "status", "error", "updated_at"])
+    return asset
+
+
+def srcset_map(urls, request=None) -> dict:
+    """{url: srcset} for every url with ready variants (latest upload wins)."""
+    from .models import ImageAsset
+
+    urls = {u for u in urls if u}
+    if not urls:
+        return {}
+    result = {}
+    for asset in ImageAsset.objects.filter(url__in=urls, status="ready").order_by("created_at"):
+        result[asset.url] = asset.srcset(request)
+    return result
+
+
+def attach_srcsets(payloads: list[dict], request=None, key: str = "image_url") -> list[dict]:
+    """Return payloads with `image_srcset` added where variants exist; others pass through untouched."""
+    found = srcset_map((p.get(key) for p in payloads), request)
+    if not found:
+        return payloads
+    return [{**p, "image_srcset": found[p[key]]} if p.get(key) in found else p for p in payloads]
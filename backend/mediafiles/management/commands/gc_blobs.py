@@ -0,0 +1,28 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from mediafiles.blobs import GC_GRACE, collect_garbage, recount
+
+
+class Command(BaseCommand):
+    help = "Delete stored blobs (and their files) that no course file, attachment or submission references."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--recount",
+            action="store_true",
+            help="First rebuild reference counts from the referencing rows.",
+        )
+        parser.add_argument(
+            "--grace-minutes",
+            type=int,
+            default=int(GC_GRACE.total_seconds() // 60),
+            help="Keep unreferenced blobs this long in case the same content is uploaded again.",
+        )
+
+    def handle(self, *args, **options):
+        if options["recount"]:
+            fixed = recount()
+            self.stdout.write(f"Corrected {fixed} reference counts.")
+        deleted = collect_garbage(timedelta(minutes=options["grace_minutes"]))
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} unreferenced blobs."))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from mediafiles.images import build_variants
+from mediafiles.models import ImageAsset
+
+
+class Command(BaseCommand):
+    help = "Build image variants for pending uploads (e.g. queued work lost to a restart)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--retry-failed", action="store_true", help="Also retry assets that failed before.")
+
+    def handle(self, *args, **options):
+        statuses = ["pending", "failed"] if options["retry_failed"] else ["pending"]
+        ready = failed = 0
+        for asset_id in ImageAsset.objects.filter(status__in=statuses).values_list("id", flat=True):
+            asset = build_variants(asset_id)
+            if asset and asset.status == "ready":
+                ready += 1
+            else:
+                failed += 1
+        self.stdout.write(self.style.SUCCESS(f"Processed {ready + failed} images ({ready} ready, {failed} failed)."))
@@ -0,0 +1,43 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from mediafiles.chunked import process, purge_expired
+from mediafiles.models import UploadSession
+
+
+class Command(BaseCommand):
+    help = (
+        "Store completed chunked uploads whose queued work was lost (e.g. to a restart) "
+        "and delete sessions that were abandoned."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--stale-minutes",
+            type=int,
+            default=15,
+            help=(
+                "Only pick up sessions queued or claimed at least this long ago; keep it above "
+                "CLOUDINARY_UPLOAD_TIMEOUT so live workers are not overtaken."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(minutes=options["stale_minutes"])
+        stored = failed = 0
+        # Queued work that never started, and claims whose worker died; process() claims
+        # each atomically, so a worker that is still running keeps its session.
+        stale = UploadSession.objects.filter(status__in=["processing", "storing"], updated_at__lt=cutoff)
+        for session_id in stale.values_list("id", flat=True):
+            session = process(session_id, stale_before=cutoff)
+            if session is None:
+                continue
+            if session.status == "complete":
+                stored += 1
+            else:
+                failed += 1
+        purged = purge_expired()
+        self.stdout.write(
+            self.style.SUCCESS(f"Processed {stored + failed} uploads ({stored} stored, {failed} failed); purged {purged}.")
+        )
@@ -0,0 +1,39 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:00
+
+import django.core.serializers.json
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mediafiles', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('target', models.CharField(max_length=30)),
+                ('params', models.JSONField(blank=True, default=dict)),
+                ('file_name', models.CharField(max_length=255)),
+                ('mime_type', models.CharField(blank=True, max_length=150, null=True)),
+                ('size_bytes', models.BigIntegerField()),
+                ('received_bytes', models.BigIntegerField(default=0)),
+                ('status', models.CharField(choices=[('uploading', 'Uploading'), ('processing', 'Processing'), ('complete', 'Complete'), ('failed', 'Failed')], default='uploading', max_length=12)),
+                ('result', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'updated_at'], name='mediafiles__status_faeeab_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:00
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mediafiles', '0002_uploadsession'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Blob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('size_bytes', models.BigIntegerField(blank=True, null=True)),
+                ('mime_type', models.CharField(blank=True, max_length=150, null=True)),
+                ('storage_path', models.TextField()),
+                ('cloud_public_id', models.CharField(blank=True, max_length=512, null=True)),
+                ('cloud_resource_type', models.CharField(blank=True, max_length=20, null=True)),
+                ('cloud_delivery_type', models.CharField(blank=True, max_length=20, null=True)),
+                ('ref_count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['ref_count', 'updated_at'], name='mediafiles__ref_cou_ad49e3_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mediafiles', '0003_blob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadsession',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='uploadsession',
+            name='status',
+            field=models.CharField(choices=[('uploading', 'Uploading'), ('processing', 'Processing'), ('storing', 'Storing'), ('complete', 'Complete'), ('failed', 'Failed')], default='uploading', max_length=12),
+        ),
+    ]
@@ -1,3 +1,167 @@
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.db.models import F
+from django.db.models.signals import post_delete
+from django.utils import timezone
+import uuid
 
-# Create your models here.
+# Models whose `blob` FK counts towards Blob.ref_count.
+BLOB_REFERENCES = ("courses.CourseNode", "assignments.AssignmentFile", "assignments.Submission")
+
+
+class ImageAsset(models.Model):
+    """An uploaded image plus the resized WebP/JPEG variants built for it off the request path."""
+
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("ready", "Ready"),
+        ("failed", "Failed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    path = models.CharField(max_length=500)
+    # Exactly the URL string the upload endpoint handed out / stored, used for lookups.
+    url = models.CharField(max_length=500, db_index=True)
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    variants = models.JSONField(default=list, blank=True)  # [{format, width, path, url}]
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+    error = models.TextField(blank=True, null=True)
+    # Only the uploader (and admins) may poll the asset; null for assets from before this was recorded.
+    uploaded_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "created_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.path} ({self.status})"
+
+    def srcset(self, request=None) -> dict:
+        """{"webp": "url 320w, ...", "jpeg": "..."}; empty until variants are ready."""
+        if self.status != "ready":
+            return {}
+        out: dict[str, list[str]] = {}
+        for v in sorted(self.variants or [], key=lambda v: v["width"]):
+            url = v["url"]
+            if request is not None and not str(url).startswith("http"):
+                url = request.build_absolute_uri(url)
+            out.setdefault(v["format"], []).append(f"{url} {v['width']}w")
+        return {fmt: ", ".join(parts) for fmt, parts in out.items()}
+
+    def as_json(self, request=None) -> dict:
+        return {
+            "id": str(self.id),
+            "status": self.status,
+            "width": self.width,
+            "height": self.height,
+            "srcset": self.srcset(request),
+        }
+
+
+class Blob(models.Model):
+    """
+    One stored file, keyed by the SHA-256 of its content. Course files, assignment
+    attachments and submissions point at a blob instead of owning a copy;
+    ref_count is how many rows do, and gc_blobs removes blobs nothing references.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    sha256 = models.CharField(max_length=64, unique=True)
+    size_bytes = models.BigIntegerField(blank=True, null=True)
+    mime_type = models.CharField(max_length=150, blank=True, null=True)
+    storage_path = models.TextField()
+    cloud_public_id = models.CharField(max_length=512, blank=True, null=True)
+    cloud_resource_type = models.CharField(max_length=20, blank=True, null=True)
+    cloud_delivery_type = models.CharField(max_length=20, blank=True, null=True)
+    ref_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["ref_count", "updated_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.sha256[:12]} x{self.ref_count}"
+
+    @property
+    def cloud_location(self) -> dict:
+        """The CourseNode cloud_* fields for this blob; empty for default storage."""
+        if not self.cloud_public_id:
+            return {}
+        return {
+            "cloud_public_id": self.cloud_public_id,
+            "cloud_resource_type": self.cloud_resource_type,
+            "cloud_delivery_type": self.cloud_delivery_type,
+        }
+
+
+def _release_blob(sender, instance, **kwargs):
+    # Fires for cascades and queryset deletes too, so counts follow every way a row can go.
+    if instance.blob_id:
+        Blob.objects.filter(id=instance.blob_id).update(ref_count=F("ref_count") - 1, updated_at=timezone.now())
+
+
+for _label in BLOB_REFERENCES:
+    post_delete.connect(_release_blob, sender=_label, dispatch_uid=f"release_blob:{_label}")
+
+
+class UploadSession(models.Model):
+    """
+    A resumable upload: chunks are appended to a staging file on local disk, and
+    completing the session hands the file to its target (course file, submission)
+    on a background worker, which creates the target's row and records the result.
+    """
+
+    STATUS_CHOICES = [
+        ("uploading", "Uploading"),
+        ("processing", "Processing"),
+        # Claimed by a worker that is handing the file to its target.
+        ("storing", "Storing"),
+        ("complete", "Complete"),
+        ("failed", "Failed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="upload_sessions")
+    target = models.CharField(max_length=30)
+    params = models.JSONField(default=dict, blank=True)
+    file_name = models.CharField(max_length=255)
+    mime_type = models.CharField(max_length=150, blank=True, null=True)
+    size_bytes = models.BigIntegerField()
+    received_bytes = models.BigIntegerField(default=0)
+    status = models.CharField(max_length=12, choices=STATUS_CHOICES, default="uploading")
+    result = models.JSONField(blank=True, null=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(blank=True, null=True)
+    # When the client completed the upload; targets judge deadlines by it, not by when a worker got to it.
+    completed_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "updated_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.file_name} ({self.status})"
+
+    def as_json(self) -> dict:
+        return {
+            "id": str(self.id),
+            "target": self.target,
+            "file_name": self.file_name,
+            "size": self.size_bytes,
+            "offset": self.received_bytes,
+            "status": self.status,
+            "error": self.error,
+            "result": self.result,
+        }
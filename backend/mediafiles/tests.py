@@ -1,3 +1,177 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from courses.models import Course, CourseNode, CourseTeacher
+from . import blobs, chunked
+from .models import Blob, UploadSession
+
+
+class StorageTestCase(TestCase):
+    """Local media root and staging dir per test, and no Cloudinary."""
+
+    def setUp(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        for context in (
+            override_settings(MEDIA_ROOT=tmp, CHUNKED_UPLOADS_SYNC=True),
+            mock.patch.object(chunked, "STAGING_DIR", f"{tmp}/staging"),
+            mock.patch.dict("os.environ", {"CLOUDINARY_URL": ""}),
+        ):
+            self.enterContext(context)
+
+
+class ChunkedUploadTests(StorageTestCase):
+    def setUp(self):
+        super().setUp()
+        self.teacher = User.objects.create_user(username="t", email="t@x.io", password="pw")
+        self.course = Course.objects.create(slug="c", title="C")
+        CourseTeacher.objects.create(course=self.course, teacher=self.teacher)
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+
+    def init(self, size=10):
+        res = self.client.post(
+            "/api/uploads/init/",
+            {"target": "course_file", "course_id": str(self.course.id), "name": "notes", "file_name": "n.txt", "size": size},
+            format="json",
+        )
+        self.assertEqual(res.status_code, 201, res.data)
+        return res.data["upload"]["id"]
+
+    def send(self, upload_id, offset, data: bytes):
+        return self.client.post(
+            f"/api/uploads/{upload_id}/chunk/",
+            {"offset": offset, "chunk": SimpleUploadedFile("chunk", data)},
+            format="multipart",
+        )
+
+    def test_chunks_must_continue_at_the_server_offset(self):
+        upload_id = self.init()
+        self.assertEqual(self.send(upload_id, 0, b"hello").data["upload"]["offset"], 5)
+        res = self.send(upload_id, 0, b"hello")
+        self.assertEqual(res.status_code, 409)
+        self.assertEqual(res.data["offset"], 5)
+        self.assertEqual(self.send(upload_id, 5, b"world").data["upload"]["offset"], 10)
+
+    def test_chunk_past_declared_size_is_rejected(self):
+        upload_id = self.init(size=4)
+        self.assertEqual(self.send(upload_id, 0, b"hello").status_code, 400)
+
+    def test_incomplete_upload_cannot_complete(self):
+        upload_id = self.init()
+        self.send(upload_id, 0, b"hello")
+        res = self.client.post(f"/api/uploads/{upload_id}/complete/")
+        self.assertEqual(res.status_code, 409)
+        self.assertEqual(res.data["offset"], 5)
+
+    def test_complete_creates_the_node_once(self):
+        upload_id = self.init()
+        self.send(upload_id, 0, b"helloworld")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f"/api/uploads/{upload_id}/complete/")
+        res = self.client.get(f"/api/uploads/{upload_id}/")
+        self.assertEqual(res.data["upload"]["status"], "complete")
+        self.assertEqual(res.data["upload"]["result"]["node"]["name"], "notes")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post(f"/api/uploads/{upload_id}/complete/").status_code, 200)
+        self.assertEqual(CourseNode.objects.filter(kind="file").count(), 1)
+
+    def test_claimed_session_is_processed_once(self):
+        upload_id = self.init()
+        self.send(upload_id, 0, b"helloworld")
+        with override_settings(CHUNKED_UPLOADS_SYNC=False), mock.patch.object(chunked, "_get_executor"):
+            self.client.post(f"/api/uploads/{upload_id}/complete/")
+        self.assertTrue(chunked.claim(upload_id))
+        # The queued worker and a recovery run both find it taken.
+        self.assertIsNone(chunked.process(upload_id))
+        self.assertIsNone(chunked.process(upload_id, stale_before=timezone.now() - timedelta(minutes=15)))
+        # A claim older than the cutoff belongs to a dead worker and is retaken.
+        session = chunked.process(upload_id, stale_before=timezone.now() + timedelta(seconds=1))
+        self.assertEqual(session.status, "complete")
+        self.assertEqual(CourseNode.objects.filter(kind="file").count(), 1)
+
+    def test_submission_deadline_judged_at_completion(self):
+        from assignments.models import Assignment
+        from courses.models import Enrollment
+
+        student = User.objects.create_user(username="s", email="s@x.io", password="pw")
+        Enrollment.objects.create(course=self.course, user=student)
+        assignment = Assignment.objects.create(
+            course=self.course, title="A", status="published", due_at=timezone.now() + timedelta(minutes=5)
+        )
+        session = chunked.start(student, "submission", {"assignment_id": str(assignment.id)}, "a.txt", 3)
+        chunked.append(session.id, student, 0, SimpleUploadedFile("chunk", b"abc"))
+        with override_settings(CHUNKED_UPLOADS_SYNC=False), mock.patch.object(chunked, "_get_executor"):
+            chunked.complete(session.id, student)
+        Assignment.objects.filter(id=assignment.id).update(due_at=timezone.now() - timedelta(minutes=1))
+        UploadSession.objects.filter(id=session.id).update(completed_at=timezone.now() - timedelta(minutes=2))
+        self.assertEqual(chunked.process(session.id).status, "complete")
+
+
+class ImageAssetViewTests(TestCase):
+    def test_only_the_uploader_and_admins_can_poll(self):
+        from .models import ImageAsset
+
+        owner = User.objects.create_user(username="o", email="o@x.io", password="pw")
+        other = User.objects.create_user(username="x", email="x@x.io", password="pw")
+        admin = User.objects.create_superuser(username="a", email="a@x.io", password="pw")
+        asset = ImageAsset.objects.create(path="p.png", url="/media/p.png", uploaded_by=owner)
+        client = APIClient()
+        for user, expected in ((owner, 200), (other, 404), (admin, 200)):
+            client.force_authenticate(user)
+            self.assertEqual(client.get(f"/api/media/images/{asset.id}/").status_code, expected, user.email)
+
+
+class BlobTests(StorageTestCase):
+    def setUp(self):
+        super().setUp()
+        self.course = Course.objects.create(slug="c", title="C")
+
+    def add_file(self, data: bytes, name="a.txt"):
+        from courses.uploads import create_file_node
+
+        node, _ = create_file_node(None, self.course, None, name, None, SimpleUploadedFile(name, data))
+        return node
+
+    def test_same_content_is_stored_once(self):
+        from django.core.files.storage import default_storage
+
+        a = self.add_file(b"worksheet")
+        b = self.add_file(b"worksheet", name="copy.txt")
+        c = self.add_file(b"other")
+        self.assertEqual(a.blob_id, b.blob_id)
+        self.assertNotEqual(a.blob_id, c.blob_id)
+        self.assertEqual(Blob.objects.get(id=a.blob_id).ref_count, 2)
+        self.assertTrue(default_storage.exists(a.storage_path))
+
+    def test_deletes_release_and_gc_waits_for_the_grace_period(self):
+        from django.core.files.storage import default_storage
+
+        a = self.add_file(b"worksheet")
+        b = self.add_file(b"worksheet")
+        a.delete()
+        self.assertEqual(Blob.objects.get(id=b.blob_id).ref_count, 1)
+        CourseNode.objects.filter(id=b.id).delete()
+        self.assertEqual(Blob.objects.get(id=b.blob_id).ref_count, 0)
+
+        self.assertEqual(blobs.collect_garbage(), 0)
+        self.assertEqual(blobs.collect_garbage(now=timezone.now() + blobs.GC_GRACE + timedelta(seconds=1)), 1)
+        self.assertFalse(Blob.objects.exists())
+        self.assertFalse(default_storage.exists(b.storage_path))
+
+    def test_referenced_blob_survives_a_drifted_count(self):
+        node = self.add_file(b"worksheet")
+        Blob.objects.filter(id=node.blob_id).update(ref_count=0)
+        self.assertEqual(blobs.collect_garbage(grace=timedelta(0), now=timezone.now() + timedelta(seconds=1)), 0)
+        self.assertEqual(blobs.recount(), 1)
+        self.assertEqual(Blob.objects.get(id=node.blob_id).ref_count, 1)
+        # Re-uploading revives the existing blob rather than storing again.
+        self.assertEqual(self.add_file(b"worksheet").blob_id, node.blob_id)
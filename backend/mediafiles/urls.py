@@ -0,0 +1,10 @@
+from django.urls import path
+from .views import ImageAssetView, UploadChunkView, UploadCompleteView, UploadInitView, UploadSessionView
+
+urlpatterns = [
+    path("media/images/<uuid:pk>/", ImageAssetView.as_view(), name="media_image_asset"),
+    path("uploads/init/", UploadInitView.as_view(), name="uploads_init"),
+    path("uploads/<uuid:pk>/", UploadSessionView.as_view(), name="uploads_session"),
+    path("uploads/<uuid:pk>/chunk/", UploadChunkView.as_view(), name="uploads_chunk"),
+    path("uploads/<uuid:pk>/complete/", UploadCompleteView.as_view(), name="uploads_complete"),
+]
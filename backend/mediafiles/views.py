@@ -1,3 +1,107 @@
-from django.shortcuts import render
+from rest_framework import permissions
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from accounts.roles import is_admin
+from prep_portal_api.uploads import UploadRejected
 
-# Create your views here.
+from . import chunked
+from .models import ImageAsset, UploadSession
+
+
+class ImageAssetView(APIView):
+    """Poll variant processing for your own upload; returns the srcset once ready."""
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk):
+        assets = ImageAsset.objects.all()
+        if not is_admin(request.user):
+            assets = assets.filter(uploaded_by=request.user)
+        try:
+            asset = assets.get(id=pk)
+        except ImageAsset.DoesNotExist:
+            return Response({"error": "Not found"}, status=404)
+        return Response({"ok": True, "image": asset.as_json(request)})
+
+
+def _rejected(e: UploadRejected) -> Response:
+    body = {"error": e.message}
+    if isinstance(e, chunked.OffsetMismatch):
+        body["offset"] = e.offset
+    return Response(body, status=e.status)
+
+
+class UploadInitView(APIView):
+    """
+    Open a chunked upload: target ("course_file" or "submission"), file_name,
+    size, mime_type, plus the target's own fields (course_id/parent_id/name/
+    description, or assignment_id). Access is checked now and again on complete.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [JSONParser, FormParser, MultiPartParser]
+
+    def post(self, request):
+        try:
+            session = chunked.start(
+                request.user,
+                request.data.get("target"),
+                request.data,
+                request.data.get("file_name"),
+                request.data.get("size"),
+                request.data.get("mime_type"),
+            )
+        except UploadRejected as e:
+            return _rejected(e)
+        return Response({"ok": True, "upload": session.as_json(), "chunk_size": chunked.CHUNK_BYTES}, status=201)
+
+
+class UploadChunkView(APIView):
+    """Append the `chunk` file at `offset`; a 409 carries the offset to resume from."""
+
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [MultiPartParser, FormParser]
+
+    def post(self, request, pk):
+        chunk = request.data.get("chunk")
+        if not chunk:
+            return Response({"error": "chunk required"}, status=400)
+        try:
+            session = chunked.append(pk, request.user, request.data.get("offset"), chunk)
+        except UploadRejected as e:
+            return _rejected(e)
+        return Response({"ok": True, "upload": session.as_json()})
+
+
+class UploadCompleteView(APIView):
+    """Queue a fully received upload for storage; poll UploadSessionView for the result."""
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, pk):
+        try:
+            session = chunked.complete(pk, request.user)
+        except UploadRejected as e:
+            return _rejected(e)
+        session.refresh_from_db()
+        return Response({"ok": True, "upload": session.as_json()}, status=200 if session.status == "complete" else 202)
+
+
+class UploadSessionView(APIView):
+    """GET: offset, status and (once complete) the created node/submission. DELETE: abandon the upload."""
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk):
+        session = UploadSession.objects.filter(id=pk, user=request.user).first()
+        if session is None:
+            return Response({"error": "Not found"}, status=404)
+        return Response({"ok": True, "upload": session.as_json()})
+
+    def delete(self, request, pk):
+        try:
+            chunked.cancel(pk, request.user)
+        except UploadRejected as e:
+            return _rejected(e)
+        return Response({"ok": True})
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mock_exams', '0006_mockexam_question_overrides'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mockexamattempt',
+            name='question_revisions',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
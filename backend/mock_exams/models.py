@@ -79,6 +79,8 @@ class MockExamAttempt(models.Model):
     answers = models.JSONField(default=dict)
     question_order = models.JSONField(default=list)
     choice_order = models.JSONField(default=dict)
+    # question id -> QuestionRevision id, frozen when the attempt starts
+    question_revisions = models.JSONField(default=dict, blank=True)
     score_verbal = models.IntegerField(default=0)
     score_math = models.IntegerField(default=0)
     total_score = models.IntegerField(default=0)
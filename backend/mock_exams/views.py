@@ -9,145 +9,26 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from accounts.models import User, Profile
-from question_bank.models import Question
+from accounts.roles import is_admin as _is_admin, is_staff as _is_staff
+from mediafiles.images import attach_srcsets
+from prep_portal_api.choices import order_choices
+from question_bank.models import Question, QuestionRevision, question_staff_payload, question_student_payload
 from .models import MockExam, MockExamAttempt, MockExamAccess
 
 
-def _is_staff(user: User) -> bool:
-    prof = getattr(user, "profile", None)
-    role = (getattr(prof, "role", None) or "").lower()
-    is_admin = getattr(prof, "is_admin", False)
-    return user.is_superuser or is_admin or role in ("admin", "teacher")
-
-
 def _serialize_question_for_student(q: Question, choice_order: list | None = None):
-    choices = []
-    raw_choices = q.choices or []
-    if choice_order:
-        if all(isinstance(i, int) for i in choice_order):
-            ordered = [i for i in choice_order if 0 <= i < len(raw_choices)]
-            used = set(ordered)
-            for idx, raw_idx in enumerate(ordered):
-                c = raw_choices[raw_idx]
-                label = chr(65 + idx)
-                choices.append({"label": label, "content": c.get("content")})
-            for raw_idx, c in enumerate(raw_choices):
-                if raw_idx in used:
-                    continue
-                label = chr(65 + len(choices))
-                choices.append({"label": label, "content": c.get("content")})
-        else:
-            by_label = {c.get("label"): c for c in raw_choices if c.get("label")}
-            used = set()
-            for idx, lbl in enumerate(choice_order):
-                c = by_label.get(lbl)
-                if not c:
-                    continue
-                fallback = chr(65 + idx)
-                choices.append({"label": c.get("label") or fallback, "content": c.get("content")})
-                used.add(lbl)
-            for c in raw_choices:
-                label = c.get("label") or chr(65 + len(choices))
-                if c.get("label") and c.get("label") in used:
-                    continue
-                choices.append({"label": label, "content": c.get("content")})
-    else:
-        for idx, c in enumerate(raw_choices):
-            label = c.get("label") or chr(65 + idx)
-            choices.append({"label": label, "content": c.get("content")})
-
-    return {
-        "id": str(q.id),
-        "subject": q.subject,
-        "topic": q.topic,
-        "subtopic": q.subtopic,
-        "stem": q.stem,
-        "passage": q.passage,
-        "choices": choices,
-        "is_open_ended": q.is_open_ended,
-        "image_url": q.image_url,
-        "difficulty": q.difficulty,
-    }
+    # Saved questions carry a pre-rendered blob; overridden copies are rendered on the fly.
+    payload = getattr(q, "student_payload", None) or question_student_payload(q)
+    if not choice_order:
+        return payload
+    return {**payload, "choices": order_choices(payload["choices"], q.choices, choice_order)}
 
 
 def _serialize_question_for_review(q: Question, choice_order: list | None = None):
-    choices = []
-    raw_choices = q.choices or []
-    if choice_order:
-        if all(isinstance(i, int) for i in choice_order):
-            ordered = [i for i in choice_order if 0 <= i < len(raw_choices)]
-            used = set(ordered)
-            for idx, raw_idx in enumerate(ordered):
-                c = raw_choices[raw_idx]
-                label = chr(65 + idx)
-                choices.append(
-                    {
-                        "label": label,
-                        "content": c.get("content"),
-                        "is_correct": bool(c.get("is_correct")),
-                    }
-                )
-            for raw_idx, c in enumerate(raw_choices):
-                if raw_idx in used:
-                    continue
-                label = chr(65 + len(choices))
-                choices.append(
-                    {
-                        "label": label,
-                        "content": c.get("content"),
-                        "is_correct": bool(c.get("is_correct")),
-                    }
-                )
-        else:
-            by_label = {c.get("label"): c for c in raw_choices if c.get("label")}
-            used = set()
-            for idx, lbl in enumerate(choice_order):
-                c = by_label.get(lbl)
-                if not c:
-                    continue
-                fallback = chr(65 + idx)
-                choices.append(
-                    {
-                        "label": c.get("label") or fallback,
-                        "content": c.get("content"),
-                        "is_correct": bool(c.get("is_correct")),
-                    }
-                )
-                used.add(lbl)
-            for c in raw_choices:
-                label = c.get("label")
-                if label and label in used:
-                    continue
-                choices.append(
-                    {
-                        "label": label or chr(65 + len(choices)),
-                        "content": c.get("content"),
-                        "is_correct": bool(c.get("is_correct")),
-                    }
-                )
-    else:
-        for idx, c in enumerate(raw_choices):
-            choices.append(
-                {
-                    "label": c.get("label") or chr(65 + idx),
-                    "content": c.get("content"),
-                    "is_correct": bool(c.get("is_correct")),
-                }
-            )
-
-    return {
-        "id": str(q.id),
-        "subject": q.subject,
-        "topic": q.topic,
-        "subtopic": q.subtopic,
-        "stem": q.stem,
-        "passage": q.passage,
-        "choices": choices,
-        "is_open_ended": q.is_open_ended,
-        "correct_answer": q.correct_answer,
-        "image_url": q.image_url,
-        "difficulty": q.difficulty,
-    }
+    payload = getattr(q, "staff_payload", None) or question_staff_payload(q)
+    if not choice_order:
+        return payload
+    return {**payload, "choices": order_choices(payload["choices"], q.choices, choice_order)}
 
 
 def _apply_override(q: Question, override: dict | None):
@@ -253,6 +134,33 @@ def _build_question_map_for_exam(exam: MockExam):
     return {str(q.id): _apply_override(q, overrides.get(str(q.id))) for q in qs}
 
 
+def _pinned_revisions(question_ids) -> dict:
+    """question id -> current revision id, recorded on new attempts."""
+    rows = Question.objects.filter(id__in=question_ids).values_list("id", "current_revision_id")
+    return {str(qid): str(rev_id) for qid, rev_id in rows if rev_id}
+
+
+def _revision_question_map(revision_ids, overrides: dict) -> dict:
+    """revision id -> question-shaped snapshot with exam overrides applied."""
+    result = {}
+    for rev in QuestionRevision.objects.filter(id__in=list(revision_ids)):
+        q = rev.as_question()
+        result[str(rev.id)] = _apply_override(q, overrides.get(str(q.id)))
+    return result
+
+
+def _attempt_question_map(attempt: MockExamAttempt, overrides: dict) -> dict:
+    """Questions as this attempt saw them: pinned revisions, falling back to live rows for older attempts."""
+    pinned = attempt.question_revisions or {}
+    by_rev = _revision_question_map(pinned.values(), overrides) if pinned else {}
+    qmap = {qid: by_rev[rev_id] for qid, rev_id in pinned.items() if rev_id in by_rev}
+    missing = [qid for qid in attempt.question_order or [] if str(qid) not in qmap]
+    if missing:
+        for q in Question.objects.filter(id__in=missing):
+            qmap[str(q.id)] = _apply_override(q, overrides.get(str(q.id)))
+    return qmap
+
+
 def _validate_counts(verbal_count: int, math_count: int):
     if verbal_count < 0 or math_count < 0:
         return "Question counts must be 0 or greater"
@@ -385,9 +293,7 @@ class MockExamListView(APIView):
     def get(self, request):
         user = request.user
         staff = _is_staff(user)
-        prof = getattr(user, "profile", None)
-        role = (getattr(prof, "role", None) or "").lower()
-        is_admin = user.is_superuser or getattr(prof, "is_admin", False) or role == "admin"
+        is_admin = _is_admin(user)
         course_id = request.query_params.get("course_id")
 
         exams = MockExam.objects.select_related("course").order_by("-created_at")
@@ -397,9 +303,9 @@ class MockExamListView(APIView):
         for exam in exams:
             if staff and not is_admin:
                 if exam.course_id:
-                    from courses.models import CourseTeacher
+                    from courses.membership import teaches
 
-                    if not CourseTeacher.objects.filter(course_id=exam.course_id, teacher=user).exists():
+                    if not teaches(user, exam.course_id):
                         continue
                 else:
                     if exam.created_by_id != user.id:
@@ -409,9 +315,9 @@ class MockExamListView(APIView):
             has_access = True
             if not staff:
                 if exam.course_id:
-                    from courses.models import Enrollment
+                    from courses.membership import enrolled
 
-                    if not Enrollment.objects.filter(course_id=exam.course_id, user=user).exists():
+                    if not enrolled(user, exam.course_id):
                         continue
                 if access_qs.exists():
                     has_access = access_qs.filter(student=user).exists()
@@ -509,14 +415,12 @@ class MockExamReviewView(APIView):
             except MockExamAttempt.DoesNotExist:
                 return Response({"error": "Not found"}, status=404)
             exam = attempt.mock_exam
-            prof = getattr(user, "profile", None)
-            role = (getattr(prof, "role", None) or "").lower()
-            is_admin = user.is_superuser or getattr(prof, "is_admin", False) or role == "admin"
+            is_admin = _is_admin(user)
             if not is_admin:
                 if exam.course_id:
-                    from courses.models import CourseTeacher
+                    from courses.membership import teaches
 
-                    if not CourseTeacher.objects.filter(course_id=exam.course_id, teacher=user).exists():
+                    if not teaches(user, exam.course_id):
                         return Response({"error": "Forbidden"}, status=403)
                 elif exam.created_by_id != user.id:
                     return Response({"error": "Forbidden"}, status=403)
@@ -538,16 +442,13 @@ class MockExamReviewView(APIView):
             if not attempt:
                 return Response({"error": "No submitted attempt"}, status=404)
 
-        overrides = exam.question_overrides or {}
-        questions = Question.objects.filter(id__in=attempt.question_order)
-        by_id = {str(q.id): q for q in questions}
+        by_id = _attempt_question_map(attempt, exam.question_overrides or {})
         payload = []
         for qid in attempt.question_order:
             q = by_id.get(str(qid))
             if not q:
                 continue
-            q2 = _apply_override(q, overrides.get(str(q.id)))
-            payload.append(_serialize_question_for_review(q2, attempt.choice_order.get(str(q.id))))
+            payload.append(_serialize_question_for_review(q, attempt.choice_order.get(str(q.id))))
 
         return Response(
             {
@@ -562,7 +463,7 @@ class MockExamReviewView(APIView):
                     "math_question_count": exam.math_question_count,
                     "total_time_minutes": exam.total_time_minutes,
                 },
-                "questions": payload,
+                "questions": attach_srcsets(payload, request),
                 "answers": attempt.answers,
                 "time_spent": attempt.time_spent,
                 "submitted_at": attempt.submitted_at,
@@ -589,14 +490,12 @@ class MockExamAttemptsReportView(APIView):
             return Response({"error": "Not found"}, status=404)
 
         user = request.user
-        prof = getattr(user, "profile", None)
-        role = (getattr(prof, "role", None) or "").lower()
-        is_admin = user.is_superuser or getattr(prof, "is_admin", False) or role == "admin"
+        is_admin = _is_admin(user)
         if not is_admin:
             if exam.course_id:
-                from courses.models import CourseTeacher
+                from courses.membership import teaches
 
-                if not CourseTeacher.objects.filter(course_id=exam.course_id, teacher=user).exists():
+                if not teaches(user, exam.course_id):
                     return Response({"error": "Forbidden"}, status=403)
             elif exam.created_by_id != user.id:
                 return Response({"error": "Forbidden"}, status=403)
@@ -621,14 +520,19 @@ class MockExamAttemptsReportView(APIView):
         count_map = {str(c["student_id"]): c["count"] for c in counts}
 
         qmap = _build_question_map_for_exam(exam)
+        rev_map = _revision_question_map(
+            {rev_id for a in latest_by_student.values() for rev_id in (a.question_revisions or {}).values()},
+            exam.question_overrides or {},
+        )
 
         rows = []
         for attempt in latest_by_student.values():
             student = attempt.student
+            pinned = attempt.question_revisions or {}
             mistakes = []
             unanswered = 0
             for idx, qid in enumerate(attempt.question_order or [], start=1):
-                q = qmap.get(str(qid))
+                q = rev_map.get(pinned.get(str(qid))) or qmap.get(str(qid))
                 if not q:
                     continue
                 answer_value = attempt.answers.get(str(qid))
@@ -811,6 +715,8 @@ class MockExamQuestionLookupView(APIView):
             overrides = exam.question_overrides or {}
 
         qs = Question.objects.filter(id__in=question_ids)
+        if not include_full:
+            qs = qs.only("id", "subject", "topic", "subtopic", "difficulty", "stem", "published")
         by_id = {str(q.id): q for q in qs}
         ordered = []
         for qid in question_ids:
@@ -820,22 +726,9 @@ class MockExamQuestionLookupView(APIView):
             override = overrides.get(str(qid))
             if include_full:
                 q2 = _apply_override(q, override)
+                base = getattr(q2, "staff_payload", None) or question_staff_payload(q2)
                 ordered.append(
-                    {
-                        "id": str(q.id),
-                        "subject": q2.subject,
-                        "topic": q2.topic,
-                        "subtopic": q2.subtopic,
-                        "difficulty": q2.difficulty,
-                        "stem": q2.stem,
-                        "passage": q2.passage,
-                        "choices": q2.choices,
-                        "is_open_ended": q2.is_open_ended,
-                        "image_url": q2.image_url,
-                        "explanation": q2.explanation,
-                        "override": override or None,
-                        "published": q.published,
-                    }
+                    {**base, "choices": q2.choices, "override": override or None, "published": q.published}
                 )
                 continue
             ordered.append(
@@ -1294,14 +1187,12 @@ class MockExamQuestionAddView(APIView):
         except MockExam.DoesNotExist:
             return Response({"error": "Not found"}, status=404)
 
-        prof = getattr(request.user, "profile", None)
-        role = (getattr(prof, "role", None) or "").lower()
-        is_admin = request.user.is_superuser or getattr(prof, "is_admin", False) or role == "admin"
+        is_admin = _is_admin(request.user)
         if not is_admin:
             if exam.course_id:
-                from courses.models import CourseTeacher
+                from courses.membership import teaches
 
-                if not CourseTeacher.objects.filter(course_id=exam.course_id, teacher=request.user).exists():
+                if not teaches(request.user, exam.course_id):
                     return Response({"error": "Forbidden"}, status=403)
             elif exam.created_by_id != request.user.id:
                 return Response({"error": "Forbidden"}, status=403)
@@ -1341,14 +1232,12 @@ class MockExamQuestionRemoveView(APIView):
         except MockExam.DoesNotExist:
             return Response({"error": "Not found"}, status=404)
 
-        prof = getattr(request.user, "profile", None)
-        role = (getattr(prof, "role", None) or "").lower()
-        is_admin = request.user.is_superuser or getattr(prof, "is_admin", False) or role == "admin"
+        is_admin = _is_admin(request.user)
         if not is_admin:
             if exam.course_id:
-                from courses.models import CourseTeacher
+                from courses.membership import teaches
 
-                if not CourseTeacher.objects.filter(course_id=exam.course_id, teacher=request.user).exists():
+                if not teaches(request.user, exam.course_id):
                     return Response({"error": "Forbidden"}, status=403)
             elif exam.created_by_id != request.user.id:
                 return Response({"error": "Forbidden"}, status=403)
@@ -1386,14 +1275,12 @@ class MockExamQuestionReplaceView(APIView):
         except MockExam.DoesNotExist:
             return Response({"error": "Not found"}, status=404)
 
-        prof = getattr(request.user, "profile", None)
-        role = (getattr(prof, "role", None) or "").lower()
-        is_admin = request.user.is_superuser or getattr(prof, "is_admin", False) or role == "admin"
+        is_admin = _is_admin(request.user)
         if not is_admin:
             if exam.course_id:
-                from courses.models import CourseTeacher
+                from courses.membership import teaches
 
-                if not CourseTeacher.objects.filter(course_id=exam.course_id, teacher=request.user).exists():
+                if not teaches(request.user, exam.course_id):
                     return Response({"error": "Forbidden"}, status=403)
             elif exam.created_by_id != request.user.id:
                 return Response({"error": "Forbidden"}, status=403)
@@ -1446,14 +1333,12 @@ class MockExamQuestionOverrideView(APIView):
         except MockExam.DoesNotExist:
             return Response({"error": "Not found"}, status=404)
 
-        prof = getattr(request.user, "profile", None)
-        role = (getattr(prof, "role", None) or "").lower()
-        is_admin = request.user.is_superuser or getattr(prof, "is_admin", False) or role == "admin"
+        is_admin = _is_admin(request.user)
         if not is_admin:
             if exam.course_id:
-                from courses.models import CourseTeacher
+                from courses.membership import teaches
 
-                if not CourseTeacher.objects.filter(course_id=exam.course_id, teacher=request.user).exists():
+                if not teaches(request.user, exam.course_id):
                     return Response({"error": "Forbidden"}, status=403)
             elif exam.created_by_id != request.user.id:
                 return Response({"error": "Forbidden"}, status=403)
@@ -1497,9 +1382,9 @@ class MockExamStartView(APIView):
         access_qs = MockExamAccess.objects.filter(mock_exam=exam, is_active=True)
         if not staff:
             if exam.course_id:
-                from courses.models import Enrollment
+                from courses.membership import enrolled
 
-                if not Enrollment.objects.filter(course_id=exam.course_id, user=request.user).exists():
+                if not enrolled(request.user, exam.course_id):
                     return Response({"error": "No access"}, status=403)
             if access_qs.exists():
                 access = access_qs.filter(student=request.user).first()
@@ -1551,6 +1436,7 @@ class MockExamStartView(APIView):
             if exam.shuffle_questions:
                 random.shuffle(order)
             attempt.question_order = order
+            attempt.question_revisions = _pinned_revisions(order)
 
             choice_order = {}
             if exam.shuffle_choices:
@@ -1567,15 +1453,13 @@ class MockExamStartView(APIView):
             attempt.question_order = list(exam.question_ids or [])
             attempt.save(update_fields=["question_order"])
 
-        questions = Question.objects.filter(id__in=attempt.question_order)
-        by_id = {str(q.id): q for q in questions}
+        by_id = _attempt_question_map(attempt, overrides)
         payload = []
         for qid in attempt.question_order:
             q = by_id.get(str(qid))
             if not q:
                 continue
-            q2 = _apply_override(q, overrides.get(str(q.id)))
-            payload.append(_serialize_question_for_student(q2, attempt.choice_order.get(str(q.id))))
+            payload.append(_serialize_question_for_student(q, attempt.choice_order.get(str(q.id))))
 
         return Response(
             {
@@ -1589,7 +1473,7 @@ class MockExamStartView(APIView):
                     "math_question_count": exam.math_question_count,
                     "total_time_minutes": exam.total_time_minutes,
                 },
-                "questions": payload,
+                "questions": attach_srcsets(payload, request),
                 "answers": attempt.answers,
                 "time_spent": attempt.time_spent,
             }
@@ -1662,9 +1546,8 @@ class MockExamSubmitView(APIView):
         else:
             return Response({"error": "answers must be list or dict"}, status=400)
 
-        questions = Question.objects.filter(id__in=attempt.question_order)
         overrides = (attempt.mock_exam.question_overrides or {}) if attempt.mock_exam_id else {}
-        qmap = {str(q.id): _apply_override(q, overrides.get(str(q.id))) for q in questions}
+        qmap = _attempt_question_map(attempt, overrides)
 
         totals, topic_stats, diff_stats = _score_answers(qmap, answers, attempt.choice_order or {})
 
@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('module_practice', '0008_modulepracticeaccess_attempt_limit'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='modulepracticeattempt',
+            index=models.Index(fields=['practice', 'student', 'status', 'completed_at'], name='module_prac_practic_e10245_idx'),
+        ),
+    ]
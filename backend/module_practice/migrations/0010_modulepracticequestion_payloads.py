@@ -0,0 +1,69 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+# Frozen copies of module_practice.models.module_question_payload
+# (and prep_portal_api.choices.render_choices) as of this migration.
+def _render_choices(raw_choices, with_key: bool = False) -> list[dict]:
+    rendered = []
+    for idx, c in enumerate(raw_choices or []):
+        item = {"label": c.get("label") or chr(65 + idx), "content": c.get("content")}
+        if with_key:
+            item["is_correct"] = bool(c.get("is_correct"))
+        rendered.append(item)
+    return rendered
+
+
+def module_question_payload(q, with_key: bool = False) -> dict:
+    payload = {
+        "id": str(q.id),
+        "subject": q.subject,
+        "module_index": q.module_index,
+        "topic": q.topic_tag,
+        "subtopic": None,
+        "stem": q.question_text,
+        "passage": q.passage,
+        "choices": _render_choices(q.choices, with_key=with_key),
+        "is_open_ended": q.is_open_ended,
+    }
+    if with_key:
+        payload["correct_answer"] = q.correct_answer
+    payload["image_url"] = q.image_url
+    payload["explanation"] = q.explanation
+    return payload
+
+
+def build_question_payloads(apps, schema_editor):
+    Model = apps.get_model("module_practice", "ModulePracticeQuestion")
+    batch = []
+    for q in Model.objects.iterator(chunk_size=500):
+        q.student_payload = module_question_payload(q)
+        q.staff_payload = module_question_payload(q, with_key=True)
+        batch.append(q)
+        if len(batch) >= 500:
+            Model.objects.bulk_update(batch, ["student_payload", "staff_payload"])
+            batch = []
+    if batch:
+        Model.objects.bulk_update(batch, ["student_payload", "staff_payload"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('module_practice', '0009_modulepracticeattempt_module_prac_practic_e10245_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='modulepracticequestion',
+            name='staff_payload',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='modulepracticequestion',
+            name='student_payload',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.RunPython(build_question_payloads, migrations.RunPython.noop),
+    ]
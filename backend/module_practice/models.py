@@ -59,6 +59,28 @@ class ModulePracticeModule(models.Model):
         return f"{self.practice_id} {self.subject} M{self.module_index}"
 
 
+def module_question_payload(q, with_key: bool = False) -> dict:
+    """Student (with_key=False) or review question JSON for a practice question."""
+    from prep_portal_api.choices import render_choices
+
+    payload = {
+        "id": str(q.id),
+        "subject": q.subject,
+        "module_index": q.module_index,
+        "topic": q.topic_tag,
+        "subtopic": None,
+        "stem": q.question_text,
+        "passage": q.passage,
+        "choices": render_choices(q.choices, with_key=with_key),
+        "is_open_ended": q.is_open_ended,
+    }
+    if with_key:
+        payload["correct_answer"] = q.correct_answer
+    payload["image_url"] = q.image_url
+    payload["explanation"] = q.explanation
+    return payload
+
+
 class ModulePracticeQuestion(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     practice = models.ForeignKey(ModulePractice, on_delete=models.CASCADE, related_name="questions")
@@ -75,6 +97,9 @@ class ModulePracticeQuestion(models.Model):
     difficulty = models.CharField(max_length=10, blank=True, null=True)
     image_url = models.URLField(blank=True, null=True, max_length=500)
     order = models.IntegerField(default=0)
+    # Pre-rendered response fragments, regenerated on every save.
+    student_payload = models.JSONField(default=dict, blank=True, editable=False)
+    staff_payload = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -87,6 +112,18 @@ class ModulePracticeQuestion(models.Model):
     def __str__(self):
         return f"{self.practice_id} {self.subject} M{self.module_index} Q{self.order}"
 
+    def refresh_payloads(self):
+        self.student_payload = module_question_payload(self)
+        self.staff_payload = module_question_payload(self, with_key=True)
+
+    def save(self, *args, **kwargs):
+        self.refresh_payloads()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            derived = ["student_payload", "staff_payload"]
+            kwargs["update_fields"] = list(update_fields) + [f for f in derived if f not in update_fields]
+        super().save(*args, **kwargs)
+
 
 class ModulePracticeAccess(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -135,4 +172,5 @@ class ModulePracticeAttempt(models.Model):
         indexes = [
             models.Index(fields=["practice", "student", "status"]),
             models.Index(fields=["student", "started_at"]),
+            models.Index(fields=["practice", "student", "status", "completed_at"]),
         ]
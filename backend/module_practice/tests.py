@@ -0,0 +1,70 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from prep_portal_api.pagination import encode_cursor
+from .models import ModulePractice, ModulePracticeAttempt
+
+
+class ModulePracticeAttemptsTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username="a", email="a@x.io", password="pw")
+        self.student = User.objects.create_user(username="s", email="s@x.io", password="pw")
+        self.practice = ModulePractice.objects.create(title="P")
+        now = timezone.now()
+        for i in range(3):
+            ModulePracticeAttempt.objects.create(
+                practice=self.practice,
+                student=self.student,
+                status="submitted",
+                module_scores={"math_1": {"correct": i, "total": 3}},
+                completed_at=now - timedelta(minutes=i),
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def attempts(self, **params):
+        return self.client.get("/api/module-practice/attempts/", {"practice_id": str(self.practice.id), **params})
+
+    def test_cursor_walks_every_attempt_once(self):
+        first = self.attempts(limit=2).data
+        second = self.attempts(limit=2, cursor=first["next_cursor"]).data
+        self.assertIsNone(second["next_cursor"])
+        ids = [a["id"] for a in first["attempts"] + second["attempts"]]
+        every = ModulePracticeAttempt.objects.values_list("id", flat=True)
+        self.assertEqual(sorted(ids), sorted(str(i) for i in every))
+
+    def test_bad_cursors_are_rejected(self):
+        stamp = timezone.now().isoformat()
+        for cursor in (
+            "not-a-cursor",
+            encode_cursor(stamp),
+            encode_cursor("yesterday", self.student.id),
+            encode_cursor(stamp, "1"),
+        ):
+            self.assertEqual(self.attempts(cursor=cursor).status_code, 400, cursor)
+
+    def test_bad_ids_are_rejected(self):
+        self.assertEqual(self.attempts(student_id="nope").status_code, 400)
+        res = self.client.get("/api/module-practice/attempts/", {"practice_id": "nope"})
+        self.assertEqual(res.status_code, 404)
+        self.client.force_authenticate(self.admin)
+        res = self.client.post(
+            "/api/module-practice/attempts/summary/",
+            {"practice_id": str(self.practice.id), "student_ids": [str(self.student.id), "nope"]},
+            format="json",
+        )
+        self.assertEqual(res.status_code, 400)
+
+    def test_summary_folds_scores_per_student(self):
+        self.client.force_authenticate(self.admin)
+        res = self.client.post(
+            "/api/module-practice/attempts/summary/",
+            {"practice_id": str(self.practice.id), "student_ids": [str(self.student.id)]},
+            format="json",
+        )
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data["students"][str(self.student.id)]["attempts"], 3)
@@ -19,6 +19,7 @@ from .views import (
     ModulePracticeStartView,
     ModulePracticeReviewView,
     ModulePracticeAttemptsView,
+    ModulePracticeAttemptsSummaryView,
     ModulePracticeSubmitView,
 )
 
@@ -42,5 +43,6 @@ urlpatterns = [
     path("module-practice/start/", ModulePracticeStartView.as_view(), name="module_practice_start"),
     path("module-practice/review/", ModulePracticeReviewView.as_view(), name="module_practice_review"),
     path("module-practice/attempts/", ModulePracticeAttemptsView.as_view(), name="module_practice_attempts"),
+    path("module-practice/attempts/summary/", ModulePracticeAttemptsSummaryView.as_view(), name="module_practice_attempts_summary"),
     path("module-practice/submit/", ModulePracticeSubmitView.as_view(), name="module_practice_submit"),
 ]
@@ -1,157 +1,48 @@
 from django.utils import timezone
+from django.core.exceptions import ValidationError
 from django.db import transaction, models
 from rest_framework import status, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
-import csv
-import io
 import random
+import uuid
 
 from accounts.models import User, Profile
+from accounts.roles import is_staff as _is_staff
+from mediafiles.images import attach_srcsets
+from prep_portal_api.choices import order_choices
+from prep_portal_api.pagination import decode_keyset_cursor, encode_cursor, parse_limit
+from prep_portal_api.uploads import UploadRejected, csv_dict_reader
 from .models import (
     ModulePractice,
     ModulePracticeModule,
     ModulePracticeAccess,
     ModulePracticeAttempt,
     ModulePracticeQuestion,
+    module_question_payload,
 )
 
 
-def _is_staff(user: User) -> bool:
-    prof = getattr(user, "profile", None)
-    role = (getattr(prof, "role", None) or "").lower()
-    is_admin = getattr(prof, "is_admin", False)
-    return user.is_superuser or is_admin or role in ("admin", "teacher")
+def _is_uuid(value) -> bool:
+    try:
+        uuid.UUID(str(value))
+    except ValueError:
+        return False
+    return True
 
 
 def _serialize_question_for_student(q: ModulePracticeQuestion, choice_order: list | None = None):
-    choices = []
-    raw_choices = q.choices or []
-    if choice_order:
-        if all(isinstance(i, int) for i in choice_order):
-            ordered = [i for i in choice_order if 0 <= i < len(raw_choices)]
-            used = set(ordered)
-            for idx, raw_idx in enumerate(ordered):
-                c = raw_choices[raw_idx]
-                label = chr(65 + idx)
-                choices.append({"label": label, "content": c.get("content")})
-            for raw_idx, c in enumerate(raw_choices):
-                if raw_idx in used:
-                    continue
-                label = chr(65 + len(choices))
-                choices.append({"label": label, "content": c.get("content")})
-        else:
-            by_label = {c.get("label"): c for c in raw_choices if c.get("label")}
-            used = set()
-            for idx, label in enumerate(choice_order):
-                c = by_label.get(label)
-                if not c:
-                    continue
-                fallback = chr(65 + idx)
-                choices.append({"label": c.get("label") or fallback, "content": c.get("content")})
-                used.add(label)
-            for idx, c in enumerate(raw_choices):
-                label = c.get("label") or chr(65 + len(choices))
-                if c.get("label") and c.get("label") in used:
-                    continue
-                choices.append({"label": label, "content": c.get("content")})
-    else:
-        for idx, c in enumerate(raw_choices):
-            label = c.get("label") or chr(65 + idx)
-            choices.append({"label": label, "content": c.get("content")})
-    return {
-        "id": str(q.id),
-        "subject": q.subject,
-        "module_index": q.module_index,
-        "topic": q.topic_tag,
-        "subtopic": None,
-        "stem": q.question_text,
-        "passage": q.passage,
-        "choices": choices,
-        "is_open_ended": q.is_open_ended,
-        "image_url": q.image_url,
-        "explanation": q.explanation,
-    }
+    payload = q.student_payload or module_question_payload(q)
+    if not choice_order:
+        return payload
+    return {**payload, "choices": order_choices(payload["choices"], q.choices, choice_order)}
 
 
 def _serialize_question_for_review(q: ModulePracticeQuestion, choice_order: list | None = None):
-    choices = []
-    raw_choices = q.choices or []
-    if choice_order:
-        if all(isinstance(i, int) for i in choice_order):
-            ordered = [i for i in choice_order if 0 <= i < len(raw_choices)]
-            used = set(ordered)
-            for idx, raw_idx in enumerate(ordered):
-                c = raw_choices[raw_idx]
-                label = chr(65 + idx)
-                choices.append(
-                    {
-                        "label": label,
-                        "content": c.get("content"),
-                        "is_correct": bool(c.get("is_correct")),
-                    }
-                )
-            for raw_idx, c in enumerate(raw_choices):
-                if raw_idx in used:
-                    continue
-                label = chr(65 + len(choices))
-                choices.append(
-                    {
-                        "label": label,
-                        "content": c.get("content"),
-                        "is_correct": bool(c.get("is_correct")),
-                    }
-                )
-        else:
-            by_label = {c.get("label"): c for c in raw_choices if c.get("label")}
-            used = set()
-            for idx, label in enumerate(choice_order):
-                c = by_label.get(label)
-                if not c:
-                    continue
-                fallback = chr(65 + idx)
-                choices.append(
-                    {
-                        "label": c.get("label") or fallback,
-                        "content": c.get("content"),
-                        "is_correct": bool(c.get("is_correct")),
-                    }
-                )
-                used.add(label)
-            for c in raw_choices:
-                label = c.get("label")
-                if label and label in used:
-                    continue
-                choices.append(
-                    {
-                        "label": label or chr(65 + len(choices)),
-                        "content": c.get("content"),
-                        "is_correct": bool(c.get("is_correct")),
-                    }
-                )
-    else:
-        for idx, c in enumerate(raw_choices):
-            choices.append(
-                {
-                    "label": c.get("label") or chr(65 + idx),
-                    "content": c.get("content"),
-                    "is_correct": bool(c.get("is_correct")),
-                }
-            )
-    return {
-        "id": str(q.id),
-        "subject": q.subject,
-        "module_index": q.module_index,
-        "topic": q.topic_tag,
-        "subtopic": None,
-        "stem": q.question_text,
-        "passage": q.passage,
-        "choices": choices,
-        "is_open_ended": q.is_open_ended,
-        "correct_answer": q.correct_answer,
-        "image_url": q.image_url,
-        "explanation": q.explanation,
-    }
+    payload = q.staff_payload or module_question_payload(q, with_key=True)
+    if not choice_order:
+        return payload
+    return {**payload, "choices": order_choices(payload["choices"], q.choices, choice_order)}
 
 
 def _serialize_question_for_staff(q: ModulePracticeQuestion):
@@ -672,29 +563,13 @@ class ModulePracticeQuestionImportView(APIView):
             except Exception:
                 return Response({"error": "module_index must be int"}, status=400)
 
-        raw = file.read()
-        if raw[:2] == b"PK":
-            return Response(
-                {
-                    "error": "It looks like you uploaded an Excel (.xlsx) file. "
-                             "Please export or save it as CSV (UTF-8) and try again."
-                },
-                status=400,
-            )
-
-        decoded = None
-        for enc in ("utf-8-sig", "utf-8", "iso-8859-1"):
-            try:
-                decoded = raw.decode(enc)
-                break
-            except UnicodeDecodeError:
-                continue
-        if decoded is None:
-            return Response({"error": "Could not decode file. Please upload UTF-8 CSV."}, status=400)
+        try:
+            reader = csv_dict_reader(file)
+        except UploadRejected as e:
+            return Response({"error": e.message}, status=e.status)
 
         module_state: dict = {}
 
-        reader = csv.DictReader(io.StringIO(decoded))
         created = 0
         errors = []
 
@@ -1154,7 +1029,7 @@ class ModulePracticeStartView(APIView):
                     "subject": m.subject,
                     "module_index": m.module_index,
                     "time_limit_minutes": m.time_limit_minutes,
-                    "questions": payload_questions,
+                    "questions": attach_srcsets(payload_questions, request),
                 }
             )
 
@@ -1259,7 +1134,7 @@ class ModulePracticeReviewView(APIView):
                     "subject": m.subject,
                     "module_index": m.module_index,
                     "time_limit_minutes": m.time_limit_minutes,
-                    "questions": payload_questions,
+                    "questions": attach_srcsets(payload_questions, request),
                 }
             )
 
@@ -1290,26 +1165,44 @@ class ModulePracticeAttemptsView(APIView):
             return Response({"error": "practice_id required"}, status=400)
         try:
             practice = ModulePractice.objects.get(id=pid)
-        except ModulePractice.DoesNotExist:
+        except (ModulePractice.DoesNotExist, ValidationError):
             return Response({"error": "Not found"}, status=404)
 
         user = request.user
         staff = _is_staff(user)
         student_id = request.query_params.get("student_id")
         if student_id:
+            if not _is_uuid(student_id):
+                return Response({"error": "Invalid student_id"}, status=400)
             if not staff and str(student_id) != str(user.id):
                 return Response({"error": "Forbidden"}, status=403)
             target_id = student_id
         else:
             target_id = user.id
 
-        attempts = (
-            ModulePracticeAttempt.objects.filter(practice=practice, student_id=target_id, status="submitted")
-            .order_by("-completed_at", "-started_at")
+        limit = parse_limit(request.query_params.get("limit"), 50, 200)
+        attempts = ModulePracticeAttempt.objects.filter(
+            practice=practice, student_id=target_id, status="submitted"
         )
+        cursor_raw = request.query_params.get("cursor")
+        if cursor_raw:
+            cursor = decode_keyset_cursor(cursor_raw)
+            if not cursor:
+                return Response({"error": "Invalid cursor"}, status=400)
+            completed_at, last_id = cursor
+            attempts = attempts.filter(
+                models.Q(completed_at__lt=completed_at)
+                | models.Q(completed_at=completed_at, id__lt=last_id)
+            )
+        page = list(attempts.order_by("-completed_at", "-id")[: limit + 1])
+        next_cursor = None
+        if len(page) > limit:
+            page = page[:limit]
+            last = page[-1]
+            next_cursor = encode_cursor(last.completed_at.isoformat(), last.id)
 
         data = []
-        for attempt in attempts:
+        for attempt in page:
             data.append(
                 {
                     "id": str(attempt.id),
@@ -1325,6 +1218,106 @@ class ModulePracticeAttemptsView(APIView):
                 "ok": True,
                 "results_published": practice.results_published,
                 "attempts": data,
+                "next_cursor": next_cursor,
+            }
+        )
+
+
+def _module_ratio(entry) -> float | None:
+    if not isinstance(entry, dict):
+        return None
+    try:
+        total = int(entry.get("total") or 0)
+        correct = int(entry.get("correct") or 0)
+    except Exception:
+        return None
+    if total <= 0:
+        return None
+    return correct / total
+
+
+def _summarize_attempt_rows(rows) -> dict:
+    """
+    Fold (student_id, completed_at, module_scores) rows, ordered by student then
+    completion time, into best/latest/mean per module key for each student.
+    """
+    summary: dict[str, dict] = {}
+    for student_id, completed_at, module_scores in rows:
+        entry = summary.setdefault(
+            str(student_id),
+            {"attempts": 0, "latest_completed_at": None, "modules": {}},
+        )
+        entry["attempts"] += 1
+        entry["latest_completed_at"] = completed_at
+        for key, score in (module_scores or {}).items():
+            ratio = _module_ratio(score)
+            if ratio is None:
+                continue
+            point = {
+                "correct": score.get("correct"),
+                "total": score.get("total"),
+                "score": ratio,
+                "completed_at": completed_at,
+            }
+            mod = entry["modules"].setdefault(key, {"count": 0, "sum": 0.0, "best": None, "latest": None})
+            mod["count"] += 1
+            mod["sum"] += ratio
+            mod["latest"] = point
+            if mod["best"] is None or ratio > mod["best"]["score"]:
+                mod["best"] = point
+
+    for entry in summary.values():
+        for mod in entry["modules"].values():
+            mod["mean"] = mod.pop("sum") / mod["count"]
+    return summary
+
+
+class ModulePracticeAttemptsSummaryView(APIView):
+    """
+    Staff-only trend table: best, latest and mean score per module key for many
+    students of one practice, built from a single query over submitted attempts.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        if not _is_staff(request.user):
+            return Response({"error": "Forbidden"}, status=403)
+
+        pid = request.data.get("practice_id")
+        student_ids = request.data.get("student_ids")
+        if not pid:
+            return Response({"error": "practice_id required"}, status=400)
+        if student_ids is not None and not isinstance(student_ids, list):
+            return Response({"error": "student_ids must be list"}, status=400)
+        if student_ids and not all(_is_uuid(sid) for sid in student_ids):
+            return Response({"error": "Invalid student_ids"}, status=400)
+        try:
+            practice = ModulePractice.objects.get(id=pid)
+        except (ModulePractice.DoesNotExist, ValidationError):
+            return Response({"error": "Not found"}, status=404)
+
+        attempts = ModulePracticeAttempt.objects.filter(practice=practice, status="submitted")
+        if student_ids is None:
+            student_ids = list(
+                ModulePracticeAccess.objects.filter(practice=practice, is_active=True).values_list(
+                    "student_id", flat=True
+                )
+            )
+        attempts = attempts.filter(student_id__in=student_ids)
+
+        rows = attempts.order_by("student_id", "completed_at", "id").values_list(
+            "student_id", "completed_at", "module_scores"
+        )
+        summary = _summarize_attempt_rows(rows)
+        for sid in student_ids:
+            summary.setdefault(str(sid), {"attempts": 0, "latest_completed_at": None, "modules": {}})
+
+        return Response(
+            {
+                "ok": True,
+                "results_published": practice.results_published,
+                "students": summary,
             }
         )
 
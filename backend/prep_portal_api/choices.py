@@ -0,0 +1,45 @@
+def render_choices(raw_choices, with_key: bool = False) -> list[dict]:
+    """Normalize stored choices into {label, content[, is_correct]} in stored order."""
+    rendered = []
+    for idx, c in enumerate(raw_choices or []):
+        item = {"label": c.get("label") or chr(65 + idx), "content": c.get("content")}
+        if with_key:
+            item["is_correct"] = bool(c.get("is_correct"))
+        rendered.append(item)
+    return rendered
+
+
+def order_choices(rendered: list[dict], raw_choices, choice_order: list | None) -> list[dict]:
+    """
+    Apply an attempt's choice order to choices from render_choices().
+    Index orders relabel A, B, C...; label orders keep the stored labels.
+    """
+    if not choice_order:
+        return rendered
+    raw_choices = raw_choices or []
+    choices = []
+    if all(isinstance(i, int) for i in choice_order):
+        ordered = [i for i in choice_order if 0 <= i < len(rendered)]
+        used = set(ordered)
+        for idx, raw_idx in enumerate(ordered):
+            choices.append({**rendered[raw_idx], "label": chr(65 + idx)})
+        for raw_idx, c in enumerate(rendered):
+            if raw_idx in used:
+                continue
+            choices.append({**c, "label": chr(65 + len(choices))})
+        return choices
+
+    by_label = {c.get("label"): idx for idx, c in enumerate(raw_choices) if c.get("label")}
+    used = set()
+    for lbl in choice_order:
+        idx = by_label.get(lbl)
+        if idx is None or idx >= len(rendered):
+            continue
+        choices.append(rendered[idx])
+        used.add(lbl)
+    for idx, c in enumerate(rendered):
+        label = raw_choices[idx].get("label") if idx < len(raw_choices) else None
+        if label and label in used:
+            continue
+        choices.append(c if label else {**c, "label": chr(65 + len(choices))})
+    return choices
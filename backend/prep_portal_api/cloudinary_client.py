@@ -0,0 +1,229 @@
+"""
+Bounded, time-limited access to the Cloudinary API.
+
+Every admin and upload call goes through CloudinaryClient. Calls run on a
+small shared thread pool with a per-call timeout (passed to the SDK's HTTP
+layer and enforced again on the future), candidate lookups fan out and the
+first success wins, and a circuit breaker fails fast once the API keeps
+timing out or erroring, so a degraded Cloudinary cannot pin every worker.
+
+The SDK modules are injected: tests build a client around a local fake with
+CloudinaryClient(api=fake, uploader=fake) and install it with set_client().
+"""
+import logging
+import math
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+CALL_TIMEOUT = getattr(settings, "CLOUDINARY_CALL_TIMEOUT", 5.0)
+UPLOAD_TIMEOUT = getattr(settings, "CLOUDINARY_UPLOAD_TIMEOUT", 60.0)
+MAX_WORKERS = getattr(settings, "CLOUDINARY_MAX_WORKERS", 8)
+FAILURE_THRESHOLD = getattr(settings, "CLOUDINARY_BREAKER_THRESHOLD", 5)
+RESET_AFTER = getattr(settings, "CLOUDINARY_BREAKER_RESET_SECONDS", 30.0)
+
+
+class CloudinaryUnavailable(Exception):
+    """The breaker is open or a call ran past its timeout."""
+
+
+def _is_client_error(exc) -> bool:
+    # The API answered (missing asset, bad params); that says nothing about its health.
+    from cloudinary import exceptions
+
+    return isinstance(
+        exc,
+        (
+            exceptions.NotFound,
+            exceptions.BadRequest,
+            exceptions.NotAllowed,
+            exceptions.AlreadyExists,
+            exceptions.AuthorizationRequired,
+        ),
+    )
+
+
+class CircuitBreaker:
+    """
+    Closed until `threshold` consecutive failures, then open for `reset_after`
+    seconds; after that a single probe call decides whether it closes again.
+    """
+
+    def __init__(self, threshold: int = FAILURE_THRESHOLD, reset_after: float = RESET_AFTER, clock=time.monotonic):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._clock() - self._opened_at >= self.reset_after:
+                return "half_open"
+            return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._clock() - self._opened_at >= self.reset_after and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.threshold:
+                if self._opened_at is None or self._probing:
+                    logger.warning("cloudinary circuit opened after %s failures", self._failures)
+                self._opened_at = self._clock()
+                self._probing = False
+
+
+class CloudinaryClient:
+    def __init__(
+        self,
+        api=None,
+        uploader=None,
+        max_workers: int = MAX_WORKERS,
+        timeout: float = CALL_TIMEOUT,
+        upload_timeout: float = UPLOAD_TIMEOUT,
+        breaker: CircuitBreaker | None = None,
+    ):
+        if api is None:
+            import cloudinary.api as api
+        if uploader is None:
+            import cloudinary.uploader as uploader
+        self.api = api
+        self.uploader = uploader
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.upload_timeout = upload_timeout
+        self.breaker = breaker or CircuitBreaker()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="cloudinary")
+
+    def _run(self, fn, args, kwargs):
+        started = time.monotonic()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as exc:
+            healthy = _is_client_error(exc)
+            raise
+        else:
+            healthy = True
+        finally:
+            # An answer that arrives after the caller gave up still means the API is struggling.
+            if healthy and time.monotonic() - started <= kwargs["timeout"]:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+        return result
+
+    def _submit(self, fn, args, kwargs, timeout):
+        if not self.breaker.allow():
+            raise CloudinaryUnavailable("Cloudinary is unavailable; try again shortly")
+        return self._executor.submit(self._run, fn, args, {**kwargs, "timeout": timeout})
+
+    def call(self, fn, *args, timeout: float | None = None, **kwargs):
+        """Run one SDK call on the pool; SDK errors propagate, timeouts raise CloudinaryUnavailable."""
+        timeout = timeout or self.timeout
+        future = self._submit(fn, args, kwargs, timeout)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise CloudinaryUnavailable(f"Cloudinary call timed out after {timeout:g}s")
+
+    def first_success(self, calls, pick=None, timeout: float | None = None):
+        """
+        Run (fn, args, kwargs) candidates concurrently and return (index, value)
+        for the first call whose result pick() maps to something other than None,
+        or None when every candidate failed or the deadline passed. If the breaker
+        stopped some candidates from running, a miss raises CloudinaryUnavailable
+        instead, since "not found" would be unproven.
+        """
+        calls = list(calls)
+        if not calls:
+            return None
+        timeout = timeout or self.timeout
+        pick = pick or (lambda result: result)
+        futures = {}
+        cut_short = None
+        for idx, (fn, args, kwargs) in enumerate(calls):
+            try:
+                futures[self._submit(fn, args, kwargs, timeout)] = idx
+            except CloudinaryUnavailable as exc:
+                if not futures:
+                    raise
+                cut_short = exc
+                break
+
+        # Queued calls wait for a free worker, so the deadline grows with the number of pool "waves".
+        deadline = time.monotonic() + timeout * math.ceil(len(futures) / self.max_workers)
+        pending = set(futures)
+        try:
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                for future in sorted(done, key=futures.get):
+                    if future.exception() is not None:
+                        continue
+                    value = pick(future.result())
+                    if value is not None:
+                        return futures[future], value
+        finally:
+            for future in pending:
+                future.cancel()
+        if cut_short is not None:
+            raise cut_short
+        return None
+
+    def resource(self, public_id, **kwargs):
+        return self.call(self.api.resource, public_id, **kwargs)
+
+    def resources(self, **kwargs):
+        return self.call(self.api.resources, **kwargs)
+
+    def destroy(self, public_id, **kwargs):
+        return self.call(self.uploader.destroy, public_id, **kwargs)
+
+    def upload(self, file, **kwargs):
+        return self.call(self.uploader.upload, file, timeout=self.upload_timeout, **kwargs)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> CloudinaryClient:
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = CloudinaryClient()
+    return _client
+
+
+def set_client(client: CloudinaryClient | None):
+    """Install a client (e.g. one wrapping a local fake); None restores the default on next use."""
+    global _client
+    _client = client
@@ -0,0 +1,51 @@
+import base64
+import json
+import uuid
+
+from django.utils.dateparse import parse_datetime
+
+
+def parse_limit(raw, default: int, maximum: int) -> int:
+    try:
+        limit = int(raw)
+    except Exception:
+        return default
+    return max(1, min(limit, maximum))
+
+
+def encode_cursor(*values) -> str:
+    """Pack keyset values (e.g. timestamp + id) into an opaque url-safe token."""
+    payload = json.dumps([str(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(raw: str | None, size: int) -> list[str] | None:
+    if not raw:
+        return None
+    try:
+        padded = raw + "=" * (-len(raw) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+    except Exception:
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    return [str(v) for v in values]
+
+
+def decode_keyset_cursor(raw: str | None):
+    """
+    (timestamp, uuid) from a cursor built with encode_cursor(dt.isoformat(), id).
+    Returns None when anything fails to parse; callers answer that with a 400
+    rather than quietly serving the first page again.
+    """
+    values = decode_cursor(raw, 2)
+    if not values:
+        return None
+    stamp = parse_datetime(values[0])
+    try:
+        row_id = uuid.UUID(values[1])
+    except ValueError:
+        return None
+    if not stamp:
+        return None
+    return stamp, row_id
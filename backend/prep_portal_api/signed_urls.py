@@ -0,0 +1,47 @@
+"""
+Short-lived cache for generated file URLs.
+
+A signed Cloudinary link or storage URL depends only on the stored path, mime
+type and delivery location, so serializers memoise it here instead of signing
+and building strings for every row of every listing. Entries expire well
+before the signature does: private download links are valid for an hour.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+URL_CACHE_TTL = getattr(settings, "SIGNED_URL_CACHE_TTL", 15 * 60)
+KEY_PREFIX = "signed_url"
+
+
+def _key(parts) -> str:
+    digest = hashlib.sha1(repr(tuple(parts)).encode("utf-8")).hexdigest()
+    return f"{KEY_PREFIX}:{digest}"
+
+
+def cached_url(parts, build):
+    """Return the cached URL for `parts` (e.g. (kind, path, mime, delivery)), calling build() on a miss."""
+    key = _key(parts)
+    url = cache.get(key)
+    if url is None:
+        url = build()
+        if url:
+            cache.set(key, url, URL_CACHE_TTL)
+    return url
+
+
+def storage_url(path: str | None):
+    """default_storage.url(path), cached; falls back to the path itself like the callers always did."""
+    if not path:
+        return None
+
+    def build():
+        from django.core.files.storage import default_storage
+
+        try:
+            return default_storage.url(path)
+        except Exception:
+            return path
+
+    return cached_url(("storage", path), build)
@@ -0,0 +1,178 @@
+import shutil
+import tempfile
+import threading
+
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile, TemporaryUploadedFile
+from django.test import SimpleTestCase, override_settings
+
+from .cloudinary_client import CircuitBreaker, CloudinaryClient, CloudinaryUnavailable
+from .signed_urls import cached_url, storage_url
+from .uploads import UploadRejected, csv_dict_reader, save_image_upload, sniff_image
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 32
+
+
+def spooled(data: bytes, name="f.csv"):
+    # What Django hands views for bodies above FILE_UPLOAD_MAX_MEMORY_SIZE.
+    upload = TemporaryUploadedFile(name, "application/octet-stream", len(data), None)
+    upload.write(data)
+    upload.seek(0)
+    return upload
+
+
+class CsvReaderTests(SimpleTestCase):
+    def rows(self, data: bytes):
+        return [dict(r) for r in csv_dict_reader(spooled(data))]
+
+    def test_utf8_with_bom_and_latin1_decode(self):
+        self.assertEqual(self.rows("﻿stem,topic\nCafé,x\n".encode("utf-8")), [{"stem": "Café", "topic": "x"}])
+        self.assertEqual(self.rows("stem\nCafé\n".encode("latin-1")), [{"stem": "Café"}])
+
+    def test_multibyte_text_across_read_chunks_stays_utf8(self):
+        from . import uploads
+
+        body = "stem\n" + "é" * (uploads.READ_CHUNK // 2 + 1) + "\n"
+        (row,) = self.rows(body.encode("utf-8"))
+        self.assertEqual(len(row["stem"]), uploads.READ_CHUNK // 2 + 1)
+
+    def test_excel_and_oversized_files_are_rejected(self):
+        with self.assertRaises(UploadRejected):
+            csv_dict_reader(spooled(b"PK\x03\x04rest"))
+        with self.assertRaises(UploadRejected) as ctx:
+            csv_dict_reader(spooled(b"stem\nx\n"), max_bytes=4)
+        self.assertEqual(ctx.exception.status, 413)
+
+
+class ImageUploadTests(SimpleTestCase):
+    def test_type_comes_from_content_not_name(self):
+        self.assertEqual(sniff_image(SimpleUploadedFile("photo.gif", PNG)), ".png")
+        self.assertEqual(sniff_image(SimpleUploadedFile("IMG_1.HEIC", b"\x00\x00\x00\x18ftypheic\x00\x00")), ".heic")
+        self.assertIsNone(sniff_image(SimpleUploadedFile("photo.png", b"<svg></svg>")))
+
+    def test_saved_under_the_sniffed_extension(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        with override_settings(MEDIA_ROOT=tmp):
+            path = save_image_upload(SimpleUploadedFile("a.jpg", PNG), "avatars/u/1")
+        self.assertEqual(path, "avatars/u/1.png")
+        with self.assertRaises(UploadRejected):
+            save_image_upload(SimpleUploadedFile("a.png", b"not an image"), "avatars/u/2")
+
+
+class SignedUrlCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_built_once_per_key(self):
+        build = mock.Mock(return_value="https://cdn/a?sig=1")
+        for _ in range(3):
+            self.assertEqual(cached_url(("node", "a.pdf", "application/pdf", None), build), "https://cdn/a?sig=1")
+        build.assert_called_once()
+        # A new location (e.g. once resolved) is a different entry.
+        cached_url(("node", "a.pdf", "application/pdf", ("a", "raw", "private")), build)
+        self.assertEqual(build.call_count, 2)
+
+    def test_failures_are_not_cached(self):
+        build = mock.Mock(side_effect=[None, "https://cdn/b"])
+        self.assertIsNone(cached_url(("node", "b"), build))
+        self.assertEqual(cached_url(("node", "b"), build), "https://cdn/b")
+
+    def test_storage_url(self):
+        self.assertIsNone(storage_url(""))
+        with override_settings(MEDIA_URL="/media/"):
+            self.assertEqual(storage_url("covers/c.png"), "/media/covers/c.png")
+
+
+class FakeApi:
+    """Stands in for cloudinary.api: answers from `results`, raising any exception found there."""
+
+    def __init__(self, results=None):
+        self.results = results or {}
+        self.calls = []
+        self.release = threading.Event()
+
+    def resource(self, public_id, **kwargs):
+        self.calls.append(public_id)
+        result = self.results.get(public_id)
+        if result == "hang":
+            self.release.wait(5)
+            return {}
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+class CloudinaryClientTests(SimpleTestCase):
+    def setUp(self):
+        # Entered first so it outlasts the cleanups that let hung calls finish.
+        self.enterContext(mock.patch("prep_portal_api.cloudinary_client.logger"))
+        self.now = 0.0
+        self.breaker = CircuitBreaker(threshold=2, reset_after=30, clock=lambda: self.now)
+        self.api = FakeApi()
+        self.client = CloudinaryClient(api=self.api, uploader=self.api, max_workers=2, timeout=1, breaker=self.breaker)
+        self.addCleanup(self.client._executor.shutdown, wait=True)
+        self.addCleanup(self.api.release.set)
+
+    def test_breaker_opens_after_threshold_failures(self):
+        self.api.results["x"] = RuntimeError("502")
+        for _ in range(2):
+            with self.assertRaises(RuntimeError):
+                self.client.resource("x")
+        self.assertEqual(self.breaker.state, "open")
+        with self.assertRaises(CloudinaryUnavailable):
+            self.client.resource("x")
+        self.assertEqual(len(self.api.calls), 2)  # failed fast, the API was not called
+
+    def test_half_open_lets_a_single_probe_through(self):
+        for _ in range(2):
+            self.breaker.record_failure()
+        self.now += 30
+        self.assertEqual(self.breaker.state, "half_open")
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())  # a second caller while the probe is out
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, "open")  # failed probe reopens at once
+
+        self.now += 30
+        self.api.results["x"] = {"public_id": "x"}
+        self.assertEqual(self.client.resource("x"), {"public_id": "x"})
+        self.assertEqual(self.breaker.state, "closed")
+
+    def test_client_errors_count_as_healthy(self):
+        from cloudinary.exceptions import NotFound
+
+        self.api.results["gone"] = NotFound("404")
+        for _ in range(3):
+            with self.assertRaises(NotFound):
+                self.client.resource("gone")
+        self.assertEqual(self.breaker.state, "closed")
+
+    def test_timeout_raises_unavailable_and_counts_as_a_failure(self):
+        self.api.results["slow"] = "hang"
+        with self.assertRaises(CloudinaryUnavailable):
+            self.client.resource("slow", timeout=0.05)
+        self.api.release.set()
+        self.client._executor.shutdown(wait=True)
+        # The late answer counted as the first failure, so one more reaches the threshold.
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, "open")
+
+    def test_first_success_and_misses(self):
+        self.api.results.update({"a": RuntimeError("502"), "c": {"public_id": "c"}})
+        calls = [(self.api.resource, (pid,), {}) for pid in ("a", "b", "c")]
+        self.assertEqual(self.client.first_success(calls), (2, {"public_id": "c"}))
+        self.assertIsNone(self.client.first_success(calls[:2]))
+
+    def test_fan_out_cut_short_by_the_breaker_raises(self):
+        for _ in range(2):
+            self.breaker.record_failure()
+        self.now += 30  # half-open: only the first candidate runs, as the probe
+        self.api.results["a"] = "hang"
+        calls = [(self.api.resource, (pid,), {}) for pid in ("a", "b")]
+        with self.assertRaises(CloudinaryUnavailable):
+            self.client.first_success(calls, timeout=0.05)
+        self.assertEqual(self.api.calls, ["a"])
@@ -0,0 +1,143 @@
+"""
+Shared handling for uploaded files.
+
+Django already spools request bodies above FILE_UPLOAD_MAX_MEMORY_SIZE to a
+temp file; the helpers here keep it that way: size limits are checked from the
+upload handler's byte count, content is sniffed from the first few bytes, files
+go to storage chunk by chunk and CSVs are decoded incrementally. store_file()
+is where course files and submissions land, whether they arrived in one
+request or through a chunked upload session (mediafiles.chunked).
+"""
+import codecs
+import csv
+import io
+import os
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+SNIFF_BYTES = 16
+READ_CHUNK = 64 * 1024
+
+# Names store_file() keeps in default storage rather than Cloudinary raw. Image uploads
+# (avatars, university icons, question images) are judged by sniff_image() instead.
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".gif", ".heic", ".heif", ".svg")
+
+# ISO-BMFF brands of HEIC/HEIF stills (iPhone and most Android cameras).
+HEIF_BRANDS = (b"heic", b"heix", b"heim", b"heis", b"hevc", b"hevx", b"mif1", b"msf1")
+
+MAX_IMAGE_BYTES = getattr(settings, "UPLOAD_MAX_IMAGE_BYTES", 10 * 1024 * 1024)
+MAX_CSV_BYTES = getattr(settings, "UPLOAD_MAX_CSV_BYTES", 20 * 1024 * 1024)
+
+EXCEL_ERROR = (
+    "It looks like you uploaded an Excel (.xlsx) file. "
+    "Please export or save it as CSV (UTF-8) and try again."
+)
+
+
+class UploadRejected(Exception):
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def _head(upload) -> bytes:
+    upload.seek(0)
+    head = upload.read(SNIFF_BYTES)
+    upload.seek(0)
+    return head
+
+
+def sniff_image(upload) -> str | None:
+    """
+    File extension for a supported image type, judged by magic bytes rather than the client's name.
+    SVG is refused on purpose: it can carry script, and these files are served from our own origin.
+    """
+    head = _head(upload)
+    if head.startswith(b"\xff\xd8\xff"):
+        return ".jpg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return ".png"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return ".gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    if head[4:8] == b"ftyp" and head[8:12] in HEIF_BRANDS:
+        return ".heic"
+    return None
+
+
+def check_size(upload, max_bytes: int):
+    if upload.size is not None and upload.size > max_bytes:
+        raise UploadRejected(f"File too large (max {max_bytes // (1024 * 1024)} MB)", status=413)
+
+
+def save_image_upload(upload, name_root: str, max_bytes: int = MAX_IMAGE_BYTES) -> str:
+    """Validate an image upload and stream it to default storage; returns the saved path."""
+    check_size(upload, max_bytes)
+    ext = sniff_image(upload)
+    if not ext:
+        raise UploadRejected("Unsupported image type (use JPEG, PNG, GIF, WebP or HEIC)")
+    # Storage backends copy via upload.chunks(), so the body is never joined in memory.
+    return default_storage.save(f"{name_root}{ext}", upload)
+
+
+def store_file(rel_path: str, file_obj, mime_type: str | None = None):
+    """
+    Save a course file or submission: PDFs and other non-images go to Cloudinary
+    as public raw assets when it is configured, everything else to default storage.
+    Returns (saved_path, cloud_location) where cloud_location holds the CourseNode
+    cloud_* fields (empty for default storage); raises CloudinaryUnavailable.
+    """
+    mime = (mime_type or "").lower()
+    is_pdf = mime == "application/pdf" or rel_path.lower().endswith(".pdf")
+    is_image = mime.startswith("image/") or rel_path.lower().endswith(IMAGE_EXTENSIONS)
+    if os.getenv("CLOUDINARY_URL") and (is_pdf or not is_image):
+        from .cloudinary_client import get_client
+
+        public_id = f"media/{rel_path.rsplit('.', 1)[0]}"
+        result = get_client().upload(
+            file_obj,
+            public_id=public_id,
+            resource_type="raw",
+            type="upload",
+            access_mode="public",
+            overwrite=True,
+        )
+        saved_path = result.get("public_id") or public_id
+        return saved_path, {
+            "cloud_public_id": saved_path,
+            "cloud_resource_type": result.get("resource_type") or "raw",
+            "cloud_delivery_type": result.get("type") or "upload",
+        }
+    return default_storage.save(rel_path, file_obj), {}
+
+
+def _detect_encoding(raw) -> str:
+    """utf-8-sig when the whole stream decodes as UTF-8, else latin-1; scans in fixed-size chunks."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    raw.seek(0)
+    try:
+        while True:
+            chunk = raw.read(READ_CHUNK)
+            if not chunk:
+                decoder.decode(b"", final=True)
+                break
+            decoder.decode(chunk)
+    except UnicodeDecodeError:
+        return "iso-8859-1"
+    finally:
+        raw.seek(0)
+    return "utf-8-sig"
+
+
+def csv_dict_reader(upload, max_bytes: int = MAX_CSV_BYTES) -> csv.DictReader:
+    """DictReader over the upload, decoded lazily through a text wrapper."""
+    check_size(upload, max_bytes)
+    if _head(upload).startswith(b"PK"):
+        raise UploadRejected(EXCEL_ERROR)
+    raw = upload.file
+    encoding = _detect_encoding(raw)
+    text = io.TextIOWrapper(raw, encoding=encoding, newline="")
+    return csv.DictReader(text)
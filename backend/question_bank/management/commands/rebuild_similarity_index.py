@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from question_bank.models import Question
+from question_bank.similarity import index_questions
+
+
+class Command(BaseCommand):
+    help = "Rebuild the near-duplicate (MinHash/LSH) index for every question."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options["batch_size"])
+        batch = []
+        total = 0
+        for q in Question.objects.only("id", "subject", "stem", "passage").iterator(chunk_size=batch_size):
+            batch.append(q)
+            if len(batch) >= batch_size:
+                index_questions(batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            index_questions(batch)
+            total += len(batch)
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} questions."))
@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('question_bank', '0003_subtopicprogress_topicprogress'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['subject', 'topic', 'created_at', 'id'], name='question_ba_subject_038696_idx'),
+        ),
+    ]
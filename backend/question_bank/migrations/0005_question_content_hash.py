@@ -0,0 +1,52 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:00
+
+import hashlib
+import json
+import re
+
+from django.db import migrations, models
+
+
+# Frozen copy of question_bank.models.question_content_hash as of this migration.
+def _normalize_text(value) -> str:
+    return re.sub(r"\s+", " ", str(value or "")).strip().lower()
+
+
+def question_content_hash(subject, stem, passage, choices) -> str:
+    payload = {
+        "subject": _normalize_text(subject),
+        "stem": _normalize_text(stem),
+        "passage": _normalize_text(passage),
+        "choices": [_normalize_text((c or {}).get("content")) for c in (choices or []) if isinstance(c, dict)],
+    }
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def backfill_content_hash(apps, schema_editor):
+    Question = apps.get_model("question_bank", "Question")
+    batch = []
+    for q in Question.objects.only("id", "subject", "stem", "passage", "choices").iterator(chunk_size=500):
+        q.content_hash = question_content_hash(q.subject, q.stem, q.passage, q.choices)
+        batch.append(q)
+        if len(batch) >= 500:
+            Question.objects.bulk_update(batch, ["content_hash"])
+            batch = []
+    if batch:
+        Question.objects.bulk_update(batch, ["content_hash"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('question_bank', '0004_question_question_ba_subject_038696_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+        migrations.RunPython(backfill_content_hash, migrations.RunPython.noop),
+    ]
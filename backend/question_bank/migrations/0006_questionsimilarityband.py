@@ -0,0 +1,81 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:00
+
+import hashlib
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Frozen copy of question_bank.similarity.question_keys as of this migration.
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+
+_MERSENNE = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def _seeded(i: int, salt: str) -> int:
+    digest = hashlib.blake2b(f"{salt}:{i}".encode("ascii"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % _MERSENNE
+
+
+_PERMS = [(_seeded(i, "a") or 1, _seeded(i, "b")) for i in range(NUM_PERM)]
+
+
+def _shingles(stem, passage) -> set[str]:
+    text = re.sub(r"[^\w\s]", " ", f"{passage or ''} {stem or ''}".lower())
+    words = re.sub(r"\s+", " ", text).strip().split()
+    if len(words) < SHINGLE_SIZE:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def question_keys(q) -> list[str]:
+    hashed = [
+        int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "big")
+        for s in _shingles(q.stem, q.passage)
+    ]
+    if not hashed:
+        return []
+    sig = [min((a * h + b) % _MERSENNE & _MAX_HASH for h in hashed) for a, b in _PERMS]
+    keys = []
+    for band in range(BANDS):
+        chunk = sig[band * ROWS:(band + 1) * ROWS]
+        digest = hashlib.blake2b(repr(chunk).encode("ascii"), digest_size=8).hexdigest()
+        keys.append(f"{q.subject[:1]}{band:02d}{digest}")
+    return keys
+
+
+def build_similarity_index(apps, schema_editor):
+    Question = apps.get_model("question_bank", "Question")
+    QuestionSimilarityBand = apps.get_model("question_bank", "QuestionSimilarityBand")
+    rows = []
+    for q in Question.objects.only("id", "subject", "stem", "passage").iterator(chunk_size=500):
+        rows.extend(QuestionSimilarityBand(question_id=q.id, key=key) for key in question_keys(q))
+        if len(rows) >= 5000:
+            QuestionSimilarityBand.objects.bulk_create(rows)
+            rows = []
+    if rows:
+        QuestionSimilarityBand.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('question_bank', '0005_question_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionSimilarityBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(db_index=True, max_length=24)),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similarity_bands', to='question_bank.question')),
+            ],
+        ),
+        migrations.RunPython(build_similarity_index, migrations.RunPython.noop),
+    ]
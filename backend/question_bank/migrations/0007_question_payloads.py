@@ -0,0 +1,82 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+# Frozen copies of question_bank.models.question_student_payload/question_staff_payload
+# (and prep_portal_api.choices.render_choices) as of this migration.
+def _render_choices(raw_choices, with_key: bool = False) -> list[dict]:
+    rendered = []
+    for idx, c in enumerate(raw_choices or []):
+        item = {"label": c.get("label") or chr(65 + idx), "content": c.get("content")}
+        if with_key:
+            item["is_correct"] = bool(c.get("is_correct"))
+        rendered.append(item)
+    return rendered
+
+
+def question_student_payload(q) -> dict:
+    return {
+        "id": str(q.id),
+        "subject": q.subject,
+        "topic": q.topic,
+        "subtopic": q.subtopic,
+        "stem": q.stem,
+        "passage": q.passage,
+        "choices": _render_choices(q.choices),
+        "is_open_ended": q.is_open_ended,
+        "image_url": q.image_url,
+        "difficulty": q.difficulty,
+    }
+
+
+def question_staff_payload(q) -> dict:
+    return {
+        "id": str(q.id),
+        "subject": q.subject,
+        "topic": q.topic,
+        "subtopic": q.subtopic,
+        "stem": q.stem,
+        "passage": q.passage,
+        "choices": _render_choices(q.choices, with_key=True),
+        "is_open_ended": q.is_open_ended,
+        "correct_answer": q.correct_answer,
+        "explanation": q.explanation,
+        "image_url": q.image_url,
+        "difficulty": q.difficulty,
+    }
+
+
+def build_question_payloads(apps, schema_editor):
+    Model = apps.get_model("question_bank", "Question")
+    batch = []
+    for q in Model.objects.iterator(chunk_size=500):
+        q.student_payload = question_student_payload(q)
+        q.staff_payload = question_staff_payload(q)
+        batch.append(q)
+        if len(batch) >= 500:
+            Model.objects.bulk_update(batch, ["student_payload", "staff_payload"])
+            batch = []
+    if batch:
+        Model.objects.bulk_update(batch, ["student_payload", "staff_payload"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('question_bank', '0006_questionsimilarityband'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='staff_payload',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='student_payload',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.RunPython(build_question_payloads, migrations.RunPython.noop),
+    ]
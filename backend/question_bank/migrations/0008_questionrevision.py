@@ -0,0 +1,88 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:00
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+REVISION_FIELDS = (
+    "subject",
+    "topic",
+    "subtopic",
+    "stem",
+    "passage",
+    "explanation",
+    "image_url",
+    "choices",
+    "is_open_ended",
+    "correct_answer",
+    "difficulty",
+    "content_hash",
+    "student_payload",
+    "staff_payload",
+)
+
+
+def create_initial_revisions(apps, schema_editor):
+    Question = apps.get_model("question_bank", "Question")
+    QuestionRevision = apps.get_model("question_bank", "QuestionRevision")
+    batch = []
+
+    def flush():
+        revisions = [
+            QuestionRevision(question_id=q.id, number=1, **{name: getattr(q, name) for name in REVISION_FIELDS})
+            for q in batch
+        ]
+        QuestionRevision.objects.bulk_create(revisions)
+        for q, rev in zip(batch, revisions):
+            q.current_revision_id = rev.id
+        Question.objects.bulk_update(batch, ["current_revision"])
+
+    for q in Question.objects.filter(current_revision__isnull=True).iterator(chunk_size=500):
+        batch.append(q)
+        if len(batch) >= 500:
+            flush()
+            batch = []
+    if batch:
+        flush()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('question_bank', '0007_question_payloads'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionRevision',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('number', models.PositiveIntegerField()),
+                ('subject', models.CharField(choices=[('verbal', 'Verbal'), ('math', 'Math')], max_length=20)),
+                ('topic', models.CharField(max_length=200)),
+                ('subtopic', models.CharField(blank=True, max_length=200, null=True)),
+                ('stem', models.TextField()),
+                ('passage', models.TextField(blank=True, null=True)),
+                ('explanation', models.TextField(blank=True, null=True)),
+                ('image_url', models.URLField(blank=True, null=True)),
+                ('choices', models.JSONField(default=list)),
+                ('is_open_ended', models.BooleanField(default=False)),
+                ('correct_answer', models.TextField(blank=True, null=True)),
+                ('difficulty', models.CharField(blank=True, max_length=10, null=True)),
+                ('content_hash', models.CharField(blank=True, max_length=64, null=True)),
+                ('student_payload', models.JSONField(blank=True, default=dict)),
+                ('staff_payload', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revisions', to='question_bank.question')),
+            ],
+            options={
+                'unique_together': {('question', 'number')},
+            },
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='current_revision',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='question_bank.questionrevision'),
+        ),
+        migrations.RunPython(create_initial_revisions, migrations.RunPython.noop),
+    ]
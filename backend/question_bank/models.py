@@ -1,8 +1,68 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
 from django.conf import settings
+from types import SimpleNamespace
+import hashlib
+import json
+import re
 import uuid
 
 
+def _normalize_text(value) -> str:
+    return re.sub(r"\s+", " ", str(value or "")).strip().lower()
+
+
+def question_content_hash(subject, stem, passage, choices) -> str:
+    """Stable fingerprint of a question's content, ignoring case and whitespace."""
+    payload = {
+        "subject": _normalize_text(subject),
+        "stem": _normalize_text(stem),
+        "passage": _normalize_text(passage),
+        "choices": [_normalize_text((c or {}).get("content")) for c in (choices or []) if isinstance(c, dict)],
+    }
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def question_student_payload(q) -> dict:
+    """Student-facing question JSON (no answer key); works on overrides too."""
+    from prep_portal_api.choices import render_choices
+
+    return {
+        "id": str(q.id),
+        "subject": q.subject,
+        "topic": q.topic,
+        "subtopic": q.subtopic,
+        "stem": q.stem,
+        "passage": q.passage,
+        "choices": render_choices(q.choices),
+        "is_open_ended": q.is_open_ended,
+        "image_url": q.image_url,
+        "difficulty": q.difficulty,
+    }
+
+
+def question_staff_payload(q) -> dict:
+    """Staff/review question JSON, including the answer key and explanation."""
+    from prep_portal_api.choices import render_choices
+
+    return {
+        "id": str(q.id),
+        "subject": q.subject,
+        "topic": q.topic,
+        "subtopic": q.subtopic,
+        "stem": q.stem,
+        "passage": q.passage,
+        "choices": render_choices(q.choices, with_key=True),
+        "is_open_ended": q.is_open_ended,
+        "correct_answer": q.correct_answer,
+        "explanation": q.explanation,
+        "image_url": q.image_url,
+        "difficulty": q.difficulty,
+    }
+
+
 class Question(models.Model):
     SUBJECT_CHOICES = [
         ("verbal", "Verbal"),
@@ -22,6 +82,13 @@ class Question(models.Model):
     correct_answer = models.TextField(blank=True, null=True)
     difficulty = models.CharField(max_length=10, blank=True, null=True)
     published = models.BooleanField(default=False)
+    content_hash = models.CharField(max_length=64, blank=True, null=True, db_index=True)
+    # Pre-rendered response fragments, regenerated on every save.
+    student_payload = models.JSONField(default=dict, blank=True, editable=False)
+    staff_payload = models.JSONField(default=dict, blank=True, editable=False)
+    current_revision = models.ForeignKey(
+        "QuestionRevision", on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name="+"
+    )
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="questions")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -29,11 +96,159 @@ class Question(models.Model):
     class Meta:
         indexes = [
             models.Index(fields=["subject", "topic"]),
+            models.Index(fields=["subject", "topic", "created_at", "id"]),
         ]
 
     def __str__(self):
         return f"{self.subject} | {self.topic}: {self.stem[:50]}"
 
+    def refresh_content_hash(self):
+        self.content_hash = question_content_hash(self.subject, self.stem, self.passage, self.choices)
+        return self.content_hash
+
+    def refresh_payloads(self):
+        self.student_payload = question_student_payload(self)
+        self.staff_payload = question_staff_payload(self)
+
+    def save(self, *args, **kwargs):
+        self.refresh_content_hash()
+        self.refresh_payloads()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            derived = ["content_hash", "student_payload", "staff_payload"]
+            kwargs["update_fields"] = list(update_fields) + [f for f in derived if f not in update_fields]
+        super().save(*args, **kwargs)
+        if update_fields is None or set(update_fields) & set(REVISION_FIELDS):
+            snapshot_revisions([self])
+
+
+REVISION_FIELDS = (
+    "subject",
+    "topic",
+    "subtopic",
+    "stem",
+    "passage",
+    "explanation",
+    "image_url",
+    "choices",
+    "is_open_ended",
+    "correct_answer",
+    "difficulty",
+    "content_hash",
+    "student_payload",
+    "staff_payload",
+)
+
+
+class QuestionRevision(models.Model):
+    """Append-only content snapshot; rows are never updated, so anything keyed by id can be cached forever."""
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name="revisions")
+    number = models.PositiveIntegerField()
+    subject = models.CharField(max_length=20, choices=Question.SUBJECT_CHOICES)
+    topic = models.CharField(max_length=200)
+    subtopic = models.CharField(max_length=200, blank=True, null=True)
+    stem = models.TextField()
+    passage = models.TextField(blank=True, null=True)
+    explanation = models.TextField(blank=True, null=True)
+    image_url = models.URLField(blank=True, null=True)
+    choices = models.JSONField(default=list)
+    is_open_ended = models.BooleanField(default=False)
+    correct_answer = models.TextField(blank=True, null=True)
+    difficulty = models.CharField(max_length=10, blank=True, null=True)
+    content_hash = models.CharField(max_length=64, blank=True, null=True)
+    student_payload = models.JSONField(default=dict, blank=True)
+    staff_payload = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("question", "number")
+
+    def __str__(self):
+        return f"{self.question_id} r{self.number}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Question revisions are immutable")
+        super().save(*args, **kwargs)
+
+    def as_question(self):
+        """Question-shaped view of this snapshot (id is the question's id, as in live payloads)."""
+        data = {name: getattr(self, name) for name in REVISION_FIELDS}
+        return SimpleNamespace(id=self.question_id, revision_id=self.id, **data)
+
+
+def snapshot_revisions(questions):
+    """
+    Append a revision for every saved question whose content differs from its
+    current revision, and repoint Question.current_revision. Used by save() and
+    by bulk writes, which skip save().
+    """
+    questions = [q for q in questions if q.pk]
+    if not questions:
+        return []
+    with transaction.atomic():
+        return _snapshot_locked(questions)
+
+
+def _snapshot_locked(questions):
+    # Lock the questions so concurrent saves number their revisions one after the other
+    # (instead of both taking Max+1), and compare against the current revision as of the lock.
+    locked = dict(
+        Question.objects.select_for_update()
+        .filter(pk__in=[q.pk for q in questions])
+        .order_by("pk")
+        .values_list("pk", "current_revision_id")
+    )
+    questions = [q for q in questions if q.pk in locked]
+    for q in questions:
+        q.current_revision_id = locked[q.pk]
+    current = {
+        r.id: r.staff_payload
+        for r in QuestionRevision.objects.filter(
+            id__in=[q.current_revision_id for q in questions if q.current_revision_id]
+        ).only("id", "staff_payload")
+    }
+    changed = [
+        q for q in questions if not q.current_revision_id or current.get(q.current_revision_id) != q.staff_payload
+    ]
+    if not changed:
+        return []
+    latest = dict(
+        QuestionRevision.objects.filter(question_id__in=[q.pk for q in changed])
+        .values("question_id")
+        .annotate(n=models.Max("number"))
+        .values_list("question_id", "n")
+    )
+    revisions = [
+        QuestionRevision(
+            question_id=q.pk,
+            number=(latest.get(q.pk) or 0) + 1,
+            **{name: getattr(q, name) for name in REVISION_FIELDS},
+        )
+        for q in changed
+    ]
+    QuestionRevision.objects.bulk_create(revisions)
+    for q, rev in zip(changed, revisions):
+        q.current_revision_id = rev.id
+    Question.objects.bulk_update(changed, ["current_revision"])
+    return revisions
+
+
+class QuestionSimilarityBand(models.Model):
+    """One LSH band bucket of a question's MinHash signature (see similarity.py)."""
+
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name="similarity_bands")
+    key = models.CharField(max_length=24, db_index=True)
+
+
+@receiver(post_save, sender=Question)
+def reindex_question_similarity(sender, instance: Question, **kwargs):
+    from .similarity import index_questions
+
+    index_questions([instance])
+
 
 class SubtopicProgress(models.Model):
     SUBJECT_CHOICES = Question.SUBJECT_CHOICES
@@ -0,0 +1,113 @@
+import hashlib
+import random
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.utils import timezone
+
+POOL_TTL_SECONDS = 15 * 60
+RECENT_DAYS = 7
+
+
+def _slice(subject: str, topic: str, subtopic: str | None):
+    from .models import Question
+
+    qs = Question.objects.filter(subject=subject, topic=topic)
+    if subtopic:
+        qs = qs.filter(subtopic=subtopic)
+    return qs
+
+
+def _pool_version(subject: str, topic: str, subtopic: str | None) -> str:
+    """
+    Row count and newest updated_at of the slice, read from the database so every
+    worker agrees on it. Any save, bulk write or publish toggle moves updated_at;
+    a question leaving the slice (delete or retag) lowers the count.
+    """
+    agg = _slice(subject, topic, subtopic).aggregate(n=Count("id"), latest=Max("updated_at"))
+    latest = agg["latest"].isoformat() if agg["latest"] else ""
+    return f"{agg['n']}:{latest}"
+
+
+def _pool_key(subject: str, topic: str, subtopic: str | None, published_only: bool) -> str:
+    raw = "|".join(
+        [subject, topic, subtopic or "", "pub" if published_only else "all", _pool_version(subject, topic, subtopic)]
+    )
+    digest = hashlib.sha1(raw.encode("utf-8")).hexdigest()
+    return f"question_bank:pool:{digest}"
+
+
+def get_id_pool(subject: str, topic: str, subtopic: str | None = None, published_only: bool = True) -> list[str]:
+    key = _pool_key(subject, topic, subtopic, published_only)
+    pool = cache.get(key)
+    if pool is not None:
+        return pool
+
+    qs = _slice(subject, topic, subtopic)
+    if published_only:
+        qs = qs.filter(published=True)
+    pool = [str(i) for i in qs.values_list("id", flat=True)]
+    cache.set(key, pool, POOL_TTL_SECONDS)
+    return pool
+
+
+def recent_question_ids(user, subject: str, days: int = RECENT_DAYS) -> set[str]:
+    from streaks.models import QuestionAttempt
+
+    since = timezone.now().date() - timedelta(days=days)
+    rows = QuestionAttempt.objects.filter(
+        user=user, subject=subject, attempted_date__gte=since
+    ).values_list("question_id", flat=True)
+    return {str(i) for i in rows}
+
+
+def sample_ids(pool: list[str], count: int, exclude: set[str] | None = None) -> list[str]:
+    """
+    Pick up to `count` distinct ids, preferring ids outside `exclude`.
+    Excluded ids are only used to top up when the fresh pool runs short.
+    """
+    count = min(count, len(pool))
+    if count <= 0:
+        return []
+    if not exclude:
+        return random.sample(pool, count)
+
+    picked: list[str] = []
+    seen: set[str] = set()
+    # Rejection sampling keeps the common case O(count) instead of O(pool).
+    for _ in range(count * 4):
+        qid = pool[random.randrange(len(pool))]
+        if qid in seen or qid in exclude:
+            continue
+        seen.add(qid)
+        picked.append(qid)
+        if len(picked) == count:
+            return picked
+
+    fresh = [qid for qid in pool if qid not in exclude and qid not in seen]
+    need = count - len(picked)
+    picked.extend(random.sample(fresh, min(need, len(fresh))))
+    need = count - len(picked)
+    if need > 0:
+        stale = [qid for qid in pool if qid in exclude]
+        picked.extend(random.sample(stale, min(need, len(stale))))
+    return picked
+
+
+def sample_questions(
+    subject: str,
+    topic: str,
+    subtopic: str | None,
+    count: int,
+    published_only: bool = True,
+    exclude: set[str] | None = None,
+):
+    from .models import Question
+
+    ids = sample_ids(get_id_pool(subject, topic, subtopic, published_only), count, exclude)
+    if not ids:
+        return []
+    by_id = {str(q.id): q for q in Question.objects.filter(id__in=ids)}
+    # Rows deleted since the pool was cached are simply skipped.
+    return [by_id[qid] for qid in ids if qid in by_id]
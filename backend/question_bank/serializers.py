@@ -3,6 +3,14 @@ from .models import Question
 
 
 class QuestionSerializer(serializers.ModelSerializer):
+    def __init__(self, *args, **kwargs):
+        # Optional sparse fieldset: QuestionSerializer(qs, many=True, fields=[...])
+        only = kwargs.pop("fields", None)
+        super().__init__(*args, **kwargs)
+        if only:
+            for name in set(self.fields) - set(only):
+                self.fields.pop(name)
+
     class Meta:
         model = Question
         fields = [
@@ -19,11 +27,26 @@ class QuestionSerializer(serializers.ModelSerializer):
             "correct_answer",
             "difficulty",
             "published",
+            "current_revision",
             "created_by",
             "created_at",
             "updated_at",
         ]
-        read_only_fields = ["id", "created_by", "created_at", "updated_at"]
+        read_only_fields = ["id", "current_revision", "created_by", "created_at", "updated_at"]
+
+    def to_representation(self, instance):
+        # Fast path: splice the blob regenerated on save instead of walking every field.
+        if not getattr(instance, "staff_payload", None) or "staff_payload" in instance.get_deferred_fields():
+            return super().to_representation(instance)
+        data = dict(instance.staff_payload)
+        data["choices"] = instance.choices
+        data["published"] = instance.published
+        data["current_revision"] = instance.current_revision_id
+        data["created_by"] = instance.created_by_id
+        for name in ("created_at", "updated_at"):
+            if name in self.fields:
+                data[name] = self.fields[name].to_representation(getattr(instance, name))
+        return {name: data.get(name) for name in self.fields}
 
     def validate(self, attrs):
         is_open_ended = attrs.get("is_open_ended")
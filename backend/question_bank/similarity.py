@@ -0,0 +1,166 @@
+"""
+MinHash/LSH index for spotting near-duplicate questions.
+
+Each question's normalized stem + passage is shingled into word trigrams and
+summarised by a MinHash signature. The signature is split into bands; every
+band is stored as one QuestionSimilarityBand row, so candidates for a new text
+come from a single indexed `key IN (...)` lookup instead of a pairwise scan.
+"""
+import hashlib
+import re
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+DEFAULT_THRESHOLD = 0.7
+KEY_BATCH = 900
+
+_MERSENNE = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def _seeded(i: int, salt: str) -> int:
+    digest = hashlib.blake2b(f"{salt}:{i}".encode("ascii"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % _MERSENNE
+
+
+_PERMS = [(_seeded(i, "a") or 1, _seeded(i, "b")) for i in range(NUM_PERM)]
+
+
+def normalize(text: str | None) -> str:
+    text = (text or "").lower()
+    text = re.sub(r"[^\w\s]", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def shingles(stem: str | None, passage: str | None = None) -> set[str]:
+    words = normalize(f"{passage or ''} {stem or ''}").split()
+    if len(words) < SHINGLE_SIZE:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def signature(shingle_set: set[str]) -> list[int]:
+    hashed = [
+        int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "big")
+        for s in shingle_set
+    ]
+    if not hashed:
+        return []
+    return [min((a * h + b) % _MERSENNE & _MAX_HASH for h in hashed) for a, b in _PERMS]
+
+
+def band_keys(subject: str, sig: list[int]) -> list[str]:
+    """LSH bucket keys; scoped by subject so math and verbal never collide."""
+    keys = []
+    for band in range(BANDS):
+        chunk = sig[band * ROWS:(band + 1) * ROWS]
+        digest = hashlib.blake2b(repr(chunk).encode("ascii"), digest_size=8).hexdigest()
+        keys.append(f"{subject[:1]}{band:02d}{digest}")
+    return keys
+
+
+def jaccard(a: set[str], b: set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def question_keys(q) -> list[str]:
+    sig = signature(shingles(q.stem, q.passage))
+    if not sig:
+        return []
+    return band_keys(q.subject, sig)
+
+
+def index_questions(questions):
+    """(Re)build band rows for the given questions. Safe to call repeatedly."""
+    from .models import QuestionSimilarityBand
+
+    questions = list(questions)
+    if not questions:
+        return
+    QuestionSimilarityBand.objects.filter(question_id__in=[q.id for q in questions]).delete()
+    rows = [
+        QuestionSimilarityBand(question_id=q.id, key=key)
+        for q in questions
+        for key in question_keys(q)
+    ]
+    QuestionSimilarityBand.objects.bulk_create(rows, batch_size=1000)
+
+
+def find_similar(subject, stem, passage=None, threshold=DEFAULT_THRESHOLD, exclude_ids=None, limit=10):
+    """Return [(question, similarity)] for indexed questions resembling the given text."""
+    from .models import Question, QuestionSimilarityBand
+
+    target = shingles(stem, passage)
+    sig = signature(target)
+    if not sig:
+        return []
+    keys = band_keys(subject, sig)
+    exclude = {str(i) for i in exclude_ids or []}
+    candidate_ids = {
+        qid
+        for qid in QuestionSimilarityBand.objects.filter(key__in=keys).values_list("question_id", flat=True)
+        if str(qid) not in exclude
+    }
+    if not candidate_ids:
+        return []
+
+    results = []
+    for q in Question.objects.filter(id__in=candidate_ids).only("id", "subject", "topic", "subtopic", "stem", "passage"):
+        score = jaccard(target, shingles(q.stem, q.passage))
+        if score >= threshold:
+            results.append((q, score))
+    results.sort(key=lambda item: item[1], reverse=True)
+    return results[:limit]
+
+
+def find_similar_bulk(questions, threshold=DEFAULT_THRESHOLD):
+    """
+    Batch variant for imports: one band lookup for all given (unsaved) questions.
+    Returns {index_in_input: [(question, similarity), ...]}.
+    """
+    from .models import Question, QuestionSimilarityBand
+
+    prepared = []
+    all_keys = set()
+    for q in questions:
+        target = shingles(q.stem, q.passage)
+        sig = signature(target)
+        keys = band_keys(q.subject, sig) if sig else []
+        prepared.append((target, keys))
+        all_keys.update(keys)
+    if not all_keys:
+        return {}
+
+    by_key: dict[str, set] = {}
+    all_keys = list(all_keys)
+    for start in range(0, len(all_keys), KEY_BATCH):
+        rows = QuestionSimilarityBand.objects.filter(key__in=all_keys[start:start + KEY_BATCH])
+        for key, qid in rows.values_list("key", "question_id"):
+            by_key.setdefault(key, set()).add(qid)
+    wanted = set().union(*by_key.values()) if by_key else set()
+    existing = {
+        q.id: (q, shingles(q.stem, q.passage))
+        for q in Question.objects.filter(id__in=wanted).only("id", "subject", "topic", "stem", "passage")
+    }
+
+    matches = {}
+    for idx, (target, keys) in enumerate(prepared):
+        ids = set()
+        for key in keys:
+            ids |= by_key.get(key, set())
+        hits = []
+        for qid in ids:
+            q, other = existing.get(qid, (None, None))
+            if q is None:
+                continue
+            score = jaccard(target, other)
+            if score >= threshold:
+                hits.append((q, score))
+        if hits:
+            hits.sort(key=lambda item: item[1], reverse=True)
+            matches[idx] = hits
+    return matches
@@ -1,3 +1,277 @@
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from accounts.models import User
+from .models import Question, QuestionRevision, snapshot_revisions
+
+
+def make_question(author, **fields):
+    data = {
+        "subject": "math",
+        "topic": "Algebra",
+        "stem": "1 + 1 = ?",
+        "choices": [{"label": "A", "content": "2", "is_correct": True}, {"label": "B", "content": "3"}],
+        "published": True,
+        "created_by": author,
+    }
+    data.update(fields)
+    return Question.objects.create(**data)
+
+
+class QuestionRevisionTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username="a", email="a@x.io", password="pw")
+        self.question = make_question(self.author)
+
+    def test_content_edits_append_numbered_revisions(self):
+        self.question.stem = "2 + 2 = ?"
+        self.question.save()
+        self.question.published = False
+        self.question.save()
+        numbers = list(self.question.revisions.order_by("number").values_list("number", flat=True))
+        self.assertEqual(numbers, [1, 2])
+        self.assertEqual(self.question.current_revision.number, 2)
+
+    def test_stale_instance_takes_the_next_number(self):
+        other = Question.objects.get(pk=self.question.pk)
+        self.question.stem = "first edit"
+        self.question.save()
+        # `other` still points at revision 1; its edit must become 3, not collide with 2.
+        other.stem = "second edit"
+        other.save()
+        self.assertEqual(
+            list(self.question.revisions.order_by("number").values_list("number", "stem")),
+            [(1, "1 + 1 = ?"), (2, "first edit"), (3, "second edit")],
+        )
+
+    def test_unchanged_content_is_not_snapshotted_again(self):
+        self.question.refresh_from_db()
+        self.assertEqual(snapshot_revisions([self.question]), [])
+        self.assertEqual(QuestionRevision.objects.count(), 1)
+
+    def test_revision_response_is_immutable_and_has_no_current_flag(self):
+        client = APIClient()
+        client.force_authenticate(self.author)
+        rev = self.question.current_revision
+        res = client.get(f"/api/questions/revisions/{rev.id}/")
+        self.assertEqual(res.status_code, 200)
+        self.assertNotIn("is_current", res.data["revision"])
+        self.assertIn("immutable", res["Cache-Control"])
+
+
+class QuestionQuizTests(TestCase):
+    def test_quiz_keeps_the_question_shape_without_the_key(self):
+        author = User.objects.create_superuser(username="a", email="a@x.io", password="pw")
+        question = make_question(author, subtopic="Linear")
+        client = APIClient()
+        client.force_authenticate(author)
+        res = client.get("/api/questions/quiz/?subject=math&topic=Algebra&subtopic=Linear")
+        self.assertEqual(res.status_code, 200, res.data)
+        (data,) = res.data["questions"]
+        for name in ("published", "created_by", "created_at", "updated_at", "current_revision", "explanation"):
+            self.assertIn(name, data)
+        self.assertNotIn("correct_answer", data)
+        self.assertEqual(data["choices"], [{"label": "A", "content": "2"}, {"label": "B", "content": "3"}])
+        question.refresh_from_db()
+        self.assertTrue(question.choices[0]["is_correct"])
+
+
+class PracticeProgressTests(TestCase):
+    def test_record_merges_into_the_stored_progress(self):
+        from accounts.models import Profile
+        from .views import _record_progress
+
+        user = User.objects.create_user(username="s", email="s@x.io", password="pw")
+        stale = User.objects.get(pk=user.pk)
+        stale.profile  # loaded before the other request's write
+        _record_progress(user, "math", "Algebra", "Linear")
+        _record_progress(stale, "math", "Geometry", "Angles")
+        _record_progress(stale, "math", "Algebra")
+        self.assertEqual(
+            Profile.objects.get(user=user).practice_progress,
+            {"math": {"subtopics": [["Algebra", "Linear"], ["Geometry", "Angles"]], "topics": ["Algebra"]}},
+        )
+        self.assertEqual(stale.profile.practice_progress["math"]["topics"], ["Algebra"])
+
+
+class IdPoolTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username="a", email="a@x.io", password="pw")
+        self.q1 = make_question(self.author)
+        self.q2 = make_question(self.author, stem="2 + 2 = ?")
+
+    def pool(self, **kwargs):
+        from .sampling import get_id_pool
+
+        return set(get_id_pool("math", "Algebra", **kwargs))
+
+    def test_pool_is_served_from_cache_until_the_slice_changes(self):
+        self.assertEqual(self.pool(), {str(self.q1.id), str(self.q2.id)})
+        with self.assertNumQueries(1):  # the version aggregate only
+            self.pool()
+        q3 = make_question(self.author, stem="3 + 3 = ?")
+        self.assertIn(str(q3.id), self.pool())
+
+    def test_writes_that_skip_signals_still_refresh_the_pool(self):
+        self.pool()
+        # As another worker (or a bulk write) would: no signal reaches this process.
+        Question.objects.filter(pk=self.q1.pk).update(published=False, updated_at=timezone.now())
+        self.assertEqual(self.pool(), {str(self.q2.id)})
+        self.assertEqual(self.pool(published_only=False), {str(self.q1.id), str(self.q2.id)})
+        Question.objects.filter(pk=self.q2.pk).delete()
+        self.assertEqual(self.pool(published_only=False), {str(self.q1.id)})
+
+
+class QuestionListCursorTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username="a", email="a@x.io", password="pw")
+        for i in range(3):
+            make_question(self.author, stem=f"q{i}")
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def test_pages_cover_the_list_and_bad_cursors_get_400(self):
+        from prep_portal_api.pagination import encode_cursor
+
+        first = self.client.get("/api/questions/?limit=2").data
+        second = self.client.get(f"/api/questions/?limit=2&cursor={first['next_cursor']}").data
+        stems = {q["stem"] for q in first["questions"] + second["questions"]}
+        self.assertEqual(stems, {"q0", "q1", "q2"})
+        for cursor in ("%%%", encode_cursor("2026-01-01T00:00:00+00:00", "1")):
+            self.assertEqual(self.client.get("/api/questions/", {"cursor": cursor}).status_code, 400)
+
+
+class QuestionListFieldsTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username="a", email="a@x.io", password="pw")
+        make_question(self.author)
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def test_sparse_fieldsets(self):
+        from .views import SUMMARY_FIELDS
+
+        (row,) = self.client.get("/api/questions/?fields=summary").data["questions"]
+        self.assertEqual(set(row), set(SUMMARY_FIELDS))
+        (row,) = self.client.get("/api/questions/?fields=stem&limit=5").data["questions"]
+        self.assertEqual(set(row), {"id", "created_at", "stem"})
+        self.assertEqual(self.client.get("/api/questions/?fields=stem,secret").status_code, 400)
+
+
+class QuestionImportTests(TestCase):
+    HEADER = "subject,topic,stem,choice_a,choice_b,correct,difficulty\n"
+
+    def setUp(self):
+        self.author = User.objects.create_superuser(username="a", email="a@x.io", password="pw")
+        self.existing = make_question(self.author)
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def upload(self, rows, **data):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        csv = (self.HEADER + "".join(rows)).encode("utf-8")
+        data["file"] = SimpleUploadedFile("q.csv", csv, content_type="text/csv")
+        return self.client.post("/api/questions/import/", data, format="multipart")
+
+    def test_duplicates_in_file_and_bank_are_skipped(self):
+        res = self.upload(
+            [
+                "math,Algebra,  1 + 1 =  ?,2,3,A,hard\n",  # same content as the existing question
+                "math,Algebra,5 - 2 = ?,3,4,A,\n",
+                "MATH,Algebra,5 - 2 =   ?,3,4,A,\n",  # repeat within the file
+                "math,Algebra,,1,2,A,\n",
+            ]
+        )
+        self.assertEqual((res.data["created"], res.data["skipped_duplicates"]), (1, 2))
+        self.assertEqual(len(res.data["errors"]), 1)
+        self.assertEqual(Question.objects.count(), 2)
+        self.existing.refresh_from_db()
+        self.assertIsNone(self.existing.difficulty)
+
+    def test_update_mode_and_dry_run(self):
+        res = self.upload(["math,Algebra,1 + 1 = ?,2,3,A,hard\n"], dry_run="1", on_duplicate="update")
+        self.assertEqual(res.data["updated"], 1)
+        self.existing.refresh_from_db()
+        self.assertIsNone(self.existing.difficulty)
+
+        res = self.upload(["math,Algebra,1 + 1 = ?,2,3,A,hard\n"], on_duplicate="update")
+        self.assertEqual((res.data["created"], res.data["updated"]), (0, 1))
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.difficulty, "hard")
+        self.assertEqual(self.existing.revisions.count(), 2)
+
+
+class SimilarityTests(TestCase):
+    STEM = "A train leaves the station at noon travelling at sixty miles per hour towards the coast"
+
+    def setUp(self):
+        self.author = User.objects.create_superuser(username="a", email="a@x.io", password="pw")
+        self.question = make_question(self.author, stem=self.STEM)
+        make_question(self.author, stem="Which of the following best describes the author's tone in the passage")
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def test_near_duplicate_draft_is_found(self):
+        res = self.client.post(
+            "/api/questions/duplicates/",
+            {"subject": "math", "stem": self.STEM.replace("noon", "noon,").upper() + " today"},
+            format="json",
+        )
+        self.assertEqual([d["id"] for d in res.data["duplicates"]], [str(self.question.id)])
+        # Same words under the other subject never collide.
+        res = self.client.post("/api/questions/duplicates/", {"subject": "verbal", "stem": self.STEM}, format="json")
+        self.assertEqual(res.data["duplicates"], [])
+
+    def test_edits_reindex_and_stored_questions_exclude_themselves(self):
+        res = self.client.get(f"/api/questions/duplicates/?question_id={self.question.id}")
+        self.assertEqual(res.data["duplicates"], [])
+        self.assertEqual(self.client.get("/api/questions/duplicates/?question_id=nope").status_code, 400)
+        self.question.stem = "Completely different wording about prime numbers and their factors"
+        self.question.save()
+        res = self.client.post("/api/questions/duplicates/", {"subject": "math", "stem": self.STEM}, format="json")
+        self.assertEqual(res.data["duplicates"], [])
+
+
+class PracticePathTests(TestCase):
+    FIRST, SECOND = "Linear equations in one variable", "Linear functions"
+
+    def setUp(self):
+        self.author = User.objects.create_superuser(username="a", email="a@x.io", password="pw")
+        self.student = User.objects.create_user(username="s", email="s@x.io", password="pw")
+        self.question = make_question(self.author, subtopic=self.FIRST)
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def algebra(self):
+        res = self.client.get("/api/questions/path/?subject=math")
+        topic = next(t for t in res.data["topics"] if t["topic"] == "Algebra")
+        return res.data["level"], {s["subtopic"]: s for s in topic["subtopics"]}
+
+    def test_passing_a_subtopic_updates_the_path(self):
+        level, subs = self.algebra()
+        self.assertEqual(level, 0)
+        self.assertEqual((subs[self.FIRST]["unlocked"], subs[self.SECOND]["unlocked"]), (True, False))
+        # Locked subtopics can't be quizzed yet.
+        res = self.client.get("/api/questions/quiz/", {"subject": "math", "topic": "Algebra", "subtopic": self.SECOND})
+        self.assertEqual(res.status_code, 403)
+
+        res = self.client.post(
+            "/api/questions/quiz/submit/",
+            {
+                "subject": "math",
+                "topic": "Algebra",
+                "subtopic": self.FIRST,
+                "answers": [{"question_id": str(self.question.id), "answer": "A"}],
+            },
+            format="json",
+        )
+        self.assertTrue(res.data["passed"])
+        level, subs = self.algebra()
+        self.assertEqual(level, 1)
+        self.assertTrue(subs[self.FIRST]["passed"])
+        self.assertEqual(subs[self.FIRST]["best_score"], 1.0)
+        self.assertTrue(subs[self.SECOND]["unlocked"])
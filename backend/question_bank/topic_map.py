@@ -81,13 +81,60 @@ def get_groups(subject: str):
     return VERBAL_GROUPS
 
 
+class CurriculumGraph:
+    """
+    Precompiled ordering for one subject's practice path.
+    Built once at import so lock checks are dict lookups instead of list scans.
+    """
+
+    def __init__(self, groups):
+        self.topics = [g["title"] for g in groups]
+        self.subtopics = [(g["title"], s) for g in groups for s in g["subtopics"]]
+        self.topic_index = {t: i for i, t in enumerate(self.topics)}
+        self.subtopic_index = {pair: i for i, pair in enumerate(self.subtopics)}
+        self.topic_subtopics = {g["title"]: tuple(g["subtopics"]) for g in groups}
+        # Level needed to have covered every subtopic of a topic.
+        self.topic_last_level = {
+            t: max(i for i, (tt, _) in enumerate(self.subtopics) if tt == t) + 1
+            for t in self.topics
+            if self.topic_subtopics[t]
+        }
+
+    def topic_unlocked(self, topic: str, completed_topics: set[str], level: int) -> bool:
+        idx = self.topic_index.get(topic)
+        if idx is None or idx == 0:
+            return True
+        prev_topic = self.topics[idx - 1]
+        if prev_topic in completed_topics:
+            return True
+        # If level already covers all subtopics in previous topic, unlock.
+        needed = self.topic_last_level.get(prev_topic)
+        if needed is None:
+            return True
+        return level >= needed
+
+    def subtopic_unlocked(self, topic: str, subtopic: str, level: int, completed_topics: set[str]) -> bool:
+        if not self.topic_unlocked(topic, completed_topics, level):
+            return False
+        idx = self.subtopic_index.get((topic, subtopic))
+        if idx is None:
+            return False
+        return idx <= level
+
+
+GRAPHS = {
+    "math": CurriculumGraph(MATH_GROUPS),
+    "verbal": CurriculumGraph(VERBAL_GROUPS),
+}
+
+
+def get_graph(subject: str) -> CurriculumGraph:
+    return GRAPHS["math"] if subject == "math" else GRAPHS["verbal"]
+
+
 def subtopic_order(subject: str):
-    order = []
-    for g in get_groups(subject):
-        for s in g["subtopics"]:
-            order.append((g["title"], s))
-    return order
+    return list(get_graph(subject).subtopics)
 
 
 def topic_order(subject: str):
-    return [g["title"] for g in get_groups(subject)]
+    return list(get_graph(subject).topics)
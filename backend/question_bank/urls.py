@@ -2,10 +2,13 @@ from django.urls import path
 from .views import (
     QuestionsListCreateView,
     QuestionDetailView,
+    QuestionRevisionView,
     QuestionCountsView,
     QuestionImageUploadView,
     QuestionImportView,
+    QuestionDuplicatesView,
     QuestionProgressView,
+    QuestionPathView,
     QuestionQuizView,
     QuestionQuizSubmitView,
 )
@@ -13,10 +16,13 @@ from .views import (
 urlpatterns = [
     path("questions/", QuestionsListCreateView.as_view(), name="questions_list_create"),
     path("questions/<uuid:pk>/", QuestionDetailView.as_view(), name="question_detail"),
+    path("questions/revisions/<uuid:pk>/", QuestionRevisionView.as_view(), name="question_revision"),
     path("questions/counts/", QuestionCountsView.as_view(), name="question_counts"),
     path("questions/upload/", QuestionImageUploadView.as_view(), name="question_image_upload"),
     path("questions/import/", QuestionImportView.as_view(), name="question_import"),
+    path("questions/duplicates/", QuestionDuplicatesView.as_view(), name="question_duplicates"),
     path("questions/progress/", QuestionProgressView.as_view(), name="question_progress"),
+    path("questions/path/", QuestionPathView.as_view(), name="question_path"),
     path("questions/quiz/", QuestionQuizView.as_view(), name="question_quiz"),
     path("questions/quiz/submit/", QuestionQuizSubmitView.as_view(), name="question_quiz_submit"),
 ]
@@ -2,27 +2,64 @@ from collections import defaultdict
 from rest_framework import permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from django.db.models import Count
+from django.db import transaction
+from django.db.models import Count, Q
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
 from django.core.files.storage import default_storage
-from django.core.files.base import ContentFile
 from django.utils import timezone
-import os
-import csv
-import io
+from django.utils.cache import patch_cache_control
 from accounts.views import _require_admin
-from .models import Question, SubtopicProgress, TopicProgress
+from accounts.roles import is_staff
+from mediafiles.images import attach_srcsets, register_image
+from prep_portal_api.pagination import decode_keyset_cursor, encode_cursor, parse_limit
+from prep_portal_api.uploads import UploadRejected, csv_dict_reader, save_image_upload
+from .models import (
+    Question,
+    QuestionRevision,
+    SubtopicProgress,
+    TopicProgress,
+    snapshot_revisions,
+)
 from .serializers import QuestionSerializer
-from .topic_map import subtopic_order, topic_order
+from .sampling import recent_question_ids, sample_questions
+from .similarity import DEFAULT_THRESHOLD, find_similar, find_similar_bulk, index_questions
+from .topic_map import get_graph
 
 
 User = get_user_model()
 
 
-def is_staff(user: User) -> bool:
-    prof = getattr(user, "profile", None)
-    role = (getattr(prof, "role", None) or "").lower()
-    return user.is_superuser or getattr(prof, "is_admin", False) or role in ("admin", "teacher")
+SUMMARY_FIELDS = [
+    "id",
+    "subject",
+    "topic",
+    "subtopic",
+    "difficulty",
+    "is_open_ended",
+    "published",
+    "created_at",
+    "updated_at",
+]
+
+
+def _parse_fields(raw):
+    """
+    Parse a `fields=` query param into a list of serializer fields.
+    Returns None for the full payload and False for unknown names.
+    """
+    if not raw:
+        return None
+    names = [f.strip() for f in str(raw).split(",") if f.strip()]
+    if names == ["summary"]:
+        return list(SUMMARY_FIELDS)
+    if any(n not in QuestionSerializer.Meta.fields for n in names):
+        return False
+    # created_at/id back the pagination cursor, so they are always selected.
+    for required in ("id", "created_at"):
+        if required not in names:
+            names.append(required)
+    return names
 
 
 class QuestionsListCreateView(APIView):
@@ -45,17 +82,34 @@ class QuestionsListCreateView(APIView):
         if not is_staff(request.user):
             qs = qs.filter(published=True)
 
+        fields = _parse_fields(request.query_params.get("fields"))
+        if fields is False:
+            return Response({"error": "Unknown fields requested"}, status=400)
+        if fields:
+            qs = qs.only(*fields)
+
+        qs = qs.order_by("-created_at", "-id")
+        cursor_raw = request.query_params.get("cursor")
         limit_raw = request.query_params.get("limit")
-        qs = qs.order_by("-created_at")
-        if limit_raw:
-            try:
-                limit = int(limit_raw)
-                if limit > 0:
-                    qs = qs[:limit]
-            except ValueError:
-                pass
-        data = QuestionSerializer(qs, many=True).data
-        return Response({"ok": True, "questions": data})
+        if not cursor_raw and not limit_raw:
+            data = QuestionSerializer(qs, many=True, fields=fields).data
+            return Response({"ok": True, "questions": data})
+
+        if cursor_raw:
+            cursor = decode_keyset_cursor(cursor_raw)
+            if not cursor:
+                return Response({"error": "Invalid cursor"}, status=400)
+            created_at, last_id = cursor
+            qs = qs.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=last_id))
+
+        limit = parse_limit(limit_raw, 50, 200)
+        page = list(qs[: limit + 1])
+        next_cursor = None
+        if len(page) > limit:
+            page = page[:limit]
+            next_cursor = encode_cursor(page[-1].created_at.isoformat(), page[-1].id)
+        data = QuestionSerializer(page, many=True, fields=fields).data
+        return Response({"ok": True, "questions": data, "next_cursor": next_cursor})
 
     def post(self, request):
         if not is_staff(request.user):
@@ -79,12 +133,15 @@ class QuestionImageUploadView(APIView):
         if not file:
             return Response({"error": "No file provided"}, status=400)
 
-        ext = os.path.splitext(file.name)[1] or ".jpg"
-        fname = f"question_images/{request.user.id}/{timezone.now().strftime('%Y%m%d%H%M%S')}{ext}"
-        saved_path = default_storage.save(fname, ContentFile(file.read()))
+        name_root = f"question_images/{request.user.id}/{timezone.now().strftime('%Y%m%d%H%M%S')}"
+        try:
+            saved_path = save_image_upload(file, name_root)
+        except UploadRejected as e:
+            return Response({"error": e.message}, status=e.status)
         url = default_storage.url(saved_path) if hasattr(default_storage, "url") else saved_path
         absolute = request.build_absolute_uri(url)
-        return Response({"ok": True, "url": absolute, "path": saved_path})
+        asset = register_image(saved_path, absolute, request.user)
+        return Response({"ok": True, "url": absolute, "path": saved_path, "image": asset.as_json(request)})
 
 
 class QuestionDetailView(APIView):
@@ -126,6 +183,45 @@ class QuestionDetailView(APIView):
         return Response({"ok": True})
 
 
+REVISION_MAX_AGE = 365 * 24 * 60 * 60
+
+
+class QuestionRevisionView(APIView):
+    """Content of one immutable revision; safe for clients to cache indefinitely."""
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk):
+        try:
+            rev = QuestionRevision.objects.select_related("question").only(
+                "id", "number", "created_at", "student_payload", "staff_payload",
+                "question__id", "question__published",
+            ).get(id=pk)
+        except QuestionRevision.DoesNotExist:
+            return Response({"error": "Not found"}, status=404)
+        staff = is_staff(request.user)
+        if not staff and not rev.question.published:
+            return Response({"error": "Forbidden"}, status=403)
+
+        response = Response(
+            {
+                "ok": True,
+                "revision": {
+                    "id": str(rev.id),
+                    "number": rev.number,
+                    "question_id": str(rev.question_id),
+                    # No "is_current": it changes with the next edit, and this body is cached as immutable.
+                    "created_at": rev.created_at,
+                },
+                "question": rev.staff_payload if staff else rev.student_payload,
+            }
+        )
+        # Per-role body, so private; the content itself never changes.
+        patch_cache_control(response, private=True, max_age=REVISION_MAX_AGE, immutable=True)
+        response["ETag"] = f'"{rev.id}"'
+        return response
+
+
 class QuestionCountsView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -142,6 +238,18 @@ class QuestionCountsView(APIView):
         return Response({"ok": True, "counts": list(data)})
 
 
+IMPORT_CHUNK_SIZE = 500
+IMPORT_UPDATE_FIELDS = [
+    "topic",
+    "subtopic",
+    "difficulty",
+    "published",
+    "choices",
+    "is_open_ended",
+    "correct_answer",
+]
+
+
 class QuestionImportView(APIView):
     """
     CSV import endpoint for admin/teacher.
@@ -149,6 +257,9 @@ class QuestionImportView(APIView):
     subject, topic, subtopic, stem, passage, difficulty, published,
     choice_a, choice_b, choice_c, choice_d, choice_e, choice_f, correct,
     is_open_ended, correct_answer
+
+    Rows are matched against existing questions by content hash.
+    Form fields: on_duplicate=skip|update (default skip), dry_run=1 to preview.
     """
 
     permission_classes = [permissions.IsAuthenticated]
@@ -161,33 +272,19 @@ class QuestionImportView(APIView):
         if not file:
             return Response({"error": "No file provided"}, status=400)
 
-        raw = file.read()
-
-        # Reject Excel uploads early so the frontend gets a clean JSON error
-        if raw[:2] == b"PK":
-            return Response(
-                {
-                    "error": "It looks like you uploaded an Excel (.xlsx) file. "
-                             "Please export or save it as CSV (UTF-8) and try again."
-                },
-                status=400,
-            )
+        try:
+            reader = csv_dict_reader(file)
+        except UploadRejected as e:
+            return Response({"error": e.message}, status=e.status)
+        on_duplicate = (request.data.get("on_duplicate") or "skip").strip().lower()
+        if on_duplicate not in ("skip", "update"):
+            return Response({"error": "on_duplicate must be skip or update"}, status=400)
+        dry_run = str(request.data.get("dry_run") or "").lower() in ("1", "true", "yes")
 
-        decoded = None
-        for enc in ("utf-8-sig", "utf-8", "iso-8859-1"):
-            try:
-                decoded = raw.decode(enc)
-                break
-            except UnicodeDecodeError:
-                continue
-        if decoded is None:
-            return Response(
-                {"error": "Could not decode file. Please upload UTF-8 CSV."},
-                status=400,
-            )
-        reader = csv.DictReader(io.StringIO(decoded))
-        created = 0
         errors = []
+        parsed = []
+        seen_hashes = set()
+        skipped_in_file = 0
 
         for idx, row in enumerate(reader, start=1):
             try:
@@ -227,7 +324,7 @@ class QuestionImportView(APIView):
                     if not any(c["is_correct"] for c in choices):
                         raise ValueError("No correct choice")
 
-                Question.objects.create(
+                q = Question(
                     subject=subject,
                     topic=topic,
                     subtopic=subtopic,
@@ -240,11 +337,137 @@ class QuestionImportView(APIView):
                     correct_answer=correct_answer,
                     created_by=request.user,
                 )
-                created += 1
+                q.refresh_content_hash()
+                q.refresh_payloads()
+                q._import_row = idx
+                if q.content_hash in seen_hashes:
+                    skipped_in_file += 1
+                    continue
+                seen_hashes.add(q.content_hash)
+                parsed.append(q)
             except Exception as e:
                 errors.append(f"Row {idx}: {e}")
 
-        return Response({"ok": True, "created": created, "errors": errors})
+        created = 0
+        updated = 0
+        skipped = skipped_in_file
+        warnings = []
+        now = timezone.now()
+        with transaction.atomic():
+            for start in range(0, len(parsed), IMPORT_CHUNK_SIZE):
+                chunk = parsed[start:start + IMPORT_CHUNK_SIZE]
+                existing = {}
+                for q in Question.objects.filter(content_hash__in=[c.content_hash for c in chunk]):
+                    existing.setdefault(q.content_hash, q)
+
+                to_create = []
+                to_update = []
+                for q in chunk:
+                    current = existing.get(q.content_hash)
+                    if not current:
+                        to_create.append(q)
+                    elif on_duplicate == "update":
+                        for field in IMPORT_UPDATE_FIELDS:
+                            setattr(current, field, getattr(q, field))
+                        current.updated_at = now
+                        current.refresh_payloads()
+                        to_update.append(current)
+                    else:
+                        skipped += 1
+
+                created += len(to_create)
+                updated += len(to_update)
+                for pos, hits in find_similar_bulk(to_create).items():
+                    q = to_create[pos]
+                    warnings.append(
+                        {
+                            "row": q._import_row,
+                            "possible_duplicates": [
+                                {"id": str(other.id), "similarity": round(score, 3)} for other, score in hits[:3]
+                            ],
+                        }
+                    )
+                if dry_run:
+                    continue
+                if to_create:
+                    Question.objects.bulk_create(to_create, batch_size=IMPORT_CHUNK_SIZE)
+                if to_update:
+                    Question.objects.bulk_update(
+                        to_update, IMPORT_UPDATE_FIELDS + ["student_payload", "staff_payload", "updated_at"]
+                    )
+                # bulk writes skip save()/post_save, so keep revisions and the similarity index in step here.
+                snapshot_revisions(to_create + to_update)
+                index_questions(to_create)
+
+        return Response(
+            {
+                "ok": True,
+                "dry_run": dry_run,
+                "created": created,
+                "updated": updated,
+                "skipped_duplicates": skipped,
+                "errors": errors,
+                "warnings": warnings,
+            }
+        )
+
+
+class QuestionDuplicatesView(APIView):
+    """
+    Near-duplicate lookup for the exam builder.
+    GET ?question_id=... checks a stored question; POST {subject, stem, passage}
+    checks a draft before it is saved. Optional threshold (0-1).
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        if not is_staff(request.user):
+            return Response({"error": "Forbidden"}, status=403)
+        qid = request.query_params.get("question_id")
+        if not qid:
+            return Response({"error": "question_id required"}, status=400)
+        try:
+            q = Question.objects.filter(id=qid).only("id", "subject", "stem", "passage").first()
+        except ValidationError:
+            return Response({"error": "Invalid question_id"}, status=400)
+        if not q:
+            return Response({"error": "Not found"}, status=404)
+        return self._respond(request.query_params, q.subject, q.stem, q.passage, exclude=[q.id])
+
+    def post(self, request):
+        if not is_staff(request.user):
+            return Response({"error": "Forbidden"}, status=403)
+        subject = (request.data.get("subject") or "").lower()
+        stem = request.data.get("stem") or ""
+        if subject not in ("math", "verbal") or not stem.strip():
+            return Response({"error": "subject and stem required"}, status=400)
+        exclude = [request.data.get("question_id")] if request.data.get("question_id") else []
+        return self._respond(request.data, subject, stem, request.data.get("passage"), exclude=exclude)
+
+    def _respond(self, params, subject, stem, passage, exclude):
+        try:
+            threshold = float(params.get("threshold") or DEFAULT_THRESHOLD)
+        except (TypeError, ValueError):
+            threshold = DEFAULT_THRESHOLD
+        threshold = max(0.1, min(threshold, 1.0))
+        hits = find_similar(subject, stem, passage, threshold=threshold, exclude_ids=exclude)
+        return Response(
+            {
+                "ok": True,
+                "duplicates": [
+                    {
+                        "id": str(q.id),
+                        "subject": q.subject,
+                        "topic": q.topic,
+                        "subtopic": q.subtopic,
+                        "stem": q.stem[:200],
+                        "similarity": round(score, 3),
+                    }
+                    for q, score in hits
+                ],
+            }
+        )
 
 
 def _parse_level(raw) -> int:
@@ -254,13 +477,52 @@ def _parse_level(raw) -> int:
         return 0
 
 
-def _effective_level(user, subject: str) -> int:
+def _cached_progress(user, subject: str) -> tuple[set[tuple[str, str]], set[str]]:
+    """Passed (topic, subtopic) pairs and passed topics, read from Profile.practice_progress."""
+    prof = getattr(user, "profile", None)
+    entry = ((getattr(prof, "practice_progress", None) or {}).get(subject)) or {}
+    subtopics = {tuple(pair) for pair in entry.get("subtopics") or [] if len(pair) == 2}
+    return subtopics, set(entry.get("topics") or [])
+
+
+def _record_progress(user, subject: str, topic: str, subtopic: str | None = None):
+    prof = getattr(user, "profile", None)
+    if not prof:
+        return
+    with transaction.atomic():
+        # Merge into the stored value under a row lock so parallel submits don't drop each other's passes.
+        locked = type(prof).objects.select_for_update().only("id", "practice_progress").get(pk=prof.pk)
+        progress = _merge_progress(locked.practice_progress, subject, topic, subtopic)
+        locked.practice_progress = progress
+        locked.save(update_fields=["practice_progress"])
+    prof.practice_progress = progress
+
+
+def _merge_progress(stored, subject: str, topic: str, subtopic: str | None) -> dict:
+    progress = dict(stored or {})
+    entry = dict(progress.get(subject) or {})
+    if subtopic:
+        pairs = [list(p) for p in entry.get("subtopics") or []]
+        if [topic, subtopic] not in pairs:
+            pairs.append([topic, subtopic])
+        entry["subtopics"] = pairs
+    else:
+        topics = list(entry.get("topics") or [])
+        if topic not in topics:
+            topics.append(topic)
+        entry["topics"] = topics
+    progress[subject] = entry
+    return progress
+
+
+def _effective_level(user, subject: str, passed_subtopics: set | None = None) -> int:
     prof = getattr(user, "profile", None)
     if not prof:
         return 0
     base = _parse_level(prof.math_level if subject == "math" else prof.verbal_level)
-    completed = SubtopicProgress.objects.filter(user=user, subject=subject, passed=True).count()
-    return max(base, completed)
+    if passed_subtopics is None:
+        passed_subtopics, _ = _cached_progress(user, subject)
+    return max(base, len(passed_subtopics))
 
 
 def _set_level(user, subject: str, level: int):
@@ -276,32 +538,20 @@ def _set_level(user, subject: str, level: int):
 
 
 def _topic_unlocked(subject: str, topic: str, completed_topics: set[str], level: int) -> bool:
-    topics = topic_order(subject)
-    if topic not in topics:
-        return True
-    idx = topics.index(topic)
-    if idx == 0:
-        return True
-    prev_topic = topics[idx - 1]
-    if prev_topic in completed_topics:
-        return True
-    # If level already covers all subtopics in previous topic, unlock.
-    order = subtopic_order(subject)
-    prev_indices = [i for i, (t, _) in enumerate(order) if t == prev_topic]
-    if not prev_indices:
-        return True
-    return level >= max(prev_indices) + 1
+    return get_graph(subject).topic_unlocked(topic, completed_topics, level)
 
 
 def _subtopic_unlocked(subject: str, topic: str, subtopic: str, level: int, completed_topics: set[str]) -> bool:
-    if not _topic_unlocked(subject, topic, completed_topics, level):
-        return False
-    order = subtopic_order(subject)
-    try:
-        idx = order.index((topic, subtopic))
-    except ValueError:
-        return False
-    return idx <= level
+    return get_graph(subject).subtopic_unlocked(topic, subtopic, level, completed_topics)
+
+
+def _topic_quiz_ready(subject: str, topic: str, passed_subtopics: set, level: int) -> bool:
+    graph = get_graph(subject)
+    required = graph.topic_subtopics.get(topic) or ()
+    if all((topic, s) in passed_subtopics for s in required):
+        return True
+    # allow if level already covers all subtopics in this topic
+    return level >= graph.topic_last_level.get(topic, 0)
 
 
 class QuestionProgressView(APIView):
@@ -332,6 +582,54 @@ class QuestionProgressView(APIView):
         return Response({"ok": True, "subtopics": subtopics, "topics": topics})
 
 
+class QuestionPathView(APIView):
+    """Whole practice path for one subject: lock state, pass state and best scores in one call."""
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        subject = (request.query_params.get("subject") or "math").lower()
+        if subject not in ("math", "verbal"):
+            return Response({"error": "Invalid subject"}, status=400)
+
+        graph = get_graph(subject)
+        staff = is_staff(request.user)
+        passed_subtopics, completed_topics = _cached_progress(request.user, subject)
+        level = _effective_level(request.user, subject, passed_subtopics)
+
+        sub_scores = {
+            (t, s): score
+            for t, s, score in SubtopicProgress.objects.filter(user=request.user, subject=subject).values_list(
+                "topic", "subtopic", "best_score"
+            )
+        }
+        topic_scores = dict(
+            TopicProgress.objects.filter(user=request.user, subject=subject).values_list("topic", "best_score")
+        )
+
+        topics = []
+        for topic in graph.topics:
+            topics.append(
+                {
+                    "topic": topic,
+                    "unlocked": staff or graph.topic_unlocked(topic, completed_topics, level),
+                    "quiz_ready": staff or _topic_quiz_ready(subject, topic, passed_subtopics, level),
+                    "passed": topic in completed_topics,
+                    "best_score": topic_scores.get(topic),
+                    "subtopics": [
+                        {
+                            "subtopic": sub,
+                            "unlocked": staff or graph.subtopic_unlocked(topic, sub, level, completed_topics),
+                            "passed": (topic, sub) in passed_subtopics,
+                            "best_score": sub_scores.get((topic, sub)),
+                        }
+                        for sub in graph.topic_subtopics.get(topic, ())
+                    ],
+                }
+            )
+        return Response({"ok": True, "subject": subject, "level": level, "topics": topics})
+
+
 class QuestionQuizView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -343,10 +641,8 @@ class QuestionQuizView(APIView):
             return Response({"error": "subject and topic required"}, status=400)
 
         if not is_staff(request.user):
-            completed_topics = set(
-                TopicProgress.objects.filter(user=request.user, subject=subject, passed=True).values_list("topic", flat=True)
-            )
-            level = _effective_level(request.user, subject)
+            passed_subtopics, completed_topics = _cached_progress(request.user, subject)
+            level = _effective_level(request.user, subject, passed_subtopics)
             if subtopic:
                 if not _subtopic_unlocked(subject, topic, subtopic, level, completed_topics):
                     return Response({"error": "Locked"}, status=403)
@@ -354,38 +650,37 @@ class QuestionQuizView(APIView):
                 # topic quiz lock: require all subtopics completed and topic unlocked
                 if not _topic_unlocked(subject, topic, completed_topics, level):
                     return Response({"error": "Locked"}, status=403)
-                required = {(topic, s) for (t, s) in subtopic_order(subject) if t == topic}
-                completed = set(
-                    SubtopicProgress.objects.filter(user=request.user, subject=subject, passed=True, topic=topic)
-                    .values_list("topic", "subtopic")
-                )
-                if required and not required.issubset(completed):
-                    # allow if level already covers all subtopics in this topic
-                    order = subtopic_order(subject)
-                    indices = [i for i, (t, _) in enumerate(order) if t == topic]
-                    if indices and level < max(indices) + 1:
-                        return Response({"error": "Complete all subtopics first"}, status=403)
-
-        qs = Question.objects.filter(subject=subject, topic=topic)
-        if subtopic:
-            qs = qs.filter(subtopic=subtopic)
-        if not is_staff(request.user):
-            qs = qs.filter(published=True)
+                if not _topic_quiz_ready(subject, topic, passed_subtopics, level):
+                    return Response({"error": "Complete all subtopics first"}, status=403)
 
         try:
             limit = int(request.query_params.get("limit") or (10 if subtopic else 15))
         except Exception:
             limit = 10 if subtopic else 15
         limit = max(1, min(limit, 50))
-        qs = qs.order_by("?")[:limit]
+
+        exclude = None
+        if str(request.query_params.get("exclude_recent") or "").lower() in ("1", "true", "yes"):
+            exclude = recent_question_ids(request.user, subject)
+        qs = sample_questions(
+            subject,
+            topic,
+            subtopic,
+            limit,
+            published_only=not is_staff(request.user),
+            exclude=exclude,
+        )
 
         questions = []
         for q in qs:
             data = QuestionSerializer(q).data
-            for c in data.get("choices") or []:
-                c.pop("is_correct", None)
+            # Copy the choices: the serializer hands back the instance's own list.
+            data["choices"] = [
+                {k: v for k, v in c.items() if k != "is_correct"} for c in data.get("choices") or []
+            ]
             data.pop("correct_answer", None)
             questions.append(data)
+        questions = attach_srcsets(questions, request)
 
         return Response(
             {
@@ -454,16 +749,18 @@ class QuestionQuizSubmitView(APIView):
                 prog.save()
 
                 # update level based on completed subtopics
-                completed = SubtopicProgress.objects.filter(user=request.user, subject=subject, passed=True).count()
+                _record_progress(request.user, subject, topic, subtopic)
+                passed_subtopics, _ = _cached_progress(request.user, subject)
                 current_level = _parse_level(
                     request.user.profile.math_level if subject == "math" else request.user.profile.verbal_level
                 )
-                _set_level(request.user, subject, max(current_level, completed))
+                _set_level(request.user, subject, max(current_level, len(passed_subtopics)))
             else:
                 prog, _ = TopicProgress.objects.get_or_create(user=request.user, subject=subject, topic=topic)
                 prog.best_score = max(prog.best_score or 0, score)
                 prog.passed = True
                 prog.completed_at = timezone.now()
                 prog.save()
+                _record_progress(request.user, subject, topic)
 
         return Response({"ok": True, "total": total, "correct": correct, "score": score, "passed": passed})
@@ -0,0 +1,49 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from streaks.rollups import purge_before, retention_cutoff, rollup_days
+from streaks.views import OFFLINE_GRACE_DAYS
+
+# Attempts carry client-local dates: up to a day ahead of the server's UTC date, and offline
+# batches reach OFFLINE_GRACE_DAYS back from a local day that may itself be a day behind.
+DEFAULT_DAYS = OFFLINE_GRACE_DAYS + 3
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild AttemptDailyRollup for recent days and purge raw QuestionAttempt rows past "
+        "ATTEMPT_RETENTION_DAYS. Idempotent; run nightly (e.g. from cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=DEFAULT_DAYS,
+            help=f"Roll up this many days ending tomorrow (default {DEFAULT_DAYS}, the offline batch window).",
+        )
+        parser.add_argument("--date", help="Roll up a single YYYY-MM-DD date instead.")
+        parser.add_argument("--no-purge", action="store_true", help="Skip the retention purge.")
+
+    def handle(self, *args, **options):
+        today = timezone.now().date()
+        if options["date"]:
+            try:
+                days = [date.fromisoformat(options["date"])]
+            except ValueError:
+                raise CommandError("--date must be YYYY-MM-DD")
+        else:
+            days = [today + timedelta(days=1 - i) for i in range(max(options["days"], 1))]
+
+        cutoff = retention_cutoff(today)
+        if cutoff is not None:
+            # Raw rows before the cutoff may already be gone; their rollups are final.
+            days = [d for d in days if d >= cutoff]
+        written = rollup_days(days)
+        self.stdout.write(f"Rolled up {len(days)} days ({written} rows).")
+
+        if cutoff is not None and not options["no_purge"]:
+            purged_days, purged_rows = purge_before(cutoff)
+            self.stdout.write(f"Purged {purged_rows} attempts from {purged_days} days before {cutoff}.")
+        self.stdout.write(self.style.SUCCESS("Done."))
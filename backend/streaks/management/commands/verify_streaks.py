@@ -0,0 +1,41 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from streaks.models import DailyStreakProgress, StreakCounter
+from streaks.utils import compute_counter_values, get_streak_base, rebuild_counter, walk_streak_base
+
+
+class Command(BaseCommand):
+    help = "Compare materialized streak counters with a full walk of DailyStreakProgress; --fix rewrites mismatches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fix", action="store_true")
+        parser.add_argument("--user", help="Only check this user id.")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        user_ids = set(
+            DailyStreakProgress.objects.filter(completed_at__isnull=False).values_list("user_id", flat=True)
+        ) | set(StreakCounter.objects.values_list("user_id", flat=True))
+        if options["user"]:
+            user_ids = {uid for uid in user_ids if str(uid) == options["user"]}
+
+        checked = mismatched = 0
+        for user in User.objects.filter(id__in=user_ids).select_related("streak_counter"):
+            checked += 1
+            dates = DailyStreakProgress.objects.filter(user=user, completed_at__isnull=False).values_list(
+                "date", flat=True
+            )
+            expected = compute_counter_values(dates)
+            counter = getattr(user, "streak_counter", None)
+            stored = (
+                (counter.current_streak, counter.longest_streak, counter.last_completed_date) if counter else (0, 0, None)
+            )
+            if stored == expected and get_streak_base(user) == walk_streak_base(user):
+                continue
+            mismatched += 1
+            self.stdout.write(f"{user.id}: stored={stored} expected={expected}")
+            if options["fix"]:
+                rebuild_counter(user)
+
+        action = "fixed" if options["fix"] else "found"
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} users, {action} {mismatched} mismatches."))
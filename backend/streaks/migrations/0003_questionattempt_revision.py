@@ -0,0 +1,20 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('question_bank', '0008_questionrevision'),
+        ('streaks', '0002_questionattempt_is_correct_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='questionattempt',
+            name='revision',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='attempts', to='question_bank.questionrevision'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:00
+
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Frozen copy of streaks.utils.compute_counter_values as of this migration.
+def compute_counter_values(dates):
+    current = longest = 0
+    last = None
+    for d in sorted(set(dates)):
+        current = current + 1 if last is not None and d == last + timedelta(days=1) else 1
+        longest = max(longest, current)
+        last = d
+    return current, longest, last
+
+
+def backfill_counters(apps, schema_editor):
+    DailyStreakProgress = apps.get_model("streaks", "DailyStreakProgress")
+    StreakCounter = apps.get_model("streaks", "StreakCounter")
+    dates_by_user = {}
+    rows = DailyStreakProgress.objects.filter(completed_at__isnull=False).values_list("user_id", "date")
+    for user_id, day in rows.iterator(chunk_size=2000):
+        dates_by_user.setdefault(user_id, []).append(day)
+    counters = []
+    for user_id, dates in dates_by_user.items():
+        current, longest, last = compute_counter_values(dates)
+        counters.append(
+            StreakCounter(user_id=user_id, current_streak=current, longest_streak=longest, last_completed_date=last)
+        )
+    StreakCounter.objects.bulk_create(counters, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_profile_practice_progress'),
+        ('streaks', '0003_questionattempt_revision'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StreakCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='streak_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('current_streak', models.PositiveIntegerField(default=0)),
+                ('longest_streak', models.PositiveIntegerField(default=0)),
+                ('last_completed_date', models.DateField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
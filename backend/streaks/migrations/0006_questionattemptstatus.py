@@ -0,0 +1,51 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_statuses(apps, schema_editor):
+    QuestionAttempt = apps.get_model("streaks", "QuestionAttempt")
+    QuestionAttemptStatus = apps.get_model("streaks", "QuestionAttemptStatus")
+    latest = {}
+    rows = (
+        QuestionAttempt.objects.filter(is_correct__isnull=False)
+        .order_by("updated_at")
+        .values_list("user_id", "question_id", "is_correct")
+    )
+    for user_id, question_id, is_correct in rows.iterator(chunk_size=2000):
+        latest[(user_id, question_id)] = is_correct
+    QuestionAttemptStatus.objects.bulk_create(
+        [
+            QuestionAttemptStatus(user_id=user_id, question_id=question_id, is_correct=is_correct)
+            for (user_id, question_id), is_correct in latest.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('question_bank', '0008_questionrevision'),
+        ('streaks', '0005_attemptreceipt'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionAttemptStatus',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_correct', models.BooleanField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='question_bank.question')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='question_statuses', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'question')},
+            },
+        ),
+        migrations.RunPython(backfill_statuses, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_rollups(apps, schema_editor):
+    QuestionAttempt = apps.get_model("streaks", "QuestionAttempt")
+    AttemptDailyRollup = apps.get_model("streaks", "AttemptDailyRollup")
+    rows = (
+        QuestionAttempt.objects.order_by()
+        .values("user_id", "attempted_date", "subject", "question__topic")
+        .annotate(attempted=Count("id"), correct=Count("id", filter=Q(is_correct=True)))
+    )
+    AttemptDailyRollup.objects.bulk_create(
+        (
+            AttemptDailyRollup(
+                user_id=row["user_id"],
+                date=row["attempted_date"],
+                subject=row["subject"],
+                topic=row["question__topic"],
+                attempted=row["attempted"],
+                correct=row["correct"],
+            )
+            for row in rows.iterator(chunk_size=2000)
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('streaks', '0006_questionattemptstatus'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttemptDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('subject', models.CharField(choices=[('verbal', 'Verbal'), ('math', 'Math')], max_length=20)),
+                ('topic', models.CharField(max_length=200)),
+                ('attempted', models.PositiveIntegerField(default=0)),
+                ('correct', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attempt_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date'], name='streaks_att_date_8158d5_idx')],
+                'unique_together': {('user', 'date', 'subject', 'topic')},
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 6.0.1 on 2026-10-19 12:00
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_answered_at(apps, schema_editor):
+    # The row was last written when its answer was recorded.
+    QuestionAttemptStatus = apps.get_model("streaks", "QuestionAttemptStatus")
+    QuestionAttemptStatus.objects.filter(answered_at__isnull=True).update(answered_at=F("updated_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('streaks', '0007_attemptdailyrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='questionattemptstatus',
+            name='answered_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_answered_at, migrations.RunPython.noop),
+    ]
@@ -16,6 +16,21 @@ class DailyStreakProgress(models.Model):
         ]
 
 
+class StreakCounter(models.Model):
+    """
+    Materialized streak state, advanced by utils.record_completion when a day
+    flips to completed. Missed days are rolled over lazily at read time.
+    """
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name="streak_counter"
+    )
+    current_streak = models.PositiveIntegerField(default=0)
+    longest_streak = models.PositiveIntegerField(default=0)
+    last_completed_date = models.DateField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
 class QuestionAttempt(models.Model):
     SUBJECT_CHOICES = [
         ("verbal", "Verbal"),
@@ -24,6 +39,10 @@ class QuestionAttempt(models.Model):
 
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="question_attempts")
     question = models.ForeignKey("question_bank.Question", on_delete=models.CASCADE, related_name="attempts")
+    # Content the student actually answered; the question itself may have been edited since.
+    revision = models.ForeignKey(
+        "question_bank.QuestionRevision", on_delete=models.SET_NULL, null=True, blank=True, related_name="attempts"
+    )
     subject = models.CharField(max_length=20, choices=SUBJECT_CHOICES)
     attempted_date = models.DateField()
     selected_label = models.CharField(max_length=5, blank=True, null=True)
@@ -38,4 +57,47 @@ class QuestionAttempt(models.Model):
             models.Index(fields=["subject", "attempted_date"]),
         ]
 
-# Create your models here.
+
+class AttemptDailyRollup(models.Model):
+    """Answers per user, day, subject and topic; rebuilt from QuestionAttempt by rollups.rollup_days."""
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="attempt_rollups")
+    date = models.DateField()
+    subject = models.CharField(max_length=20, choices=QuestionAttempt.SUBJECT_CHOICES)
+    topic = models.CharField(max_length=200)
+    attempted = models.PositiveIntegerField(default=0)
+    correct = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("user", "date", "subject", "topic")
+        indexes = [
+            models.Index(fields=["date"]),
+        ]
+
+
+class QuestionAttemptStatus(models.Model):
+    """Latest graded result per user and question, upserted with every graded attempt."""
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="question_statuses")
+    question = models.ForeignKey("question_bank.Question", on_delete=models.CASCADE, related_name="+")
+    is_correct = models.BooleanField()
+    # When the recorded answer was given; older answers synced later never replace it.
+    answered_at = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("user", "question")
+
+
+class AttemptReceipt(models.Model):
+    """Idempotency keys of batch-ingested attempts, so a retried flush is applied once."""
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="attempt_receipts")
+    key = models.CharField(max_length=64)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("user", "key")
+        indexes = [
+            models.Index(fields=["created_at"]),
+        ]
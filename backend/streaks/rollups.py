@@ -0,0 +1,81 @@
+"""
+Daily rollup and retention for QuestionAttempt.
+
+Raw attempts are summarised into AttemptDailyRollup per (user, date, subject,
+topic); analytics read only the rollup. Rebuilding a day replaces its rollup
+rows, so running the job twice is harmless. Retention deletes raw rows by whole
+days and always rolls a day up right before deleting it, so a day is either
+fully present in QuestionAttempt or already final in the rollup.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import AttemptDailyRollup, AttemptReceipt, QuestionAttempt
+
+# Streak sampling and offline batches look back a few days; never purge inside that window.
+MIN_RETENTION_DAYS = 30
+
+
+def retention_days() -> int | None:
+    """Configured ATTEMPT_RETENTION_DAYS (None or 0 keeps raw rows forever)."""
+    days = getattr(settings, "ATTEMPT_RETENTION_DAYS", 365)
+    if not days:
+        return None
+    return max(int(days), MIN_RETENTION_DAYS)
+
+
+def retention_cutoff(today=None):
+    days = retention_days()
+    if days is None:
+        return None
+    today = today or timezone.now().date()
+    return today - timedelta(days=days)
+
+
+def rollup_days(days) -> int:
+    """Rebuild rollup rows for the given dates from raw attempts; returns rows written."""
+    days = sorted(set(days))
+    if not days:
+        return 0
+    rows = (
+        QuestionAttempt.objects.filter(attempted_date__in=days)
+        .order_by()
+        .values("user_id", "attempted_date", "subject", "question__topic")
+        .annotate(attempted=Count("id"), correct=Count("id", filter=Q(is_correct=True)))
+    )
+    rollups = [
+        AttemptDailyRollup(
+            user_id=row["user_id"],
+            date=row["attempted_date"],
+            subject=row["subject"],
+            topic=row["question__topic"],
+            attempted=row["attempted"],
+            correct=row["correct"],
+        )
+        for row in rows.iterator(chunk_size=2000)
+    ]
+    with transaction.atomic():
+        AttemptDailyRollup.objects.filter(date__in=days).delete()
+        AttemptDailyRollup.objects.bulk_create(rollups, batch_size=1000)
+    return len(rollups)
+
+
+def purge_before(cutoff) -> tuple[int, int]:
+    """Roll up, then delete, raw attempts dated before `cutoff`; returns (days, rows) purged."""
+    days = list(
+        QuestionAttempt.objects.filter(attempted_date__lt=cutoff)
+        .order_by("attempted_date")
+        .values_list("attempted_date", flat=True)
+        .distinct()
+    )
+    deleted = 0
+    for day in days:
+        with transaction.atomic():
+            rollup_days([day])
+            deleted += QuestionAttempt.objects.filter(attempted_date=day).delete()[0]
+    AttemptReceipt.objects.filter(created_at__date__lt=cutoff).delete()
+    return len(days), deleted
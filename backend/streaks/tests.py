@@ -1,3 +1,263 @@
+import uuid
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.db import OperationalError
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from question_bank.models import Question
+from .models import QuestionAttemptStatus
+
+
+def make_questions(author, subject, n, topic="Algebra"):
+    return [
+        Question.objects.create(
+            subject=subject,
+            topic=topic,
+            stem=f"{subject} {i}",
+            choices=[{"label": "A", "content": "1", "is_correct": True}],
+            published=True,
+            created_by=author,
+        )
+        for i in range(n)
+    ]
+
+
+class StreakTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="s", email="s@x.io", password="pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def answer(self, question, is_correct=True):
+        return self.client.post(
+            "/api/streak/attempt/", {"question_id": str(question.id), "is_correct": is_correct}, format="json"
+        )
+
+    def flush(self, *attempts):
+        items = [
+            {
+                "idempotency_key": uuid.uuid4().hex,
+                "question_id": str(q.id),
+                "is_correct": ok,
+                "answered_at": at.isoformat(),
+            }
+            for q, ok, at in attempts
+        ]
+        return self.client.post("/api/streak/attempts/batch/", {"attempts": items}, format="json")
+
+    def statuses(self, topic="Algebra"):
+        return self.client.get(f"/api/streak/attempts/?topic={topic}").data["statuses"]
+
+
+class QuestionAttemptStatusTests(StreakTestCase):
+    def setUp(self):
+        super().setUp()
+        self.q1, self.q2 = make_questions(self.user, "math", 2)
+
+    def test_latest_answer_per_question_by_topic(self):
+        self.answer(self.q1, False)
+        self.answer(self.q1, True)
+        self.answer(self.q2, False)
+        self.assertEqual(self.statuses(), {str(self.q1.id): "correct", str(self.q2.id): "incorrect"})
+        self.assertEqual(self.statuses(topic="Geometry"), {})
+
+    def test_late_offline_batch_does_not_overwrite_newer_answers(self):
+        self.answer(self.q1, True)
+        earlier = timezone.now() - timedelta(hours=1)
+        res = self.flush((self.q1, False, earlier), (self.q2, False, earlier))
+        self.assertEqual([r["status"] for r in res.data["results"]], ["applied", "applied"])
+        self.assertEqual(self.statuses(), {str(self.q1.id): "correct", str(self.q2.id): "incorrect"})
+
+    def test_newer_batch_answer_wins_within_and_across_batches(self):
+        now = timezone.now()
+        self.flush((self.q1, True, now - timedelta(minutes=5)), (self.q1, False, now - timedelta(minutes=10)))
+        self.assertEqual(self.statuses()[str(self.q1.id)], "correct")
+        self.flush((self.q1, False, now - timedelta(minutes=1)))
+        self.assertEqual(self.statuses()[str(self.q1.id)], "incorrect")
+        self.assertEqual(QuestionAttemptStatus.objects.count(), 1)
+
+    def test_lookup_by_ids(self):
+        self.answer(self.q2, True)
+        res = self.client.post(
+            "/api/streak/attempts/", {"question_ids": [str(self.q1.id), str(self.q2.id), "nope"]}, format="json"
+        )
+        self.assertEqual(res.data["statuses"], {str(self.q2.id): "correct"})
+
+
+class StreakAttemptTests(StreakTestCase):
+    def setUp(self):
+        super().setUp()
+        self.math = make_questions(self.user, "math", 6)
+        self.verbal = make_questions(self.user, "verbal", 5, topic="Reading")
+
+    def test_counts_distinct_questions_capped_at_target(self):
+        self.answer(self.math[0])
+        res = self.answer(self.math[0], False)
+        self.assertEqual(res.data["today"]["math_count"], 1)
+        for q in self.math[1:]:
+            res = self.answer(q)
+        self.assertEqual(res.data["today"]["math_count"], 5)
+        self.assertFalse(res.data["today"]["completed"])
+
+    def test_day_completes_once(self):
+        from .models import DailyStreakProgress, StreakCounter
+
+        for q in self.math[:5] + self.verbal[:4]:
+            self.answer(q)
+        res = self.answer(self.verbal[4])
+        self.assertTrue(res.data["today"]["completed"])
+        self.assertEqual(res.data["streak_count"], 1)
+        completed_at = DailyStreakProgress.objects.get(user=self.user).completed_at
+        # Further answers, new or repeated, leave the completion and the counter alone.
+        self.answer(self.math[5])
+        self.answer(self.verbal[0])
+        self.assertEqual(DailyStreakProgress.objects.get(user=self.user).completed_at, completed_at)
+        self.assertEqual(StreakCounter.objects.get(user=self.user).current_streak, 1)
+
+    def test_failed_write_leaves_nothing_and_the_retry_counts(self):
+        from . import views
+        from .models import DailyStreakProgress, QuestionAttempt
+
+        with mock.patch.object(views, "_increment_progress", side_effect=OperationalError("locked")):
+            with self.assertRaises(OperationalError):
+                self.answer(self.math[0])
+        self.assertFalse(QuestionAttempt.objects.exists())
+        self.assertEqual(self.answer(self.math[0]).data["today"]["math_count"], 1)
+
+        # A crash after the day is stamped undoes the stamp too, so the retry still advances the counter.
+        for q in self.math[1:5] + self.verbal[:4]:
+            self.answer(q)
+        with mock.patch.object(views, "record_completion", side_effect=OperationalError("locked")):
+            with self.assertRaises(OperationalError):
+                self.answer(self.verbal[4])
+        self.assertIsNone(DailyStreakProgress.objects.get(user=self.user).completed_at)
+        res = self.answer(self.verbal[4])
+        self.assertTrue(res.data["today"]["completed"])
+        self.assertEqual(res.data["streak_count"], 1)
+
+    def test_batch_flush_completes_the_day(self):
+        now = timezone.now()
+        res = self.flush(*[(q, True, now) for q in self.math[:5] + self.verbal])
+        self.assertTrue(res.data["today"]["completed"])
+        self.assertEqual(res.data["streak_count"], 1)
+        # A retried flush with new keys for the same answers changes nothing.
+        res = self.flush(*[(q, True, now) for q in self.math[:5]])
+        self.assertEqual(res.data["streak_count"], 1)
+
+
+class StreakCounterTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="s", email="s@x.io", password="pw")
+        self.today = timezone.now().date()
+
+    def complete(self, *offsets):
+        from .models import DailyStreakProgress
+        from .utils import record_completion
+
+        for offset in offsets:
+            day = self.today - timedelta(days=offset)
+            DailyStreakProgress.objects.update_or_create(
+                user=self.user, date=day, defaults={"completed_at": timezone.now()}
+            )
+            record_completion(self.user, day)
+
+    def streak(self, today=None):
+        from .utils import get_streak_base, walk_streak_base
+
+        user = User.objects.get(pk=self.user.pk)
+        today = today or self.today
+        base = get_streak_base(user, today=today)
+        self.assertEqual(base, walk_streak_base(user, today=today))
+        return base
+
+    def test_counter_agrees_with_the_walk(self):
+        self.complete(3, 2, 1)
+        self.assertEqual(self.streak(), 3)  # today not done yet
+        self.complete(0)
+        self.assertEqual(self.streak(), 4)
+        self.assertEqual(self.streak(today=self.today + timedelta(days=2)), 0)
+
+    def test_gap_restarts_the_run_and_longest_is_kept(self):
+        from .models import StreakCounter
+
+        self.complete(5, 4, 3, 1, 0)
+        counter = StreakCounter.objects.get(user=self.user)
+        self.assertEqual((counter.current_streak, counter.longest_streak), (2, 3))
+        self.assertEqual(self.streak(), 2)
+
+    def test_out_of_order_completion_rebuilds(self):
+        from .models import StreakCounter
+
+        self.complete(0, 2)
+        self.complete(1)
+        counter = StreakCounter.objects.get(user=self.user)
+        self.assertEqual((counter.current_streak, counter.last_completed_date), (3, self.today))
+
+
+class StreakAttemptBatchTests(StreakTestCase):
+    def test_retried_flush_is_reported_as_duplicates(self):
+        from .models import QuestionAttempt
+
+        (q,) = make_questions(self.user, "math", 1)
+        now = timezone.now().isoformat()
+        items = [{"idempotency_key": "k1", "question_id": str(q.id), "is_correct": True, "answered_at": now}]
+        first = self.client.post("/api/streak/attempts/batch/", {"attempts": items}, format="json")
+        again = self.client.post("/api/streak/attempts/batch/", {"attempts": items * 2}, format="json")
+        self.assertEqual(first.data["results"][0]["status"], "applied")
+        self.assertEqual([r["status"] for r in again.data["results"]], ["duplicate", "duplicate"])
+        self.assertEqual(QuestionAttempt.objects.count(), 1)
+        self.assertEqual(again.data["today"]["math_count"], 1)
+
+    def test_items_are_judged_one_by_one(self):
+        (q,) = make_questions(self.user, "math", 1)
+        now = timezone.now()
+        items = [
+            {"idempotency_key": "a", "question_id": "nope", "answered_at": now.isoformat()},
+            {"idempotency_key": "b", "question_id": str(q.id)},
+            {"idempotency_key": "c", "question_id": str(q.id), "answered_at": (now - timedelta(days=30)).isoformat()},
+            {"idempotency_key": "d", "question_id": str(uuid.uuid4()), "answered_at": now.isoformat()},
+            {"question_id": str(q.id), "answered_at": now.isoformat()},
+            {"idempotency_key": "e", "question_id": str(q.id), "answered_at": now.isoformat()},
+        ]
+        res = self.client.post("/api/streak/attempts/batch/", {"attempts": items}, format="json")
+        self.assertEqual(
+            [r["status"] for r in res.data["results"]],
+            ["invalid", "invalid", "stale", "not_found", "invalid", "applied"],
+        )
+
+
+class AttemptRollupTests(StreakTestCase):
+    def test_history_survives_purging_raw_rows(self):
+        from . import rollups
+        from .models import QuestionAttempt
+
+        math = make_questions(self.user, "math", 3)
+        today = timezone.now().date()
+        answers = [(q, today, ok) for q, ok in zip(math, (True, False, True))]
+        answers.append((math[0], today - timedelta(days=1), False))
+        for q, day, ok in answers:
+            QuestionAttempt.objects.create(user=self.user, question=q, subject="math", attempted_date=day, is_correct=ok)
+        self.assertEqual(rollups.rollup_days([today, today - timedelta(days=1)]), 2)
+        self.assertEqual(rollups.rollup_days([today]), 1)  # rerunning replaces, never adds
+        before = self.client.get("/api/streak/history/?days=7").data
+        self.assertEqual([(d["attempted"], d["correct"]) for d in before["days"]], [(1, 0), (3, 2)])
+        self.assertEqual(before["topics"], [{"subject": "math", "topic": "Algebra", "attempted": 4, "correct": 2}])
+
+        self.assertEqual(rollups.purge_before(today + timedelta(days=1)), (2, 4))
+        self.assertFalse(QuestionAttempt.objects.exists())
+        self.assertEqual(self.client.get("/api/streak/history/?days=7").data, before)
+
+    def test_nightly_job_picks_up_late_offline_answers(self):
+        from django.core.management import call_command
 
-# Create your tests here.
+        (q,) = make_questions(self.user, "math", 1)
+        call_command("rollup_attempts", stdout=StringIO())
+        self.flush((q, True, timezone.now() - timedelta(days=3)))
+        call_command("rollup_attempts", stdout=StringIO())
+        days = self.client.get("/api/streak/history/?days=7").data["days"]
+        self.assertEqual([(d["attempted"], d["correct"]) for d in days], [(1, 1)])
@@ -1,8 +1,10 @@
 from django.urls import path
-from .views import StreakStatusView, StreakAttemptView, QuestionAttemptStatusView
+from .views import StreakStatusView, StreakAttemptView, StreakAttemptBatchView, QuestionAttemptStatusView, StreakHistoryView
 
 urlpatterns = [
     path("streak/status/", StreakStatusView.as_view(), name="streak_status"),
     path("streak/attempt/", StreakAttemptView.as_view(), name="streak_attempt"),
+    path("streak/attempts/batch/", StreakAttemptBatchView.as_view(), name="streak_attempts_batch"),
     path("streak/attempts/", QuestionAttemptStatusView.as_view(), name="streak_attempts_status"),
+    path("streak/history/", StreakHistoryView.as_view(), name="streak_history"),
 ]
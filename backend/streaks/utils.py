@@ -1,7 +1,7 @@
 from datetime import timedelta
 from zoneinfo import ZoneInfo
 from django.utils import timezone
-from .models import DailyStreakProgress
+from .models import DailyStreakProgress, StreakCounter
 
 BAKU_TZ = ZoneInfo("Asia/Baku")
 
@@ -10,7 +10,41 @@ def _baku_date():
     return timezone.localtime(timezone.now(), BAKU_TZ).date()
 
 
+def _counter_for(user):
+    try:
+        return user.streak_counter
+    except StreakCounter.DoesNotExist:
+        return None
+
+
+def streak_from_counter(counter, today):
+    """Streak as of `today` from the stored run; None when only a walk can answer."""
+    last = counter.last_completed_date if counter else None
+    if last is None or not counter.current_streak:
+        return 0
+    run_start = last - timedelta(days=counter.current_streak - 1)
+    if run_start <= today <= last:
+        return (today - run_start).days + 1
+    if last == today - timedelta(days=1):
+        return counter.current_streak
+    if last < today:
+        # Lazy rollover: a missed day ends the run without any write.
+        return 0
+    # Completed days stored ahead of `today` (client timezone shift); fall back.
+    return None
+
+
 def get_streak_base(user, today=None):
+    if today is None:
+        today = _baku_date()
+    base = streak_from_counter(_counter_for(user), today)
+    if base is None:
+        return walk_streak_base(user, today=today)
+    return base
+
+
+def walk_streak_base(user, today=None):
+    """Original per-row walk; kept for verify_streaks and the rare out-of-range case."""
     if today is None:
         today = _baku_date()
     today_progress = DailyStreakProgress.objects.filter(user=user, date=today).first()
@@ -30,3 +64,46 @@ def get_streak_base(user, today=None):
         else:
             break
     return count
+
+
+def compute_counter_values(dates):
+    """(current_streak, longest_streak, last_completed_date) from completed dates in any order."""
+    current = longest = 0
+    last = None
+    for d in sorted(set(dates)):
+        current = current + 1 if last is not None and d == last + timedelta(days=1) else 1
+        longest = max(longest, current)
+        last = d
+    return current, longest, last
+
+
+def rebuild_counter(user):
+    dates = DailyStreakProgress.objects.filter(user=user, completed_at__isnull=False).values_list("date", flat=True)
+    current, longest, last = compute_counter_values(dates)
+    counter, _ = StreakCounter.objects.update_or_create(
+        user=user,
+        defaults={"current_streak": current, "longest_streak": longest, "last_completed_date": last},
+    )
+    user.streak_counter = counter
+    return counter
+
+
+def record_completion(user, day):
+    """Advance the counter for a newly completed day (call inside the writing transaction)."""
+    counter, _ = StreakCounter.objects.select_for_update().get_or_create(user=user)
+    last = counter.last_completed_date
+    if last == day:
+        pass
+    elif last is None or day == last + timedelta(days=1):
+        counter.current_streak = (counter.current_streak if last else 0) + 1
+    elif day > last:
+        counter.current_streak = 1
+    else:
+        # Completion landed before the stored run (timezone change); recount from rows.
+        return rebuild_counter(user)
+    if last != day:
+        counter.last_completed_date = day
+        counter.longest_streak = max(counter.longest_streak, counter.current_streak)
+        counter.save(update_fields=["current_streak", "longest_streak", "last_completed_date", "updated_at"])
+    user.streak_counter = counter
+    return counter
@@ -1,14 +1,19 @@
-from datetime import timedelta, datetime
+import uuid
+from datetime import timedelta, datetime, timezone as dt_timezone
 from zoneinfo import ZoneInfo
+from django.core.exceptions import ValidationError
 from django.utils import timezone
-from django.db import transaction
+from django.utils.dateparse import parse_datetime
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Least
 from rest_framework import permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from question_bank.models import Question
 from question_bank.views import is_staff
-from .models import DailyStreakProgress, QuestionAttempt
-from .utils import get_streak_base
+from .models import AttemptDailyRollup, AttemptReceipt, DailyStreakProgress, QuestionAttempt, QuestionAttemptStatus, StreakCounter
+from .utils import get_streak_base, record_completion
 
 BAKU_TZ = ZoneInfo("Asia/Baku")
 
@@ -79,10 +84,116 @@ class StreakStatusView(APIView):
         )
 
 
+DAILY_TARGET = 5
+
+
+def _daily_count(user_id, day, subject: str):
+    """Distinct questions answered today for one subject, capped at the daily target (SQL expression)."""
+    count = Subquery(
+        QuestionAttempt.objects.filter(user_id=user_id, attempted_date=day, subject=subject)
+        .order_by()
+        .values("user_id")
+        .annotate(n=Count("id"))
+        .values("n")[:1]
+    )
+    return Least(Coalesce(count, Value(0)), Value(DAILY_TARGET))
+
+
+def _save_attempt(user_id, question_id, day, subject, fields) -> bool:
+    """
+    Insert today's attempt at a question, or refresh it on a re-answer; True when
+    inserted. The insert runs in a savepoint so a conflict (the re-answer) falls
+    back to an UPDATE, and the caller knows whether to count the question.
+    """
+    try:
+        with transaction.atomic():
+            QuestionAttempt.objects.create(
+                user_id=user_id, question_id=question_id, attempted_date=day, subject=subject, **fields
+            )
+        return True
+    except IntegrityError:
+        QuestionAttempt.objects.filter(user_id=user_id, question_id=question_id, attempted_date=day).update(
+            updated_at=timezone.now(), **fields
+        )
+        return False
+
+
+def _increment_progress(user_id, day, subject, now):
+    """
+    Count one more question for the day's subject, capped at the daily target (F() increment).
+    The same UPDATE stamps completed_at with `now` when the increment brings both counters to
+    the target, so the day flipped on this call iff the stored stamp equals `now` afterwards.
+    """
+    field = f"{subject}_count"
+    other = "verbal_count" if subject == "math" else "math_count"
+    completes = Q(completed_at__isnull=True, **{f"{field}__gte": DAILY_TARGET - 1, f"{other}__gte": DAILY_TARGET})
+    update = {
+        field: Least(F(field) + 1, Value(DAILY_TARGET)),
+        "completed_at": Case(When(completes, then=Value(now)), default=F("completed_at")),
+    }
+    if not DailyStreakProgress.objects.filter(user_id=user_id, date=day).update(**update):
+        # First answer of the day: create the row, then apply the same update.
+        DailyStreakProgress.objects.bulk_create([DailyStreakProgress(user_id=user_id, date=day)], ignore_conflicts=True)
+        DailyStreakProgress.objects.filter(user_id=user_id, date=day).update(**update)
+
+
+def _recount_progress(user_id, day):
+    """Recompute a day's capped counters from its attempts in one UPDATE (batch flushes)."""
+    DailyStreakProgress.objects.filter(user_id=user_id, date=day).update(
+        math_count=_daily_count(user_id, day, "math"),
+        verbal_count=_daily_count(user_id, day, "verbal"),
+    )
+
+
+def _complete_day(user_id, day, now) -> bool:
+    """
+    Stamp completed_at once both counters reach the target; True only for the call
+    that flipped the day (the row count of an UPDATE filtered on completed_at IS NULL).
+    """
+    return bool(
+        DailyStreakProgress.objects.filter(
+            user_id=user_id,
+            date=day,
+            completed_at__isnull=True,
+            math_count__gte=DAILY_TARGET,
+            verbal_count__gte=DAILY_TARGET,
+        ).update(completed_at=now)
+    )
+
+
+def _record_statuses(user_id, graded: dict):
+    """
+    Record the latest result per question ({question_id: (is_correct, answered_at)})
+    for the topic navigator. New rows are inserted; existing ones change only when the
+    incoming answer is newer, so an offline batch synced late can't overwrite newer answers.
+    """
+    if not graded:
+        return
+    QuestionAttemptStatus.objects.bulk_create(
+        [
+            QuestionAttemptStatus(user_id=user_id, question_id=qid, is_correct=ok, answered_at=at)
+            for qid, (ok, at) in graded.items()
+        ],
+        ignore_conflicts=True,
+    )
+    newer = {
+        qid: Q(question_id=qid) & (Q(answered_at__isnull=True) | Q(answered_at__lt=at))
+        for qid, (_, at) in graded.items()
+    }
+    QuestionAttemptStatus.objects.filter(user_id=user_id, question_id__in=list(graded)).update(
+        is_correct=Case(
+            *[When(newer[qid], then=Value(ok)) for qid, (ok, _) in graded.items()], default=F("is_correct")
+        ),
+        answered_at=Case(
+            *[When(newer[qid], then=Value(at)) for qid, (_, at) in graded.items()], default=F("answered_at")
+        ),
+        updated_at=Value(timezone.now()),
+    )
+
+
 class StreakAttemptView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
-    @transaction.atomic
     def post(self, request):
         user = request.user
         question_id = request.data.get("question_id")
@@ -94,8 +205,8 @@ class StreakAttemptView(APIView):
             return Response({"error": "question_id required"}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            q = Question.objects.get(id=question_id)
-        except Question.DoesNotExist:
+            q = Question.objects.only("id", "subject", "published", "current_revision_id").get(id=question_id)
+        except (Question.DoesNotExist, ValidationError):
             return Response({"error": "Question not found"}, status=status.HTTP_404_NOT_FOUND)
 
         if not q.published and not is_staff(user):
@@ -107,37 +218,36 @@ class StreakAttemptView(APIView):
 
         local_now = _local_now(request)
         today = local_now.date()
-        attempt, created = QuestionAttempt.objects.get_or_create(
-            user=user,
-            question=q,
-            attempted_date=today,
-            defaults={"subject": subject},
-        )
-        # Update attempt info for navigator/status
+        now = timezone.now()
+
+        # Update attempt info for navigator/status; subject stays as first recorded.
+        fields = {"revision_id": q.current_revision_id}
         if selected_label is not None:
-            attempt.selected_label = str(selected_label)[:5]
+            fields["selected_label"] = str(selected_label)[:5]
         if is_correct is not None:
-            attempt.is_correct = bool(is_correct)
-        attempt.save()
-
-        progress, _ = DailyStreakProgress.objects.get_or_create(user=user, date=today)
-
-        if created:
-            if subject == "math":
-                progress.math_count = min(5, progress.math_count + 1)
-            else:
-                progress.verbal_count = min(5, progress.verbal_count + 1)
-
-            if progress.math_count >= 5 and progress.verbal_count >= 5 and not progress.completed_at:
-                progress.completed_at = timezone.now()
-            progress.save()
+            fields["is_correct"] = bool(is_correct)
+        # One transaction: a failure part-way must not leave the attempt saved but uncounted,
+        # or the day completed without the streak counter advancing.
+        with transaction.atomic():
+            if _save_attempt(user.id, q.id, today, subject, fields):
+                # Only a question new for the day moves the counters, and so only it can complete the day.
+                _increment_progress(user.id, today, subject, now)
+            if is_correct is not None:
+                _record_statuses(user.id, {q.id: (fields["is_correct"], now)})
+
+            # One read brings back today's counters plus everything the streak count needs.
+            progress = DailyStreakProgress.objects.select_related("user__profile", "user__streak_counter").get(
+                user=user, date=today
+            )
+            if progress.completed_at == now:
+                record_completion(progress.user, today)
 
         time_left = _time_left_seconds(local_now)
 
         return Response(
             {
                 "ok": True,
-                "streak_count": _get_streak_count(user, today),
+                "streak_count": _get_streak_count(progress.user, today),
                 "today": {
                     "date": today.isoformat(),
                     "math_count": progress.math_count,
@@ -149,23 +259,260 @@ class StreakAttemptView(APIView):
         )
 
 
+MAX_BATCH_ATTEMPTS = 200
+# Queued answers older than this (in the client's local days) are not counted.
+OFFLINE_GRACE_DAYS = 3
+
+
+def _parse_client_ts(raw):
+    """Client answer time as an aware datetime; accepts ISO 8601 or epoch milliseconds."""
+    if raw is None or raw == "" or isinstance(raw, bool):
+        return None
+    try:
+        if isinstance(raw, (int, float)):
+            return datetime.fromtimestamp(raw / 1000, tz=dt_timezone.utc)
+        parsed = parse_datetime(str(raw))
+    except (OverflowError, OSError, ValueError):
+        return None
+    if parsed is not None and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, dt_timezone.utc)
+    return parsed
+
+
+def _is_uuid(value) -> bool:
+    try:
+        uuid.UUID(str(value))
+    except ValueError:
+        return False
+    return True
+
+
+class StreakAttemptBatchView(APIView):
+    """
+    Offline flush: apply queued answers in order, in one transaction.
+    Every item carries an idempotency key; keys seen before are reported as
+    duplicates and skipped, so retrying a flush never double-counts.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        user = request.user
+        items = request.data.get("attempts")
+        if not isinstance(items, list) or not items:
+            return Response({"error": "attempts required"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > MAX_BATCH_ATTEMPTS:
+            return Response(
+                {"error": f"At most {MAX_BATCH_ATTEMPTS} attempts per batch"}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        offset = _parse_tz_offset(request)
+        now = timezone.now()
+        local_now = _local_now(request)
+        today = local_now.date()
+        oldest = today - timedelta(days=OFFLINE_GRACE_DAYS)
+
+        results = []
+        pending = []
+        seen_keys = set()
+        for item in items:
+            if not isinstance(item, dict):
+                results.append({"idempotency_key": None, "status": "invalid", "error": "attempt must be an object"})
+                continue
+            key = str(item.get("idempotency_key") or "").strip()
+            result = {"idempotency_key": key or None}
+            results.append(result)
+            if not key or len(key) > 64:
+                result.update(status="invalid", error="idempotency_key required (max 64 chars)")
+                continue
+            if key in seen_keys:
+                result["status"] = "duplicate"
+                continue
+            seen_keys.add(key)
+            question_id = item.get("question_id")
+            if not question_id or not _is_uuid(question_id):
+                result.update(status="invalid", error="question_id required")
+                continue
+            answered_at = _parse_client_ts(item.get("answered_at"))
+            if answered_at is None:
+                result.update(status="invalid", error="answered_at required")
+                continue
+            # Clock skew can put answers slightly ahead of the server; never count them for tomorrow.
+            day = (min(answered_at, now) - timedelta(minutes=offset)).date()
+            if day < oldest:
+                result["status"] = "stale"
+                continue
+            result["date"] = day.isoformat()
+            pending.append((result, item, uuid.UUID(str(question_id)), day, min(answered_at, now)))
+
+        questions = {
+            q.id: q
+            for q in Question.objects.filter(id__in={qid for _, _, qid, _, _ in pending}).only(
+                "id", "subject", "published", "current_revision_id"
+            )
+        }
+        staff = is_staff(user)
+
+        with transaction.atomic():
+            # Serialize flushes per user so two retries of the same batch cannot both pass the key check.
+            StreakCounter.objects.bulk_create([StreakCounter(user_id=user.id)], ignore_conflicts=True)
+            list(StreakCounter.objects.select_for_update().filter(user=user))
+            applied_keys = set(
+                AttemptReceipt.objects.filter(user=user, key__in=[r["idempotency_key"] for r, _, _, _, _ in pending])
+                .values_list("key", flat=True)
+            )
+
+            # Later answers to the same question on the same day overwrite earlier ones, as re-posts would.
+            merged = {}
+            graded = {}
+            receipts = []
+            for result, item, qid, day, answered_at in pending:
+                if result["idempotency_key"] in applied_keys:
+                    result["status"] = "duplicate"
+                    continue
+                q = questions.get(qid)
+                if q is None:
+                    result.update(status="not_found", error="Question not found")
+                    continue
+                if not q.published and not staff:
+                    result.update(status="forbidden", error="Forbidden")
+                    continue
+                subject = (item.get("subject") or "").lower()
+                if subject not in ["math", "verbal"]:
+                    subject = q.subject
+                row = merged.setdefault(
+                    (qid, day), {"subject": subject, "revision_id": q.current_revision_id}
+                )
+                if item.get("selected_label") is not None:
+                    row["selected_label"] = str(item["selected_label"])[:5]
+                if item.get("is_correct") is not None:
+                    row["is_correct"] = bool(item["is_correct"])
+                    if qid not in graded or graded[qid][1] <= answered_at:
+                        graded[qid] = (row["is_correct"], answered_at)
+                receipts.append(AttemptReceipt(user=user, key=result["idempotency_key"]))
+                result["status"] = "applied"
+
+            # One upsert per combination of supplied fields, since update_fields is per statement.
+            groups = {}
+            for (qid, day), row in merged.items():
+                optional = tuple(f for f in ("selected_label", "is_correct") if f in row)
+                groups.setdefault(optional, []).append(
+                    QuestionAttempt(user=user, question_id=qid, attempted_date=day, **row)
+                )
+            for optional, attempts in groups.items():
+                QuestionAttempt.objects.bulk_create(
+                    attempts,
+                    update_conflicts=True,
+                    unique_fields=["user", "question", "attempted_date"],
+                    update_fields=["revision", "updated_at", *optional],
+                )
+            _record_statuses(user.id, graded)
+
+            days = sorted({day for _, day in merged})
+            if days:
+                DailyStreakProgress.objects.bulk_create(
+                    [DailyStreakProgress(user=user, date=day) for day in days], ignore_conflicts=True
+                )
+                for day in days:
+                    _recount_progress(user.id, day)
+                    if _complete_day(user.id, day, now):
+                        record_completion(user, day)
+            AttemptReceipt.objects.bulk_create(receipts)
+
+            progress_by_date = {
+                p.date: p for p in DailyStreakProgress.objects.filter(user=user, date__in=[*days, today])
+            }
+
+        progress = progress_by_date.get(today)
+        return Response(
+            {
+                "ok": True,
+                "results": results,
+                "streak_count": _get_streak_count(user, today),
+                "today": {
+                    "date": today.isoformat(),
+                    "math_count": progress.math_count if progress else 0,
+                    "verbal_count": progress.verbal_count if progress else 0,
+                    "completed": bool(progress and progress.completed_at),
+                },
+                "time_left_seconds": _time_left_seconds(local_now),
+            }
+        )
+
+
+def _status_map(qs) -> dict:
+    return {
+        str(qid): "correct" if ok else "incorrect"
+        for qid, ok in qs.values_list("question_id", "is_correct")
+    }
+
+
 class QuestionAttemptStatusView(APIView):
+    """Latest correct/incorrect per question: GET by topic, POST by explicit ids."""
+
     permission_classes = [permissions.IsAuthenticated]
 
+    def get(self, request):
+        topic = request.query_params.get("topic")
+        if not topic:
+            return Response({"error": "topic required"}, status=status.HTTP_400_BAD_REQUEST)
+        qs = QuestionAttemptStatus.objects.filter(user=request.user, question__topic=topic)
+        subject = (request.query_params.get("subject") or "").lower()
+        if subject:
+            qs = qs.filter(question__subject=subject)
+        subtopic = request.query_params.get("subtopic")
+        if subtopic:
+            qs = qs.filter(question__subtopic=subtopic)
+        return Response({"ok": True, "statuses": _status_map(qs)})
+
     def post(self, request):
         ids = request.data.get("question_ids") or []
         if not isinstance(ids, list) or not ids:
             return Response({"error": "question_ids required"}, status=status.HTTP_400_BAD_REQUEST)
-        qs = QuestionAttempt.objects.filter(user=request.user, question_id__in=ids).order_by("-updated_at")
-        status_map = {}
-        for a in qs:
-            qid = str(a.question_id)
-            if qid in status_map:
-                continue
-            if a.is_correct is True:
-                status_map[qid] = "correct"
-            elif a.is_correct is False:
-                status_map[qid] = "incorrect"
-        return Response({"ok": True, "statuses": status_map})
+        ids = [qid for qid in ids if _is_uuid(qid)]
+        qs = QuestionAttemptStatus.objects.filter(user=request.user, question_id__in=ids)
+        return Response({"ok": True, "statuses": _status_map(qs)})
+
+
+MAX_HISTORY_DAYS = 365
+
+
+class StreakHistoryView(APIView):
+    """Daily answer totals and per-topic accuracy, served from AttemptDailyRollup only."""
+
+    permission_classes = [permissions.IsAuthenticated]
 
-# Create your views here.
+    def get(self, request):
+        try:
+            days = int(request.query_params.get("days") or 30)
+        except (TypeError, ValueError):
+            days = 30
+        days = min(max(days, 1), MAX_HISTORY_DAYS)
+        since = _local_date(request) - timedelta(days=days - 1)
+
+        rollups = AttemptDailyRollup.objects.filter(user=request.user)
+        subject = (request.query_params.get("subject") or "").lower()
+        if subject:
+            rollups = rollups.filter(subject=subject)
+
+        daily = (
+            rollups.filter(date__gte=since)
+            .values("date")
+            .annotate(attempted=Sum("attempted"), correct=Sum("correct"))
+            .order_by("date")
+        )
+        topics = (
+            rollups.values("subject", "topic")
+            .annotate(attempted=Sum("attempted"), correct=Sum("correct"))
+            .order_by("subject", "topic")
+        )
+        return Response(
+            {
+                "ok": True,
+                "days": [
+                    {"date": row["date"].isoformat(), "attempted": row["attempted"], "correct": row["correct"]}
+                    for row in daily
+                ],
+                "topics": list(topics),
+            }
+        )
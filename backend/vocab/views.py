@@ -2,8 +2,8 @@ from rest_framework import permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.contrib.auth import get_user_model
-import csv
-import io
+from accounts.roles import is_staff
+from prep_portal_api.uploads import UploadRejected, csv_dict_reader
 from .models import VocabPack, VocabWord
 from .serializers import VocabPackSerializer, VocabWordSerializer
 
@@ -11,12 +11,6 @@ from .serializers import VocabPackSerializer, VocabWordSerializer
 User = get_user_model()
 
 
-def is_staff(user: User) -> bool:
-    prof = getattr(user, "profile", None)
-    role = (getattr(prof, "role", None) or "").lower()
-    return user.is_superuser or getattr(prof, "is_admin", False) or role in ("admin", "teacher")
-
-
 class VocabPackListCreateView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -95,18 +89,11 @@ class VocabWordImportView(APIView):
         if not file:
             return Response({"error": "No file provided"}, status=400)
 
-        raw = file.read()
-        decoded = None
-        for enc in ("utf-8-sig", "utf-8", "iso-8859-1"):
-            try:
-                decoded = raw.decode(enc)
-                break
-            except UnicodeDecodeError:
-                continue
-        if decoded is None:
-            return Response({"error": "Could not decode file. Please upload UTF-8 CSV."}, status=400)
-
-        reader = csv.DictReader(io.StringIO(decoded))
+        try:
+            reader = csv_dict_reader(file)
+        except UploadRejected as e:
+            return Response({"error": e.message}, status=e.status)
+
         created = 0
         errors = []
 
@@ -3,6 +3,7 @@
 import { useEffect, useMemo, useState } from "react";
 import { useParams, useRouter } from "next/navigation";
 import type { Assignment, Submission, Grade, AssignmentFile } from "@/lib/types/assignment";
+import { chunkedUpload } from "@/lib/chunkedUpload";
 
 type Profile = {
   user_id: string;
@@ -288,16 +289,13 @@ export default function AssignmentPage() {
     setSubmitBusy(true);
     setError(null);
     try {
-      const form = new FormData();
-      form.append("assignment_id", assignment.id);
-      form.append("file", selectedFile);
-      const res = await fetch(`${API_BASE}/api/assignments/submissions/create/`, {
-        method: "POST",
-        headers: { Authorization: `Bearer ${accessToken}` },
-        body: form,
+      await chunkedUpload({
+        apiBase: API_BASE ?? "",
+        token: accessToken,
+        target: "submission",
+        params: { assignment_id: assignment.id },
+        file: selectedFile,
       });
-      const json = await res.json().catch(() => null);
-      if (!res.ok) throw new Error(json?.error || "Upload failed");
       setSelectedFile(null);
       await loadSubmissions(assignment.id);
     } catch (e: any) {
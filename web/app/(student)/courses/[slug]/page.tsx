@@ -2,6 +2,7 @@
 
 import { useEffect, useMemo, useState, type ReactNode } from "react";
 import { useParams, useRouter } from "next/navigation";
+import { chunkedUpload } from "@/lib/chunkedUpload";
 
 type Course = {
   id: string;
@@ -67,6 +68,9 @@ type CourseNode = {
   } | null;
 };
 
+// course-nodes/tree/ returns the whole course with children nested under each node.
+type CourseTreeNode = CourseNode & { children: CourseTreeNode[] };
+
 type Tab = "overview" | "content" | "calendar" | "gradebook";
 
 function isTeacherOrAdmin(p: Profile | null) {
@@ -298,7 +302,7 @@ export default function CourseDetailPage() {
   const [breadcrumbs, setBreadcrumbs] = useState<Array<{ id: string | null; name: string }>>([
     { id: null, name: "Root" },
   ]);
-  const [nodes, setNodes] = useState<CourseNode[]>([]);
+  const [tree, setTree] = useState<CourseTreeNode[]>([]);
   const [contentLoading, setContentLoading] = useState(false);
   const [contentError, setContentError] = useState<string | null>(null);
 
@@ -324,6 +328,7 @@ export default function CourseDetailPage() {
   const [uploadDesc, setUploadDesc] = useState("");
   const [uploadFile, setUploadFile] = useState<File | null>(null);
   const [uploadBusy, setUploadBusy] = useState(false);
+  const [uploadProgress, setUploadProgress] = useState<number | null>(null);
 
   // Toggles for actions
   const [showCreateFolder, setShowCreateFolder] = useState(false);
@@ -399,6 +404,18 @@ export default function CourseDetailPage() {
 
   const canManage = isTeacherOrAdmin(profile);
 
+  // Folder contents come from the cached tree, so moving between folders needs no request.
+  const nodes = useMemo(() => {
+    if (!currentFolderId) return tree;
+    const stack = [...tree];
+    while (stack.length) {
+      const node = stack.pop()!;
+      if (node.id === currentFolderId) return node.children;
+      stack.push(...node.children);
+    }
+    return [];
+  }, [tree, currentFolderId]);
+
   const sortedNodes = useMemo(() => {
     const copy = [...nodes];
     copy.sort((a, b) => {
@@ -694,7 +711,7 @@ export default function CourseDetailPage() {
   }
 
   // ===== Content explorer =====
-  async function loadNodes(courseId: string, folderId: string | null) {
+  async function loadTree(courseId: string) {
     setContentLoading(true);
     setContentError(null);
 
@@ -705,39 +722,42 @@ export default function CourseDetailPage() {
     }
 
     try {
+      // The response carries an ETag; the browser revalidates it and reuses the cached tree on a 304.
       const params = new URLSearchParams({ course_id: courseId });
-      if (folderId) params.append("parent_id", folderId);
       const res = await fetch(
-        `${process.env.NEXT_PUBLIC_API_BASE}/api/course-nodes/list/?${params.toString()}`,
+        `${process.env.NEXT_PUBLIC_API_BASE}/api/course-nodes/tree/?${params.toString()}`,
         { headers: { Authorization: `Bearer ${accessToken}` } }
       );
       const json = await res.json();
       if (!res.ok) throw new Error(json?.error || "Failed to load nodes");
 
-      const list = (json.nodes ?? []) as CourseNode[];
-      setNodes(list);
+      const roots = (json.tree ?? []) as CourseTreeNode[];
+      setTree(roots);
 
       setScheduleDraft((prev) => {
         const next = { ...prev };
-        for (const n of list) {
+        const stack = [...roots];
+        while (stack.length) {
+          const n = stack.pop()!;
           next[n.id] = { publish_at: toDatetimeLocal(n.publish_at) };
+          stack.push(...n.children);
         }
         return next;
       });
       setContentLoading(false);
     } catch (e: any) {
       setContentError(e?.message ?? "Failed to load nodes");
-      setNodes([]);
+      setTree([]);
       setContentLoading(false);
     }
   }
 
   useEffect(() => {
     if (tab === "content" && course?.id) {
-      loadNodes(course.id, currentFolderId);
+      loadTree(course.id);
     }
     // eslint-disable-next-line react-hooks/exhaustive-deps
-  }, [tab, course?.id, currentFolderId]);
+  }, [tab, course?.id]);
 
   // Ensure gradebook data is available for overview stats even for students
   useEffect(() => {
@@ -913,7 +933,7 @@ async function getSignedUrl(storage_path: string, storage_url?: string | null) {
       );
 
       setNewFolderName("");
-      await loadNodes(course.id, currentFolderId);
+      await loadTree(course.id);
     } catch (e: any) {
       setContentError(e?.message ?? "Failed to create folder");
     } finally {
@@ -940,7 +960,7 @@ async function getSignedUrl(storage_path: string, storage_url?: string | null) {
       );
 
       setNewAssignmentTitle("");
-      await loadNodes(course.id, currentFolderId);
+      await loadTree(course.id);
       router.push(`/course/${course.id}/assignment/${res.assignment.id}`);
     } catch (e: any) {
       setContentError(e?.message ?? "Failed to create assignment");
@@ -977,7 +997,7 @@ async function getSignedUrl(storage_path: string, storage_url?: string | null) {
 
       setNewQuizTitle("");
       setNewQuizDesc("");
-      await loadNodes(course.id, currentFolderId);
+      await loadTree(course.id);
       // Stay on content; quiz can be managed via the new node in the list.
     } catch (e: any) {
       setContentError(e?.message ?? "Failed to create quiz");
@@ -996,31 +1016,31 @@ async function getSignedUrl(storage_path: string, storage_url?: string | null) {
     setContentError(null);
 
     try {
-      const form = new FormData();
-      form.append("course_id", course.id);
-      if (currentFolderId) form.append("parent_id", currentFolderId);
-      form.append("name", displayName);
-      if (uploadDesc.trim()) form.append("description", uploadDesc.trim());
-      form.append("file", uploadFile);
-
-      const res = await fetch(`${process.env.NEXT_PUBLIC_API_BASE}/api/course-nodes/upload/`, {
-        method: "POST",
-        headers: { Authorization: `Bearer ${accessToken}` },
-        body: form,
+      // Chunked and resumable, so large files survive slow or flaky connections.
+      await chunkedUpload({
+        apiBase: process.env.NEXT_PUBLIC_API_BASE ?? "",
+        token: accessToken,
+        target: "course_file",
+        params: {
+          course_id: course.id,
+          parent_id: currentFolderId,
+          name: displayName,
+          description: uploadDesc.trim() || null,
+        },
+        file: uploadFile,
+        onProgress: (sent, total) => setUploadProgress(Math.round((sent / total) * 100)),
       });
 
-      const json = await res.json();
-      if (!res.ok) throw new Error(json?.error || "Upload failed");
-
       setUploadName("");
       setUploadDesc("");
       setUploadFile(null);
 
-      await loadNodes(course.id, currentFolderId);
+      await loadTree(course.id);
     } catch (e: any) {
       setContentError(e?.message ?? "Upload failed");
     } finally {
       setUploadBusy(false);
+      setUploadProgress(null);
     }
   }
 
@@ -1039,7 +1059,7 @@ async function getSignedUrl(storage_path: string, storage_url?: string | null) {
         }
       );
 
-      if (course?.id) await loadNodes(course.id, currentFolderId);
+      if (course?.id) await loadTree(course.id);
     } catch (e: any) {
       setContentError(e?.message ?? "Publish toggle failed");
     }
@@ -1070,7 +1090,7 @@ async function getSignedUrl(storage_path: string, storage_url?: string | null) {
         }
       );
 
-      if (course?.id) await loadNodes(course.id, currentFolderId);
+      if (course?.id) await loadTree(course.id);
     } catch (e: any) {
       setContentError(e?.message ?? "Schedule save failed");
     }
@@ -1096,7 +1116,7 @@ async function getSignedUrl(storage_path: string, storage_url?: string | null) {
         return c;
       });
 
-      if (course?.id) await loadNodes(course.id, currentFolderId);
+      if (course?.id) await loadTree(course.id);
     } catch (e: any) {
       setContentError(e?.message ?? "Schedule clear failed");
     }
@@ -1118,7 +1138,7 @@ async function getSignedUrl(storage_path: string, storage_url?: string | null) {
           name: newName.trim(),
         }
       );
-      if (course?.id) await loadNodes(course.id, currentFolderId);
+      if (course?.id) await loadTree(course.id);
     } catch (e: any) {
       setContentError(e?.message ?? "Rename failed");
     }
@@ -1139,7 +1159,7 @@ async function getSignedUrl(storage_path: string, storage_url?: string | null) {
           parent_id: dest.trim() || null,
         }
       );
-      if (course?.id) await loadNodes(course.id, currentFolderId);
+      if (course?.id) await loadTree(course.id);
     } catch (e: any) {
       setContentError(e?.message ?? "Move failed");
     }
@@ -1161,7 +1181,7 @@ async function getSignedUrl(storage_path: string, storage_url?: string | null) {
         accessToken,
         { node_id: node.id }
       );
-      if (course?.id) await loadNodes(course.id, currentFolderId);
+      if (course?.id) await loadTree(course.id);
     } catch (e: any) {
       setContentError(e?.message ?? "Delete failed");
     }
@@ -1663,7 +1683,7 @@ async function getSignedUrl(storage_path: string, storage_url?: string | null) {
                     disabled={uploadBusy || folderBusy}
                     type="button"
                   >
-                    {uploadBusy ? "Uploading..." : "Upload file"}
+                    {uploadBusy ? `Uploading...${uploadProgress !== null ? ` ${uploadProgress}%` : ""}` : "Upload file"}
                   </button>
                 </div>
               ) : null}
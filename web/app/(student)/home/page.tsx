@@ -6,6 +6,7 @@ import Image from "next/image";
 import { Manrope } from "next/font/google";
 import happy from "@/sss/happy(ilyas).png";
 import vic from "@/sss/vic(ilyas).png";
+import { IMAGE_UPLOAD_ACCEPT } from "@/lib/imageUpload";
 
 const uiFont = Manrope({ subsets: ["latin"], weight: ["400", "500", "600", "700", "800"] });
 
@@ -980,7 +981,7 @@ export default function HomePage() {
               <div className="text-sm text-slate-600">Upload your university icon.</div>
               <input
                 type="file"
-                accept="image/*"
+                accept={IMAGE_UPLOAD_ACCEPT}
                 onChange={(e) => {
                   const file = e.target.files?.[0] || null;
                   setUniFile(file);
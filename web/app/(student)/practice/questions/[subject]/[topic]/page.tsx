@@ -142,15 +142,17 @@ export default function TopicQuestionsPage() {
         setPassageHtml(ph);
         setPassageOriginal(orig);
         if (access && qs.length) {
-          fetch(`${process.env.NEXT_PUBLIC_API_BASE}/api/streak/attempts/`, {
-            method: "POST",
-            headers: {
-              "Content-Type": "application/json",
-              Authorization: `Bearer ${access}`,
-              "X-TZ-Offset": String(new Date().getTimezoneOffset()),
-            },
-            body: JSON.stringify({ question_ids: qs.map((q: Question) => q.id) }),
-          })
+          fetch(
+            `${process.env.NEXT_PUBLIC_API_BASE}/api/streak/attempts/?subject=${subject}&topic=${encodeURIComponent(
+              topic
+            )}${subtopic ? `&subtopic=${encodeURIComponent(subtopic)}` : ""}`,
+            {
+              headers: {
+                Authorization: `Bearer ${access}`,
+                "X-TZ-Offset": String(new Date().getTimezoneOffset()),
+              },
+            }
+          )
             .then((r) => r.json())
             .then((j) => {
               if (j?.statuses) setStatusMap(j.statuses);
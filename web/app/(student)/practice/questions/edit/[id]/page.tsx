@@ -4,6 +4,7 @@ import { useEffect, useMemo, useRef, useState } from "react";
 import { useParams, useRouter } from "next/navigation";
 import { subjects } from "@/lib/questionBank/topics";
 import { typesetMath } from "@/lib/mathjax";
+import { IMAGE_UPLOAD_ACCEPT } from "@/lib/imageUpload";
 
 type Choice = { label: string; content: string; is_correct: boolean };
 
@@ -566,7 +567,7 @@ export default function EditQuestionPage() {
               <div className="text-sm font-semibold text-slate-900">Image (optional)</div>
               <input
                 type="file"
-                accept="image/*"
+                accept={IMAGE_UPLOAD_ACCEPT}
                 onChange={(e) => setImageFile(e.target.files?.[0] ?? null)}
                 className="mt-2 text-sm"
               />
@@ -2,6 +2,7 @@
 
 import { useEffect, useState } from "react";
 import Link from "next/link";
+import { IMAGE_UPLOAD_ACCEPT } from "@/lib/imageUpload";
 
 export default function SettingsPage() {
   const [loading, setLoading] = useState(false);
@@ -177,7 +178,7 @@ export default function SettingsPage() {
               <div className="text-sm font-medium text-slate-800">Change profile photo</div>
               <input
                 type="file"
-                accept="image/*"
+                accept={IMAGE_UPLOAD_ACCEPT}
                 disabled={loading}
                 onChange={(e) => {
                   const f = e.target.files?.[0];
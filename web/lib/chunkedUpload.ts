@@ -0,0 +1,120 @@
+export type UploadTarget = "course_file" | "submission";
+
+type UploadSession = {
+  id: string;
+  target: UploadTarget;
+  file_name: string;
+  size: number;
+  offset: number;
+  status: "uploading" | "processing" | "storing" | "complete" | "failed";
+  error: string | null;
+  result: Record<string, any> | null;
+};
+
+type ChunkedUploadOptions = {
+  apiBase: string;
+  token: string;
+  target: UploadTarget;
+  params: Record<string, string | null | undefined>;
+  file: File;
+  onProgress?: (sent: number, total: number) => void;
+};
+
+const MAX_RETRIES = 5;
+const POLL_MS = 1000;
+
+function sleep(ms: number) {
+  return new Promise((resolve) => setTimeout(resolve, ms));
+}
+
+async function readJson(res: Response) {
+  return res.json().catch(() => null);
+}
+
+async function fetchSession(apiBase: string, token: string, id: string): Promise<UploadSession> {
+  const res = await fetch(`${apiBase}/api/uploads/${id}/`, {
+    headers: { Authorization: `Bearer ${token}` },
+  });
+  const json = await readJson(res);
+  if (!res.ok) throw new Error(json?.error || "Upload failed");
+  return json.upload;
+}
+
+/**
+ * Upload a file in chunks through /api/uploads/ and wait until the server has stored it.
+ * A dropped chunk is retried from the offset the server reports, so a flaky connection
+ * only costs the chunk in flight. Resolves with the session result
+ * ({ node } for course files, { submission } for submissions).
+ */
+export async function chunkedUpload({
+  apiBase,
+  token,
+  target,
+  params,
+  file,
+  onProgress,
+}: ChunkedUploadOptions): Promise<Record<string, any>> {
+  const initRes = await fetch(`${apiBase}/api/uploads/init/`, {
+    method: "POST",
+    headers: { Authorization: `Bearer ${token}`, "Content-Type": "application/json" },
+    body: JSON.stringify({
+      ...params,
+      target,
+      file_name: file.name,
+      size: file.size,
+      mime_type: file.type || null,
+    }),
+  });
+  const initJson = await readJson(initRes);
+  if (!initRes.ok) throw new Error(initJson?.error || "Upload failed");
+
+  const session: UploadSession = initJson.upload;
+  const chunkSize: number = initJson.chunk_size;
+  let offset = session.offset;
+  let failures = 0;
+
+  while (offset < file.size) {
+    const form = new FormData();
+    form.append("offset", String(offset));
+    form.append("chunk", file.slice(offset, offset + chunkSize), file.name);
+    try {
+      const res = await fetch(`${apiBase}/api/uploads/${session.id}/chunk/`, {
+        method: "POST",
+        headers: { Authorization: `Bearer ${token}` },
+        body: form,
+      });
+      const json = await readJson(res);
+      if (res.status === 409 && typeof json?.offset === "number") {
+        // The server has a different offset (e.g. an earlier attempt did land); resume there.
+        offset = json.offset;
+        continue;
+      }
+      if (!res.ok) {
+        if (res.status < 500) throw Object.assign(new Error(json?.error || "Upload failed"), { fatal: true });
+        throw new Error(json?.error || "Upload failed");
+      }
+      offset = json.upload.offset;
+      failures = 0;
+      onProgress?.(offset, file.size);
+    } catch (e: any) {
+      if (e?.fatal || ++failures > MAX_RETRIES) throw e;
+      await sleep(500 * 2 ** failures);
+      offset = (await fetchSession(apiBase, token, session.id).catch(() => ({ offset }))).offset;
+    }
+  }
+
+  const completeRes = await fetch(`${apiBase}/api/uploads/${session.id}/complete/`, {
+    method: "POST",
+    headers: { Authorization: `Bearer ${token}` },
+  });
+  const completeJson = await readJson(completeRes);
+  if (!completeRes.ok) throw new Error(completeJson?.error || "Upload failed");
+
+  let current: UploadSession = completeJson.upload;
+  while (current.status === "processing" || current.status === "storing") {
+    await sleep(POLL_MS);
+    current = await fetchSession(apiBase, token, session.id);
+  }
+  if (current.status !== "complete") throw new Error(current.error || "Upload failed");
+  return current.result ?? {};
+}
@@ -0,0 +1,3 @@
+// Image types the API accepts for avatars, university icons and question images (sniffed server-side).
+// SVG is left out on purpose: the server refuses it because it can carry script.
+export const IMAGE_UPLOAD_ACCEPT = "image/jpeg,image/png,image/gif,image/webp,image/heic,image/heif,.heic,.heif";